@@ -1,14 +1,39 @@
 """Append-only JSON Lines audit logger.
 
 Lightweight, dependency-free; each call writes a single line so it can survive process crashes.
+
+Optionally segmented: when ``max_segment_bytes`` or ``max_segment_age_seconds``
+is set, the active file at ``path`` is sealed into ``<stem>-000123.jsonl`` and
+gzip-compressed in the background.  ``<stem>.manifest.json`` records each
+sealed segment's time range and first/last proposal_id so ``entries(since,
+until)`` only opens the segments it needs.
+
+Readers: ``iter_entries()`` streams with stage/proposal_id/time filters,
+``tail(n)`` reads backwards from the end, ``follow()`` yields new appends.
+
+Optionally hash-chained (``chain=True``): each line gains a trailing
+``"chain":{"index","prev","hash"}`` object with ``hash = sha256(prev + line)``
+and every ``checkpoint_every`` entries a checkpoint (Merkle root of the
+window, HMAC-signed when ``checkpoint_key`` is set) is added to the
+manifest.  ``verify(trusted=checkpoint)`` re-hashes only the entries written
+after a checkpoint the caller already trusts.
 """
 from __future__ import annotations
 
+import gzip
+import hashlib
+import hmac
 import json
+import mmap
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict, dataclass
-from typing import Any, Dict, TextIO
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+GENESIS_HASH = "0" * 64
+_CHAIN_MARKER = ',"chain":'
 
 
 @dataclass(frozen=True)
@@ -20,33 +45,529 @@ class AuditEntry:
     timestamp: float
 
 
+def _entry_from_json(data: Dict[str, Any]) -> AuditEntry:
+    return AuditEntry(
+        proposal_id=data["proposal_id"],
+        trace_id=data["trace_id"],
+        stage=data["stage"],
+        payload=data.get("payload", {}),
+        timestamp=float(data["timestamp"]),
+    )
+
+
 class AuditLog:
-    def __init__(self, path: str) -> None:
+    def __init__(
+        self,
+        path: str,
+        max_segment_bytes: int = 0,
+        max_segment_age_seconds: float = 0,
+        compress: bool = True,
+        chain: bool = False,
+        checkpoint_every: int = 1024,
+        checkpoint_key: Optional[bytes] = None,
+    ) -> None:
         self.path = path
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age_seconds = max_segment_age_seconds
+        self.compress = compress
+        self.chain = chain
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.checkpoint_key = checkpoint_key
+        self._lock = threading.Lock()
+        self._compressor: Optional[ThreadPoolExecutor] = None
+        self._head: Optional[Dict[str, Any]] = None  # chain head, loaded lazily
         os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
 
+    # Paths -----------------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> str:
+        stem, _ = os.path.splitext(self.path)
+        return f"{stem}.manifest.json"
+
+    def _segment_path(self, seq: int) -> str:
+        stem, ext = os.path.splitext(self.path)
+        return f"{stem}-{seq:06d}{ext}"
+
+    @property
+    def segmented(self) -> bool:
+        return bool(self.max_segment_bytes or self.max_segment_age_seconds)
+
+    # Manifest --------------------------------------------------------------
+
+    def manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"next_seq": 1, "active_opened_at": None, "segments": []}
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, separators=(",", ":"))
+        os.replace(tmp, self.manifest_path)
+
+    # Writing ---------------------------------------------------------------
+
     def append(self, entry: AuditEntry) -> None:
         line = json.dumps(asdict(entry), separators=(",", ":"))
+        if self.segmented:
+            self._maybe_rotate(entry.timestamp)
+        if self.chain:
+            self._append_chained(line)
+            return
         with open(self.path, "a", encoding="utf-8") as fh:
             fh.write(line + "\n")
 
-    def entries(self) -> list[AuditEntry]:
-        if not os.path.exists(self.path):
-            return []
-        results: list[AuditEntry] = []
-        with open(self.path, "r", encoding="utf-8") as fh:
+    def _append_chained(self, line: str) -> None:
+        with self._lock:
+            head = self._chain_head()
+            digest = _event_hash(head["hash"], line.encode("utf-8"))
+            link = {"index": head["next_index"], "prev": head["hash"], "hash": digest}
+            line = line[:-1] + _CHAIN_MARKER + json.dumps(link, separators=(",", ":")) + "}"
+            with open(self.path, "ab") as fh:
+                fh.write(line.encode("utf-8") + b"\n")
+                end_offset = fh.tell()
+            head["hash"] = digest
+            head["next_index"] += 1
+            head["window"].append(bytes.fromhex(digest))
+            if len(head["window"]) >= self.checkpoint_every:
+                self._checkpoint(head, end_offset)
+
+    def _chain_head(self) -> Dict[str, Any]:
+        """Last hash plus hashes since the last checkpoint, read from the tail."""
+        if self._head is not None:
+            return self._head
+        checkpoints = self.manifest().get("checkpoints", [])
+        last_cp = checkpoints[-1]["last_index"] if checkpoints else -1
+        head: Dict[str, Any] = {"hash": GENESIS_HASH, "next_index": 0, "window": []}
+        window: List[bytes] = []
+        for path in reversed(self._files(None, None)):
+            for raw in _reverse_lines(path):
+                link = _split_chain(raw)[1]
+                if link is None:
+                    continue
+                if head["next_index"] == 0:
+                    head["hash"] = link["hash"]
+                    head["next_index"] = link["index"] + 1
+                if link["index"] <= last_cp:
+                    break
+                window.append(bytes.fromhex(link["hash"]))
+            else:
+                continue
+            break
+        head["window"] = window[::-1]
+        self._head = head
+        return head
+
+    def _checkpoint(self, head: Dict[str, Any], end_offset: int) -> None:
+        manifest = self.manifest()
+        checkpoint = {
+            # The active file becomes segment ``next_seq`` when sealed.
+            "segment": manifest["next_seq"],
+            "last_index": head["next_index"] - 1,
+            "end_offset": end_offset,
+            "root": _merkle_root(head["window"]),
+            "last_hash": head["hash"],
+        }
+        checkpoint["sig"] = _sign(checkpoint, self.checkpoint_key)
+        manifest.setdefault("checkpoints", []).append(checkpoint)
+        self._save_manifest(manifest)
+        head["window"] = []
+
+    def _maybe_rotate(self, now: float) -> None:
+        with self._lock:
+            manifest = self.manifest()
+            size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if size == 0:
+                if manifest["active_opened_at"] is None:
+                    manifest["active_opened_at"] = now
+                    self._save_manifest(manifest)
+                return
+            opened = manifest["active_opened_at"] or now
+            too_big = self.max_segment_bytes and size >= self.max_segment_bytes
+            too_old = self.max_segment_age_seconds and now - opened >= self.max_segment_age_seconds
+            if not (too_big or too_old):
+                return
+            self._seal(manifest, now)
+
+    def rotate(self) -> None:
+        """Seal the active file now, regardless of size or age."""
+        with self._lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                self._seal(self.manifest(), time.time())
+
+    def _seal(self, manifest: Dict[str, Any], now: float) -> None:
+        seq = manifest["next_seq"]
+        if self.chain:
+            head = self._chain_head()
+            if head["window"]:
+                # Close the window so no checkpoint spans two files.
+                self._checkpoint(head, os.path.getsize(self.path))
+                manifest = self.manifest()
+        sealed_path = self._segment_path(seq)
+        os.replace(self.path, sealed_path)
+        segment: Dict[str, Any] = {
+            "seq": seq,
+            "file": os.path.basename(sealed_path),
+            "events": 0,
+            "first_ts": None,
+            "last_ts": None,
+            "first_proposal_id": None,
+            "last_proposal_id": None,
+        }
+        # One bounded scan per seal keeps append() a single write.
+        for entry in self._read_file(sealed_path):
+            if segment["first_ts"] is None:
+                segment["first_ts"] = entry.timestamp
+                segment["first_proposal_id"] = entry.proposal_id
+            segment["last_ts"] = entry.timestamp
+            segment["last_proposal_id"] = entry.proposal_id
+            segment["events"] += 1
+        manifest["segments"].append(segment)
+        manifest["next_seq"] = seq + 1
+        manifest["active_opened_at"] = now
+        self._save_manifest(manifest)
+        if self.compress:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(max_workers=1)
+            self._compressor.submit(self._compress, seq)
+
+    def _compress(self, seq: int) -> None:
+        src = self._segment_path(seq)
+        dst = src + ".gz"
+        with open(src, "rb") as fin, gzip.open(dst + ".tmp", "wb") as fout:
+            while True:
+                chunk = fin.read(1 << 20)
+                if not chunk:
+                    break
+                fout.write(chunk)
+        os.replace(dst + ".tmp", dst)
+        with self._lock:
+            manifest = self.manifest()
+            for segment in manifest["segments"]:
+                if segment["seq"] == seq:
+                    segment["file"] = os.path.basename(dst)
+            self._save_manifest(manifest)
+        os.remove(src)
+
+    def close(self) -> None:
+        """Wait for background compression to finish."""
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
+            self._compressor = None
+
+    # Verification ----------------------------------------------------------
+
+    def verify(
+        self,
+        key: Optional[bytes] = None,
+        trusted: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Check the hash chain and checkpoints.
+
+        With ``trusted`` (a checkpoint from a previous successful run, e.g.
+        the returned ``"checkpoint"``) only entries after it are re-hashed.
+        Lines without a chain link are tolerated only before the first
+        chained entry (logs that predate ``chain=True``).
+        Returns ``{"ok", "events", "errors", "checkpoint"}``.
+        """
+        manifest = self.manifest()
+        base = os.path.dirname(self.path)
+        files: List[Tuple[int, str]] = []
+        for segment in manifest["segments"]:
+            path = os.path.join(base, segment["file"])
+            if not os.path.exists(path) and os.path.exists(path + ".gz"):
+                path += ".gz"
+            files.append((segment["seq"], path))
+        files.append((manifest["next_seq"], self.path))
+        after = trusted["last_index"] if trusted else -1
+        pending = {cp["last_index"]: cp for cp in manifest.get("checkpoints", []) if cp["last_index"] > after}
+        expected_prev = trusted["last_hash"] if trusted else GENESIS_HASH
+        expected_index = after + 1
+        errors: List[str] = []
+        window: List[bytes] = []
+        newest = trusted
+        events = 0
+        # Only lines written before chaining was enabled may lack a link.
+        chained = trusted is not None
+        if trusted and not any(seq == trusted["segment"] for seq, _ in files):
+            errors.append(f"trusted checkpoint segment {trusted['segment']} is missing")
+        for seq, path in files:
+            if trusted and seq < trusted["segment"]:
+                continue
+            if not os.path.exists(path):
+                if path != self.path:
+                    errors.append(f"segment {seq} is listed in the manifest but missing")
+                continue
+            with (gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")) as fh:
+                if trusted and seq == trusted["segment"]:
+                    fh.seek(trusted["end_offset"])
+                for raw in fh:
+                    if not raw.endswith(b"\n"):
+                        break
+                    body, link = _split_chain(raw)
+                    if link is None:
+                        if chained:
+                            errors.append(
+                                f"unchained line after entry #{expected_index - 1} "
+                                "(inserted, or chain suffix stripped)"
+                            )
+                        continue
+                    chained = True
+                    index = link["index"]
+                    if index != expected_index:
+                        errors.append(f"expected entry #{expected_index}, found #{index}")
+                    if link["prev"] != expected_prev:
+                        errors.append(f"entry #{index} does not link to the previous entry")
+                    if _event_hash(link["prev"], body) != link["hash"]:
+                        errors.append(f"entry #{index} content does not match its hash")
+                    expected_prev = link["hash"]
+                    expected_index = index + 1
+                    window.append(bytes.fromhex(link["hash"]))
+                    events += 1
+                    cp = pending.pop(index, None)
+                    if cp is not None:
+                        if cp["root"] != _merkle_root(window) or cp["last_hash"] != link["hash"]:
+                            errors.append(f"checkpoint ending at #{index} does not match the entries")
+                        elif key and not hmac.compare_digest(_sign(cp, key) or "", cp.get("sig") or ""):
+                            errors.append(f"checkpoint ending at #{index} has an invalid signature")
+                        else:
+                            newest = cp
+                        window = []
+        for index in sorted(pending):
+            errors.append(f"checkpoint ending at #{index} refers to missing entries")
+        return {"ok": not errors, "events": events, "errors": errors, "checkpoint": newest}
+
+    # Reading ---------------------------------------------------------------
+
+    @staticmethod
+    def _open_read(path: str) -> IO[str]:
+        if path.endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8")
+        return open(path, "r", encoding="utf-8")
+
+    def _read_file(self, path: str) -> Iterator[AuditEntry]:
+        with self._open_read(path) as fh:
             for raw in fh:
-                data = json.loads(raw)
-                results.append(
-                    AuditEntry(
-                        proposal_id=data["proposal_id"],
-                        trace_id=data["trace_id"],
-                        stage=data["stage"],
-                        payload=data.get("payload", {}),
-                        timestamp=float(data["timestamp"]),
-                    )
-                )
-        return results
+                if not raw.endswith("\n"):
+                    break  # partially written line from a concurrent append
+                if raw.strip():
+                    yield _entry_from_json(json.loads(raw))
+
+    def _files(self, since: Optional[float], until: Optional[float]) -> list[str]:
+        """Segment files overlapping [since, until], oldest first; active file last."""
+        base = os.path.dirname(self.path)
+        files: list[str] = []
+        for segment in self.manifest()["segments"]:
+            if since is not None and segment["last_ts"] is not None and segment["last_ts"] < since:
+                continue
+            if until is not None and segment["first_ts"] is not None and segment["first_ts"] > until:
+                continue
+            path = os.path.join(base, segment["file"])
+            if not os.path.exists(path) and os.path.exists(path + ".gz"):
+                path += ".gz"  # compressed since the manifest was read
+            files.append(path)
+        if os.path.exists(self.path):
+            files.append(self.path)
+        return files
+
+    def iter_entries(
+        self,
+        stage: Optional[str] = None,
+        proposal_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Iterator[AuditEntry]:
+        """Stream matching entries oldest-first in O(1) memory."""
+        for path in self._files(since, until):
+            for entry in self._read_file(path):
+                if _matches(entry, stage, proposal_id, since, until):
+                    yield entry
+
+    def entries(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        stage: Optional[str] = None,
+        proposal_id: Optional[str] = None,
+    ) -> list[AuditEntry]:
+        return list(self.iter_entries(stage, proposal_id, since, until))
+
+    def tail(
+        self,
+        n: int,
+        stage: Optional[str] = None,
+        proposal_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> list[AuditEntry]:
+        """
+        The newest ``n`` matching entries, oldest first.
+
+        Scans backwards from the end of the log (mmap + reverse newline
+        search), so cost depends on how far back the matches are, not on
+        the size of the log.
+        """
+        found: list[AuditEntry] = []
+        if n <= 0:
+            return found
+        for path in reversed(self._files(since, until)):
+            for raw in _reverse_lines(path):
+                entry = _entry_from_json(json.loads(raw))
+                if since is not None and entry.timestamp < since:
+                    # Entries are appended in time order: nothing older matches.
+                    return found[::-1]
+                if _matches(entry, stage, proposal_id, since, until):
+                    found.append(entry)
+                    if len(found) == n:
+                        return found[::-1]
+        return found[::-1]
+
+    def follow(
+        self,
+        from_start: bool = False,
+        poll_interval: float = 0.25,
+        stop: Optional[threading.Event] = None,
+        stage: Optional[str] = None,
+        proposal_id: Optional[str] = None,
+    ) -> Iterator[AuditEntry]:
+        """
+        Yield entries as they are appended (like ``tail -f``).
+
+        Starts at the current end of the log unless ``from_start``.  Follows
+        the active file across rotations.  Runs until ``stop`` is set or the
+        consumer stops iterating.
+        """
+        fh: Optional[IO[bytes]] = None
+        buffer = b""
+        try:
+            while stop is None or not stop.is_set():
+                if fh is None:
+                    try:
+                        fh = open(self.path, "rb")
+                    except FileNotFoundError:
+                        from_start = True  # everything written later is new
+                        time.sleep(poll_interval)
+                        continue
+                    if not from_start:
+                        fh.seek(0, os.SEEK_END)
+                    from_start = True  # files opened after a rotation start at 0
+                rotated = _rotated(self.path, fh)
+                # Read after the rotation check so lines appended just before
+                # the old file was sealed are not lost.
+                chunk = fh.read()
+                if chunk:
+                    buffer += chunk
+                    *lines, buffer = buffer.split(b"\n")
+                    for raw in lines:
+                        if raw.strip():
+                            entry = _entry_from_json(json.loads(raw))
+                            if _matches(entry, stage, proposal_id, None, None):
+                                yield entry
+                if rotated:
+                    fh.close()
+                    fh = None
+                    buffer = b""
+                elif not chunk:
+                    time.sleep(poll_interval)
+        finally:
+            if fh is not None:
+                fh.close()
+
+
+def _matches(
+    entry: AuditEntry,
+    stage: Optional[str],
+    proposal_id: Optional[str],
+    since: Optional[float],
+    until: Optional[float],
+) -> bool:
+    if stage is not None and entry.stage != stage:
+        return False
+    if proposal_id is not None and entry.proposal_id != proposal_id:
+        return False
+    if since is not None and entry.timestamp < since:
+        return False
+    if until is not None and entry.timestamp > until:
+        return False
+    return True
+
+
+def _event_hash(prev_hex: str, body: bytes) -> str:
+    return hashlib.sha256(bytes.fromhex(prev_hex) + body).hexdigest()
+
+
+def _split_chain(raw: bytes) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+    """(line without the chain object, chain) — chain is None if unchained."""
+    raw = raw.rstrip(b"\r\n")
+    marker = _CHAIN_MARKER.encode("utf-8")
+    cut = raw.rfind(marker)
+    if cut < 0:
+        return raw, None
+    try:
+        link = json.loads(raw[cut + len(marker):-1])
+    except ValueError:
+        return raw, None
+    if not isinstance(link, dict) or "hash" not in link:
+        return raw, None
+    return raw[:cut] + b"}", link
+
+
+def _merkle_root(leaves: List[bytes]) -> str:
+    if not leaves:
+        return GENESIS_HASH
+    level = leaves
+    while len(level) > 1:
+        if len(level) % 2:
+            level = level + [level[-1]]
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def _sign(checkpoint: Dict[str, Any], key: Optional[bytes]) -> Optional[str]:
+    if not key:
+        return None
+    unsigned = {k: v for k, v in checkpoint.items() if k != "sig"}
+    message = json.dumps(unsigned, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hmac.new(key, message, hashlib.sha256).hexdigest()
+
+
+def _reverse_lines(path: str) -> Iterator[bytes]:
+    """Complete, non-empty lines of ``path`` from last to first."""
+    if path.endswith(".gz"):
+        # Sealed segments are bounded in size; decompress and walk backwards.
+        with gzip.open(path, "rb") as gz:
+            data = gz.read()
+        for raw in reversed(data.splitlines()):
+            if raw.strip():
+                yield raw
+        return
+    with open(path, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Ignore a trailing partial line from an in-flight append.
+            end = mm.rfind(b"\n", 0, size)
+            while end > 0:
+                start = mm.rfind(b"\n", 0, end) + 1
+                raw = mm[start:end]
+                if raw.strip():
+                    yield raw
+                end = start - 1
+
+
+def _rotated(path: str, fh: IO[bytes]) -> bool:
+    """True once ``path`` names a different file than the one we hold open."""
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return False
+    held = os.fstat(fh.fileno())
+    return (current.st_ino, current.st_dev) != (held.st_ino, held.st_dev)
 
 
 def now_ts() -> float:
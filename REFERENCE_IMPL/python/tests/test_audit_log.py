@@ -0,0 +1,183 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Ensure local imports resolve when running via pytest from repo root
+MODULE_DIR = Path(__file__).resolve().parent.parent
+if str(MODULE_DIR) not in sys.path:
+    sys.path.insert(0, str(MODULE_DIR))
+
+from audit_log import AuditEntry, AuditLog  # noqa: E402
+
+
+def _entry(n: int, ts: float) -> AuditEntry:
+    return AuditEntry(f"pl-{n}", f"tr-{n}", "propose", {"n": n}, ts)
+
+
+class SegmentedAuditLogTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "audit.jsonl")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_unsegmented_log_is_single_file(self) -> None:
+        log = AuditLog(self.path)
+        for n in range(3):
+            log.append(_entry(n, 1000.0 + n))
+        self.assertEqual([e.payload["n"] for e in log.entries()], [0, 1, 2])
+        self.assertFalse(os.path.exists(log.manifest_path))
+
+    def test_size_rotation_compresses_and_reads_back(self) -> None:
+        log = AuditLog(self.path, max_segment_bytes=300)
+        for n in range(20):
+            log.append(_entry(n, 1000.0 + n))
+        log.close()
+        segments = log.manifest()["segments"]
+        self.assertGreater(len(segments), 1)
+        self.assertTrue(all(s["file"].endswith(".jsonl.gz") for s in segments))
+        self.assertEqual(segments[0]["first_proposal_id"], "pl-0")
+        self.assertEqual([e.payload["n"] for e in log.entries()], list(range(20)))
+
+    def test_time_range_skips_sealed_segments(self) -> None:
+        log = AuditLog(self.path, max_segment_age_seconds=10)
+        for n in range(6):
+            log.append(_entry(n, 1000.0 + n * 10))
+        log.close()
+        self.assertEqual(len(log.manifest()["segments"]), 5)
+        opened = list(log._files(since=1025.0, until=1035.0))
+        self.assertEqual(len(opened), 1 + 1)  # one sealed segment + the active file
+        self.assertEqual([e.payload["n"] for e in log.entries(since=1025.0, until=1035.0)], [3])
+
+
+class ChainedAuditLogTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "audit.jsonl")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_chain_verifies_across_rotation_and_restart(self) -> None:
+        log = AuditLog(self.path, max_segment_bytes=600, chain=True, checkpoint_every=4, checkpoint_key=b"k")
+        for n in range(10):
+            log.append(_entry(n, 1000.0 + n))
+        log.close()
+        # A fresh instance picks the chain up from the tail of the log.
+        log = AuditLog(self.path, max_segment_bytes=600, chain=True, checkpoint_every=4, checkpoint_key=b"k")
+        for n in range(10, 20):
+            log.append(_entry(n, 1000.0 + n))
+        log.close()
+        report = log.verify(key=b"k")
+        self.assertTrue(report["ok"], report["errors"])
+        self.assertEqual(report["events"], 20)
+        self.assertEqual([e.payload["n"] for e in log.entries()], list(range(20)))
+        self.assertFalse(log.verify(key=b"wrong")["ok"])
+
+    def test_tampering_is_detected(self) -> None:
+        log = AuditLog(self.path, chain=True, checkpoint_every=3)
+        for n in range(5):
+            log.append(_entry(n, 1000.0 + n))
+        with open(self.path, "r", encoding="utf-8") as fh:
+            lines = fh.readlines()
+        lines[1] = lines[1].replace('"n":1', '"n":7')
+        with open(self.path, "w", encoding="utf-8") as fh:
+            fh.writelines(lines)
+        report = log.verify()
+        self.assertFalse(report["ok"])
+        self.assertIn("entry #1 content does not match its hash", report["errors"])
+
+    def test_unchained_line_after_chained_entries_is_rejected(self) -> None:
+        log = AuditLog(self.path, chain=True, checkpoint_every=3)
+        for n in range(5):
+            log.append(_entry(n, 1000.0 + n))
+        with open(self.path, "r", encoding="utf-8") as fh:
+            lines = fh.readlines()
+        forged = lines[2].split(',"chain":')[0] + "}\n"
+        with open(self.path, "w", encoding="utf-8") as fh:
+            fh.writelines(lines[:3] + [forged] + lines[3:])
+        report = log.verify()
+        self.assertFalse(report["ok"])
+        self.assertTrue(any("unchained line after entry #2" in e for e in report["errors"]))
+
+    def test_trusted_checkpoint_limits_work_to_new_entries(self) -> None:
+        log = AuditLog(self.path, chain=True, checkpoint_every=5)
+        for n in range(10):
+            log.append(_entry(n, 1000.0 + n))
+        first = log.verify()
+        self.assertEqual(first["checkpoint"]["last_index"], 9)
+        for n in range(10, 13):
+            log.append(_entry(n, 1000.0 + n))
+        second = log.verify(trusted=first["checkpoint"])
+        self.assertTrue(second["ok"], second["errors"])
+        self.assertEqual(second["events"], 3)
+
+
+class AuditLogReaderTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "audit.jsonl")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _fill(self, log: AuditLog, count: int) -> None:
+        stages = ("propose", "decision", "execute")
+        for n in range(count):
+            log.append(AuditEntry(f"pl-{n % 4}", f"tr-{n}", stages[n % 3], {"n": n}, 1000.0 + n))
+
+    def test_iter_entries_filters(self) -> None:
+        log = AuditLog(self.path)
+        self._fill(log, 30)
+        decisions = list(log.iter_entries(stage="decision", proposal_id="pl-1", since=1005.0))
+        self.assertEqual([e.payload["n"] for e in decisions], [13, 25])
+
+    def test_tail_reads_backwards_across_segments(self) -> None:
+        log = AuditLog(self.path, max_segment_bytes=400)
+        self._fill(log, 40)
+        log.close()
+        self.assertGreater(len(log.manifest()["segments"]), 2)
+        self.assertEqual([e.payload["n"] for e in log.tail(5)], [35, 36, 37, 38, 39])
+        executes = log.tail(3, stage="execute")
+        self.assertEqual([e.payload["n"] for e in executes], [32, 35, 38])
+        self.assertEqual([e.payload["n"] for e in log.tail(100, since=1036.0)], [36, 37, 38, 39])
+        self.assertEqual(len(log.tail(1000)), 40)
+
+    def test_tail_ignores_partial_trailing_line(self) -> None:
+        log = AuditLog(self.path)
+        self._fill(log, 3)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write('{"proposal_id": "pl-9", "trace')
+        self.assertEqual([e.payload["n"] for e in log.tail(2)], [1, 2])
+
+    def test_follow_yields_new_entries_across_rotation(self) -> None:
+        log = AuditLog(self.path, max_segment_bytes=300, compress=False)
+        self._fill(log, 2)  # existing entries are not replayed
+        stop = threading.Event()
+        seen: list[int] = []
+
+        def consume() -> None:
+            for entry in log.follow(poll_interval=0.01, stop=stop):
+                seen.append(entry.payload["n"])
+                if len(seen) == 10:
+                    stop.set()
+
+        reader = threading.Thread(target=consume)
+        reader.start()
+        time.sleep(0.05)
+        for n in range(100, 110):
+            log.append(AuditEntry("pl-x", "tr-x", "execute", {"n": n}, 2000.0 + n))
+            time.sleep(0.005)
+        reader.join(timeout=5)
+        stop.set()
+        self.assertEqual(seen, list(range(100, 110)))
+        self.assertGreater(len(log.manifest()["segments"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: SPEC metrics via a json.loads loop vs the columnar engine.
+
+Run from repository root:
+    python core/shammash/bench/bench_audit_metrics.py [--proposals N]
+
+Writes N denied/allowed proposals (3 audit events each) as sealed segments,
+then reports the time for a plain json.loads pass, a cold columnar run
+(parse + cache) and a warm run (cached .npz only, the monthly-report case).
+Requires numpy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from core.shammash.src.audit_metrics import compute_metrics, load_columns  # noqa: E402
+from core.shammash.src.audit_segments import (  # noqa: E402
+    AuditRecord,
+    SegmentedAuditWriter,
+    iter_audit_events,
+)
+
+_DENY_RULES = ["law.v1.entity_not_allowlisted", "law.v1.action_not_allowed", "law.v1.blast_radius_exceeded"]
+
+
+def _event(event_type: str, ts: datetime, request_id: str, proposal_id: str, payload: dict) -> AuditRecord:
+    timestamp = ts.isoformat()
+    line = json.dumps({
+        "schema_version": "v1",
+        "event_id": str(uuid.uuid4()),
+        "timestamp": timestamp,
+        "service": "shammash",
+        "event_type": event_type,
+        "correlation": {"request_id": request_id, "proposal_id": proposal_id},
+        "payload": payload,
+    }) + "\n"
+    return AuditRecord(line, timestamp, event_type, request_id, proposal_id)
+
+
+def write_log(path: Path, proposals: int) -> None:
+    writer = SegmentedAuditWriter(path, max_bytes=16 * 1024 * 1024, compression="none")
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    batch: list[AuditRecord] = []
+    for i in range(proposals):
+        ts = start + timedelta(seconds=i * 10)
+        rid, pid = str(uuid.uuid4()), str(uuid.uuid4())
+        allowed = i % 3 != 0
+        basis = ["law.v1.allowlist_match"] if allowed else ["law.v1.default_deny", _DENY_RULES[i % 3]]
+        batch.append(_event("execution_proposal.in", ts, rid, pid,
+                            {"action": {"target": {"entity_id": f"light.lamp_{i % 50}"}}}))
+        batch.append(_event("law_decision", ts + timedelta(milliseconds=3), rid, pid,
+                            {"allowed": allowed, "policy_basis": basis}))
+        batch.append(_event("execution_receipt.out", ts + timedelta(milliseconds=900), rid, pid, {
+            "decision": "allowed" if allowed else "denied",
+            "policy_basis": basis,
+            "action_taken": {"entity_id": f"light.lamp_{i % 50}"} if allowed else None,
+            "verification": {"pass": allowed and i % 20 != 1},
+        }))
+        if len(batch) >= 3000:
+            writer.write(batch)
+            batch = []
+    writer.write(batch)
+    writer.rotate()
+    writer.close()
+
+
+def naive_metrics(path: Path) -> dict:
+    """What a json.loads loop has to do for the same numbers."""
+    decisions = approved = 0
+    reasons: Counter = Counter()
+    proposed: dict[str, datetime] = {}
+    waits: list[float] = []
+    for event in iter_audit_events(path):
+        pid = event["correlation"].get("proposal_id")
+        ts = datetime.fromisoformat(event["timestamp"])
+        if event["event_type"] == "execution_proposal.in":
+            proposed[pid] = ts
+        elif event["event_type"] == "law_decision":
+            decisions += 1
+            if event["payload"]["allowed"]:
+                approved += 1
+            else:
+                reasons[event["payload"]["policy_basis"][-1]] += 1
+            if pid in proposed:
+                waits.append((ts - proposed[pid]).total_seconds())
+    return {"approval_rate": approved / decisions, "top": reasons.most_common(10)}
+
+
+def _timed(label: str, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    print(f"{label:<28} {time.perf_counter() - start:8.3f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--proposals", type=int, default=200_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "events.jsonl"
+        write_log(path, args.proposals)
+        print(f"== {args.proposals * 3} events ==")
+        _timed("json.loads loop", lambda: naive_metrics(path))
+        _timed("columnar (cold, builds cache)", lambda: compute_metrics(load_columns(path), by="month"))
+        _timed("columnar (warm cache)", lambda: compute_metrics(load_columns(path), by="month"))
+
+
+if __name__ == "__main__":
+    main()
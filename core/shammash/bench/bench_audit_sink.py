@@ -0,0 +1,203 @@
+"""
+Benchmark: direct per-event audit appends vs the group-commit AuditSink.
+
+Run from repository root:
+    python core/shammash/bench/bench_audit_sink.py [--events N] [--requests N]
+
+Reports raw events/sec for each durability mode and p50/p99 latency of
+POST /execute/proposal (denied path: 3 audit events per request) with the
+pre-sink open/write/close append ("before"), the synchronous segmented
+fallback writer used when no sink runs, and the sink ("after").  No Home
+Assistant needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import httpx  # noqa: E402
+
+import core.shammash.src.app as app_module  # noqa: E402
+from core.shammash.src.audit_segments import AuditRecord, SegmentedAuditWriter  # noqa: E402
+from core.shammash.src.audit_sink import DURABILITY_MODES, AuditSink  # noqa: E402
+
+
+def _record(i: int) -> AuditRecord:
+    timestamp = datetime.now(timezone.utc).isoformat()
+    line = json.dumps({
+        "schema_version": "v1",
+        "event_id": str(uuid.uuid4()),
+        "timestamp": timestamp,
+        "event_type": "law_decision",
+        "payload": {"n": i, "policy_basis": ["law.v1.default_deny"]},
+    }) + "\n"
+    return AuditRecord(line=line, timestamp=timestamp, event_type="law_decision")
+
+
+def _legacy_append(path: Path, line: str, fsync: bool) -> None:
+    """The pre-sink append_audit_event: open, write, flush, close."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
+
+def bench_raw(n_events: int, workdir: Path) -> None:
+    records = [_record(i) for i in range(n_events)]
+    print(f"\n== raw append throughput ({n_events} events) ==")
+
+    for fsync in (False, True):
+        path = workdir / f"legacy-{fsync}.jsonl"
+        count = n_events if not fsync else min(n_events, 2000)
+        start = time.perf_counter()
+        for record in records[:count]:
+            _legacy_append(path, record.line, fsync)
+        elapsed = time.perf_counter() - start
+        label = "legacy open/write/close" + (" + fsync" if fsync else "")
+        print(f"  {label:<34} {count / elapsed:>12,.0f} events/s")
+
+    for mode in DURABILITY_MODES:
+        path = workdir / f"sink-{mode}.jsonl"
+        count = n_events if mode != "fsync-per-event" else min(n_events, 2000)
+        sink = AuditSink(SegmentedAuditWriter(path), durability=mode)
+        sink.start()
+        start = time.perf_counter()
+        for record in records[:count]:
+            sink.submit(record)
+        sink.close()
+        elapsed = time.perf_counter() - start
+        print(
+            f"  sink durability={mode:<17} {count / elapsed:>12,.0f} events/s"
+            f"  (batches={sink.batches_written}, largest={sink.largest_batch})"
+        )
+
+
+def _proposal() -> dict:
+    return {
+        "schema_version": "v1",
+        "proposal_id": str(uuid.uuid4()),
+        "request_id": str(uuid.uuid4()),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "source": {"service": "bench", "instance": "bench-1"},
+        "action": {
+            "domain": "home_assistant",
+            "type": "toggle_entity",
+            "target": {"entity_id": "light.not_allowlisted"},
+            "parameters": {},
+            "metadata": {"reversibility": "reversible", "blast_radius": "single_device"},
+            "expected_outcome": {
+                "verify": {
+                    "entity_id": "light.not_allowlisted",
+                    "attribute": "state",
+                    "equals": "on",
+                },
+                "timeout_seconds": 5,
+            },
+        },
+        "justification": "benchmark",
+    }
+
+
+async def _drive(n_requests: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app_module.app)
+    # Install the HA transport as lifespan would, so the numbers measure
+    # audit cost rather than client construction.
+    app_module._ha_transport = app_module._new_transport()
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one() -> None:
+            async with sem:
+                start = time.perf_counter()
+                resp = await client.post("/execute/proposal", json=_proposal())
+                latencies.append(time.perf_counter() - start)
+                assert resp.status_code == 200, resp.text
+
+        await asyncio.gather(*(one() for _ in range(n_requests)))
+    await app_module._ha_transport.aclose()
+    app_module._ha_transport = None
+    return latencies
+
+
+def _report(label: str, latencies: list[float], wall: float) -> None:
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"  {label:<34} {len(latencies) / wall:>8,.0f} req/s  "
+        f"p50={statistics.median(ordered) * 1000:6.2f} ms  p99={p99 * 1000:6.2f} ms"
+    )
+
+
+def bench_requests(n_requests: int, concurrency: int, durability: str, workdir: Path) -> None:
+    print(
+        f"\n== POST /execute/proposal ({n_requests} denied requests, "
+        f"concurrency={concurrency}, durability={durability}) =="
+    )
+    app_module.HA_TOKEN = app_module.HA_TOKEN or "bench-token"
+
+    # Before: the original append_audit_event — open/write/close per event
+    # on the event loop, bypassing the segmented writer entirely.
+    before_path = workdir / "before.jsonl"
+    fsync = durability.startswith("fsync")
+    sink_append = app_module.append_audit_event
+    app_module.append_audit_event = lambda event: _legacy_append(
+        before_path, event.model_dump_json() + "\n", fsync
+    )
+    app_module._audit_sink = None
+    try:
+        start = time.perf_counter()
+        latencies = asyncio.run(_drive(n_requests, concurrency))
+        _report("before (open/write/close)", latencies, time.perf_counter() - start)
+    finally:
+        app_module.append_audit_event = sink_append
+
+    # Fallback: no sink, synchronous segmented writer (tests, scripts).
+    app_module.AUDIT_JSONL_PATH = workdir / "fallback.jsonl"
+    start = time.perf_counter()
+    latencies = asyncio.run(_drive(n_requests, concurrency))
+    _report("fallback (segmented, no sink)", latencies, time.perf_counter() - start)
+
+    # After: group-commit sink.
+    app_module.AUDIT_JSONL_PATH = workdir / "after.jsonl"
+    sink = AuditSink(SegmentedAuditWriter(app_module.AUDIT_JSONL_PATH), durability=durability)
+    sink.start()
+    app_module._audit_sink = sink
+    start = time.perf_counter()
+    latencies = asyncio.run(_drive(n_requests, concurrency))
+    _report("after (AuditSink)", latencies, time.perf_counter() - start)
+    app_module._audit_sink = None
+    sink.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--durability", choices=DURABILITY_MODES, default="flush")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        bench_raw(args.events, workdir)
+        bench_requests(args.requests, args.concurrency, args.durability, workdir)
+
+
+if __name__ == "__main__":
+    main()
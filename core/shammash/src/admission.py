@@ -0,0 +1,203 @@
+"""
+Admission control for Shammash executions.
+
+At most ``max_in_flight`` proposals execute at once (0 = unlimited).
+Beyond that, proposals wait in a bounded FIFO queue per source
+(``<service>/<instance>``) inside one of three priority lanes:
+
+  * ``urgent`` — always served first;
+  * ``normal``;
+  * ``bulk``  — served only when no urgent or normal proposal waits.
+
+Within a lane, sources take turns (round robin), so one chatty agent
+cannot starve the others.  A proposal whose source already has
+``max_queue_per_source`` waiting is rejected at once with
+AdmissionRejected, whose ``retry_after`` estimates when a slot frees up
+from the recent mean execution time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Any, Callable, NamedTuple, Optional
+
+LANES = ("urgent", "normal", "bulk")  # highest priority first
+_LATENCY_WINDOW = 1024
+_EWMA_ALPHA = 0.1
+
+
+class AdmissionRejected(Exception):
+    """The source's queue is full."""
+
+    def __init__(self, retry_after: float, reason: str) -> None:
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(reason)
+
+
+class Admission(NamedTuple):
+    """A held execution slot."""
+    lane: str
+    source: str
+    depth: int  # proposals queued ahead on arrival (all lanes)
+    wait_seconds: float
+    admitted_at: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "lane": self.lane,
+            "depth": self.depth,
+            "wait_ms": round(self.wait_seconds * 1000, 3),
+        }
+
+
+class AdmissionController:
+    """Single event loop only.  Every acquire() must be paired with release()."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 64,
+        max_queue_per_source: int = 32,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_in_flight = max(0, int(max_in_flight))
+        self.max_queue_per_source = max(0, int(max_queue_per_source))
+        self._clock = clock
+        self._in_flight = 0
+        # lane -> source -> waiters; a source moves to the back after each turn.
+        self._lanes: dict[str, OrderedDict[str, deque[asyncio.Future]]] = {
+            lane: OrderedDict() for lane in LANES
+        }
+        self._queued_by_source: Counter = Counter()
+        self._queued = 0
+        self._mean_hold: Optional[float] = None
+        self._waits: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        # Counters — monotonic ints, read without locking.
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = 0
+        self.peak_queued = 0
+
+    # -- slots --------------------------------------------------------------
+
+    def _has_slot(self) -> bool:
+        return not self.max_in_flight or self._in_flight < self.max_in_flight
+
+    async def acquire(self, source: str, lane: str = "normal") -> Admission:
+        """Wait for an execution slot, or raise AdmissionRejected."""
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+        started = self._clock()
+        depth = self._queued
+        if self._has_slot() and not depth:
+            self._in_flight += 1
+            return self._admit(lane, source, 0, started)
+        if self._queued_by_source[source] >= self.max_queue_per_source:
+            self.rejected += 1
+            raise AdmissionRejected(
+                self.retry_after(),
+                f"{self._queued_by_source[source]} proposals from {source} already queued",
+            )
+        waiter = asyncio.get_running_loop().create_future()
+        self._lanes[lane].setdefault(source, deque()).append(waiter)
+        self._queued_by_source[source] += 1
+        self._queued += 1
+        self.peak_queued = max(self.peak_queued, self._queued)
+        try:
+            await waiter  # release() hands the slot over by resolving it
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._free_slot()  # handed over just as we were cancelled
+            else:
+                self._forget(lane, source, waiter)
+            raise
+        self.waited += 1
+        return self._admit(lane, source, depth, started)
+
+    def _admit(self, lane: str, source: str, depth: int, started: float) -> Admission:
+        now = self._clock()
+        self.admitted += 1
+        self._waits.append(now - started)
+        return Admission(lane, source, depth, now - started, now)
+
+    def release(self, admission: Admission) -> None:
+        held = self._clock() - admission.admitted_at
+        self._mean_hold = (
+            held if self._mean_hold is None
+            else self._mean_hold + _EWMA_ALPHA * (held - self._mean_hold)
+        )
+        self._free_slot()
+
+    def _free_slot(self) -> None:
+        self._in_flight -= 1
+        while self._has_slot():
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    # -- queues -------------------------------------------------------------
+
+    def _dequeued(self, source: str) -> None:
+        self._queued -= 1
+        self._queued_by_source[source] -= 1
+        if not self._queued_by_source[source]:
+            del self._queued_by_source[source]
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for lane in LANES:
+            sources = self._lanes[lane]
+            while sources:
+                source, waiters = next(iter(sources.items()))
+                waiter = waiters.popleft()
+                self._dequeued(source)
+                if waiters:
+                    sources.move_to_end(source)  # next source's turn
+                else:
+                    del sources[source]
+                if not waiter.done():
+                    return waiter
+        return None
+
+    def _forget(self, lane: str, source: str, waiter: asyncio.Future) -> None:
+        waiters = self._lanes[lane].get(source)
+        if waiters is None or waiter not in waiters:
+            return  # already dequeued by _next_waiter
+        waiters.remove(waiter)
+        if not waiters:
+            del self._lanes[lane][source]
+        self._dequeued(source)
+
+    def retry_after(self) -> float:
+        """Rough seconds until a newly queued proposal would be admitted."""
+        mean = self._mean_hold if self._mean_hold is not None else 1.0
+        slots = self.max_in_flight or 1
+        return max(1.0, math.ceil(mean * (self._queued + 1) / slots))
+
+    def stats(self) -> dict[str, Any]:
+        ordered = sorted(self._waits)
+
+        def ms(q: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 3)
+
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_queue_per_source": self.max_queue_per_source,
+            "queued": {
+                lane: sum(len(w) for w in sources.values()) for lane, sources in self._lanes.items()
+            },
+            "queued_sources": len(self._queued_by_source),
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "mean_hold_seconds": round(self._mean_hold, 3) if self._mean_hold is not None else None,
+            "wait_p50_ms": ms(0.5),
+            "wait_p99_ms": ms(0.99),
+        }
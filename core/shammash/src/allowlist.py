@@ -0,0 +1,119 @@
+"""
+Entity allowlist with wildcard patterns and per-entity overrides.
+
+``allow_entities`` entries (policy YAML or SHAMMASH_ALLOWLIST) are one of::
+
+    light.test_lamp              # exact entity
+    light.*                      # whole domain
+    light.kitchen_*              # prefix glob
+    {entity: "cover.garage_*", max_blast_radius: single_device, max_timeout_seconds: 30}
+
+``*`` is only allowed as the last character.  Exact entries live in a dict;
+globs are compiled into a character trie keyed by their prefix, so a lookup
+is one hash plus one walk over ``entity_id`` — O(len(entity_id)) however many
+rules there are.  The most specific rule wins: an exact entry, else the
+longest matching prefix.  Overrides on the winning rule replace the policy
+caps for that entity.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Iterable, NamedTuple, Optional, Union
+
+_EXACT_RE = re.compile(r"^[a-z0-9_]+\.[a-z0-9_]+$")
+_GLOB_RE = re.compile(r"^[a-z0-9_]+\.[a-z0-9_]*\*$")
+
+# Trie node slot holding the rule that ends at this prefix.
+_RULE = ""
+
+
+class AllowRule(NamedTuple):
+    pattern: str
+    max_blast_radius: Optional[str] = None
+    max_timeout_seconds: Optional[float] = None
+
+    @property
+    def is_glob(self) -> bool:
+        return self.pattern.endswith("*")
+
+    def to_entry(self) -> Union[str, dict[str, Any]]:
+        """Inverse of parse_allow_entry (for hashing/reporting)."""
+        if self.max_blast_radius is None and self.max_timeout_seconds is None:
+            return self.pattern
+        entry: dict[str, Any] = {"entity": self.pattern}
+        if self.max_blast_radius is not None:
+            entry["max_blast_radius"] = self.max_blast_radius
+        if self.max_timeout_seconds is not None:
+            entry["max_timeout_seconds"] = self.max_timeout_seconds
+        return entry
+
+
+def parse_allow_entry(entry: Any) -> AllowRule:
+    """A string or ``{entity: ..., overrides}`` mapping → AllowRule; ValueError if invalid."""
+    if isinstance(entry, AllowRule):
+        return entry
+    overrides: dict[str, Any] = {}
+    if isinstance(entry, dict):
+        unknown = set(entry) - {"entity", "max_blast_radius", "max_timeout_seconds"}
+        if unknown:
+            raise ValueError(f"allow_entities entry has unknown keys: {sorted(unknown)}")
+        overrides = entry
+        entry = entry.get("entity")
+    if not isinstance(entry, str):
+        raise ValueError(f"allow_entities entry must be a string or mapping with 'entity': {entry!r}")
+    if not (_EXACT_RE.match(entry) or _GLOB_RE.match(entry)):
+        raise ValueError(
+            f"allow_entities entry '{entry}' must be 'domain.object_id', "
+            "'domain.*' or 'domain.prefix*'"
+        )
+    radius = overrides.get("max_blast_radius")
+    if radius is not None and not isinstance(radius, str):
+        raise ValueError(f"'{entry}': max_blast_radius must be a string")
+    timeout = overrides.get("max_timeout_seconds")
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+        raise ValueError(f"'{entry}': max_timeout_seconds must be a positive number")
+    return AllowRule(entry, radius, timeout)
+
+
+class AllowlistIndex:
+    """Immutable exact-match dict plus prefix trie over AllowRules."""
+
+    __slots__ = ("rules", "_exact", "_trie")
+
+    def __init__(self, entries: Iterable[Any]) -> None:
+        rules: dict[str, AllowRule] = {}
+        for entry in entries:
+            rule = parse_allow_entry(entry)
+            rules[rule.pattern] = rule  # later entries replace earlier ones
+        self.rules = tuple(sorted(rules.values(), key=lambda r: r.pattern))
+        self._exact: dict[str, AllowRule] = {}
+        self._trie: dict[str, Any] = {}
+        for rule in self.rules:
+            if not rule.is_glob:
+                self._exact[rule.pattern] = rule
+                continue
+            node = self._trie
+            for char in rule.pattern[:-1]:
+                node = node.setdefault(char, {})
+            node[_RULE] = rule
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __contains__(self, entity_id: object) -> bool:
+        return isinstance(entity_id, str) and self.match(entity_id) is not None
+
+    def match(self, entity_id: str) -> Optional[AllowRule]:
+        """The most specific rule allowing ``entity_id``, or None."""
+        rule = self._exact.get(entity_id)
+        if rule is not None:
+            return rule
+        node = self._trie
+        best = None
+        for char in entity_id:
+            node = node.get(char)
+            if node is None:
+                break
+            best = node.get(_RULE, best)
+        return best
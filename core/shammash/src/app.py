@@ -3,6 +3,10 @@ Shammash MVP — Executive Suite for the Stewardship Stack.
 
 POST /execute/proposal
   Validates proposal → Law check → HA REST call → Verify outcome → Audit → Receipt.
+POST /execute/proposals
+  The same for a batch (a scene): one Law pass, allowed proposals run concurrently.
+GET /receipts/{proposal_id}
+  A receipt after the fact — for ``Prefer: respond-async`` proposals answered 202.
 
 Only Shammash touches Home Assistant.  Everything else is advisory.
 """
@@ -10,23 +14,61 @@ Only Shammash touches Home Assistant.  Everything else is advisory.
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import hmac
 import json
+import math
 import os
 import re
+import signal
 import time
 import uuid
 import warnings
+from collections import Counter
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from enum import Enum
 from pathlib import Path
-from typing import Any, Literal, Optional, Union
-
-import yaml
+from typing import Any, AsyncIterator, Callable, Literal, Optional, Union
 
 import httpx
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field, conlist
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, conlist
+
+from .admission import Admission, AdmissionController, AdmissionRejected
+from .audit_chain import ChainState
+from .audit_index import AuditIndex
+from .audit_segments import (
+    DEFAULT_SEGMENT_MAX_BYTES,
+    AuditRecord,
+    SegmentedAuditWriter,
+)
+from .audit_sink import AuditSink
+from .audit_streams import WorkerSlot, lookup_merged
+from .circuit_breaker import OPEN as CIRCUIT_OPEN
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .entity_queue import EntityQueue
+from .ha_transport import HATransport
+from .ha_ws import HAStateStream, websocket_url, ws_connect
+from .law import LawFacts, LawOutcome
+from .policy import (
+    DEFAULT_POLICY,
+    PolicyError,
+    PolicySnapshot,
+    build_snapshot,
+    env_allowlist,
+    file_signature,
+    load_snapshot,
+)
+from .readiness import ReadinessProber
+from .receipt_store import COMPLETE as RECEIPT_COMPLETE
+from .receipt_store import PENDING as RECEIPT_PENDING
+from .receipt_store import ReceiptStore, StoredReceipt
+from .snapshot_store import SnapshotCorruptError, SnapshotStore, is_snapshot_hash, state_diff
+from .state_cache import EntityStateCache, StateRead
+from .state_poller import PollWatch, StatePoller
+from .verify_schedule import VerificationScheduler, poll_offsets
 
 
 # ---------------------------------------------------------------------------
@@ -44,77 +86,175 @@ from pydantic import BaseModel, Field, conlist
 SHAMMASH_INSTANCE = os.getenv("SHAMMASH_INSTANCE", "shammash-1")
 HA_URL = os.getenv("HA_URL", "http://ha.lan:8123").rstrip("/")
 HA_TOKEN = os.getenv("HA_TOKEN", "")
+# HA transport connection pool (per-operation timeouts live in the policy's
+# ha_transport section).  HA_HTTP2 needs h2 (pip install 'httpx[http2]').
+HA_MAX_CONNECTIONS = int(os.getenv("HA_MAX_CONNECTIONS", "20"))
+HA_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HA_MAX_KEEPALIVE_CONNECTIONS", "10"))
+HA_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HA_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HA_HTTP2 = os.getenv("HA_HTTP2", "false").lower() == "true"
+# Circuit breaker around the HA transport: opens when, over the last
+# HA_BREAKER_WINDOW_SECONDS (and at least HA_BREAKER_MIN_CALLS calls), the
+# failure rate reaches HA_BREAKER_FAILURE_RATE or the share of calls slower
+# than HA_BREAKER_SLOW_CALL_SECONDS reaches HA_BREAKER_SLOW_CALL_RATE.  While
+# open, proposals fail at once with CIRCUIT_OPEN_BASIS and a Retry-After
+# hint; after HA_BREAKER_OPEN_SECONDS one probe call decides whether it closes.
+HA_BREAKER_ENABLED = os.getenv("HA_BREAKER_ENABLED", "true").lower() != "false"
+HA_BREAKER_FAILURE_RATE = float(os.getenv("HA_BREAKER_FAILURE_RATE", "0.5"))
+HA_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("HA_BREAKER_SLOW_CALL_SECONDS", "5"))
+HA_BREAKER_SLOW_CALL_RATE = float(os.getenv("HA_BREAKER_SLOW_CALL_RATE", "0.8"))
+HA_BREAKER_MIN_CALLS = int(os.getenv("HA_BREAKER_MIN_CALLS", "5"))
+HA_BREAKER_WINDOW_SECONDS = float(os.getenv("HA_BREAKER_WINDOW_SECONDS", "30"))
+HA_BREAKER_OPEN_SECONDS = float(os.getenv("HA_BREAKER_OPEN_SECONDS", "10"))
+CIRCUIT_OPEN_BASIS = "law.v1.ha_unavailable.circuit_open"
+# Ends policy_basis of proposals answered as a no-op (policy skip_satisfied_actions).
+NO_OP_BASIS = "law.v1.no_op.already_satisfied"
+# Admission control: proposals executing at once (0 = unlimited) and proposals
+# queued per source (service/instance) beyond that before 429 + Retry-After.
+# Lanes: urgent (a safety tag below, or Priority: u=0/u=1), bulk (whole_home /
+# network_wide blast radius, or Priority: u>=5), normal otherwise.
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+ADMISSION_MAX_QUEUE_PER_SOURCE = int(os.getenv("ADMISSION_MAX_QUEUE_PER_SOURCE", "32"))
+ADMISSION_URGENT_TAGS = frozenset(
+    tag.strip() for tag in os.getenv("ADMISSION_URGENT_TAGS", "safety,security").split(",") if tag.strip()
+)
+ADMISSION_REJECTED_BASIS = "law.v1.admission.queue_full"
+# /ready serves the latest background probe of HA (GET /api/) and the audit
+# sink, refreshed this often; a result older than 3 intervals is not ready.
+READY_PROBE_INTERVAL_SECONDS = float(os.getenv("READY_PROBE_INTERVAL_SECONDS", "5"))
 AUDIT_JSONL_PATH = Path(
     os.getenv("AUDIT_JSONL_PATH", "shared/audit/events.jsonl")
 )
-
-# Verification polling
-POLL_INTERVAL_SECONDS = 1.0
-
-# Entity ID format regex for defense-in-depth (matches Pydantic pattern)
-_ENTITY_ID_RE = re.compile(r"^[a-z0-9_]+\.[a-z0-9_]+$")
-
-# Blast radius ordering — semantic levels, not string comparison
-_BLAST_RADIUS_ORDER = ["single_device", "room", "whole_home", "network_wide"]
+# Audit sink: none | flush | fsync-per-batch | fsync-per-event
+AUDIT_DURABILITY = os.getenv("AUDIT_DURABILITY", "flush")
+AUDIT_BATCH_MAX_EVENTS = int(os.getenv("AUDIT_BATCH_MAX_EVENTS", "512"))
+# Segment rotation — whichever limit is hit first seals the active segment.
+# 0 disables that limit.  Sealed segments are compressed in the background.
+AUDIT_SEGMENT_MAX_BYTES = int(
+    os.getenv("AUDIT_SEGMENT_MAX_BYTES", str(DEFAULT_SEGMENT_MAX_BYTES))
+)
+AUDIT_SEGMENT_MAX_AGE_SECONDS = float(os.getenv("AUDIT_SEGMENT_MAX_AGE_SECONDS", "0"))
+AUDIT_COMPRESSION = os.getenv("AUDIT_COMPRESSION", "gzip")  # gzip | zstd | none
+# Sidecar proposal_id / request_id / event_type index backing GET /audit
+AUDIT_INDEX_ENABLED = os.getenv("AUDIT_INDEX_ENABLED", "true").lower() != "false"
+# Tamper evidence: hash-chain every line, checkpoint every N events.
+# AUDIT_CHECKPOINT_KEY signs checkpoints (HMAC-SHA256) — treat like HA_TOKEN.
+AUDIT_HASH_CHAIN = os.getenv("AUDIT_HASH_CHAIN", "true").lower() != "false"
+AUDIT_CHECKPOINT_EVERY = int(os.getenv("AUDIT_CHECKPOINT_EVERY", "1024"))
+AUDIT_CHECKPOINT_KEY = os.getenv("AUDIT_CHECKPOINT_KEY", "")
+# Multi-worker mode: each uvicorn worker appends to its own stream
+# (events.<SHAMMASH_INSTANCE>-w<N>.jsonl); readers merge all streams.
+AUDIT_WORKER_STREAMS = os.getenv("AUDIT_WORKER_STREAMS", "false").lower() == "true"
+# Content-addressed HA state snapshots.  Audit events reference before/after
+# state by hash; RECEIPT_INLINE_STATE keeps the full dicts in HTTP receipts.
+SNAPSHOT_STORE_ENABLED = os.getenv("SNAPSHOT_STORE_ENABLED", "true").lower() != "false"
+SNAPSHOT_STORE_PATH = os.getenv("SNAPSHOT_STORE_PATH", "")  # default: <audit dir>/snapshots
+RECEIPT_INLINE_STATE = os.getenv("RECEIPT_INLINE_STATE", "true").lower() != "false"
+
+# Entity state cache (fed by WebSocket events, REST reads and a startup bulk
+# read).  Before-states may be served from it when no older than
+# STATE_CACHE_MAX_AGE_SECONDS, or at any age while the WebSocket stream keeps
+# the entry current; verification never accepts an untracked cached state.
+STATE_CACHE_ENABLED = os.getenv("STATE_CACHE_ENABLED", "true").lower() != "false"
+STATE_CACHE_MAX_ENTRIES = int(os.getenv("STATE_CACHE_MAX_ENTRIES", "2048"))
+STATE_CACHE_MAX_AGE_SECONDS = float(os.getenv("STATE_CACHE_MAX_AGE_SECONDS", "2"))
+
+# Verification polling: offsets come from the verification scheduler —
+# immediately, then VERIFY_FIRST_POLL_SECONDS apart doubling up to the
+# policy's verification.poll_interval_seconds, aimed at learned settle-time
+# quantiles once an entity or its domain has VERIFY_SCHEDULE_MIN_SAMPLES.
+VERIFY_FIRST_POLL_SECONDS = float(os.getenv("VERIFY_FIRST_POLL_SECONDS", "0.1"))
+VERIFY_SCHEDULE_MIN_SAMPLES = int(os.getenv("VERIFY_SCHEDULE_MIN_SAMPLES", "5"))
+VERIFY_SETTLE_STATS_PATH = os.getenv("VERIFY_SETTLE_STATS_PATH", "")  # default: <audit dir>/settle_times.json
+VERIFY_SETTLE_SAVE_SECONDS = 60.0
+# One background poller serves every verification's REST reads: ticks are at
+# least STATE_POLL_MIN_GAP_SECONDS apart and each fetches all due entities —
+# per entity (at most STATE_POLL_MAX_CONCURRENCY at once) below
+# STATE_POLL_BULK_THRESHOLD entities, one GET /api/states at or above it.
+STATE_POLL_MIN_GAP_SECONDS = float(os.getenv("STATE_POLL_MIN_GAP_SECONDS", "0.1"))
+STATE_POLL_BULK_THRESHOLD = int(os.getenv("STATE_POLL_BULK_THRESHOLD", "10"))
+STATE_POLL_MAX_CONCURRENCY = int(os.getenv("STATE_POLL_MAX_CONCURRENCY", "4"))
+# Push-based verification: subscribe to HA state_changed over the WebSocket
+# API; REST polling remains the fallback while the socket is down.
+HA_WEBSOCKET_ENABLED = os.getenv("HA_WEBSOCKET_ENABLED", "true").lower() != "false"
+# While waiting on pushed states, re-read over REST at least this often in
+# case an event was missed.
+HA_WEBSOCKET_RESYNC_SECONDS = 5.0
+
+
+# Policy hot reload: poll the file's mtime/size every N seconds (0 = off).
+# SIGHUP and POST /policy/reload (needs SHAMMASH_ADMIN_TOKEN) also reload.
+POLICY_PATH = Path(
+    os.getenv("SHAMMASH_POLICY_PATH", "shared/policy/v1/shammash_policy.yaml")
+)
+POLICY_WATCH_INTERVAL_SECONDS = float(os.getenv("POLICY_WATCH_INTERVAL_SECONDS", "5"))
+SHAMMASH_ADMIN_TOKEN = os.getenv("SHAMMASH_ADMIN_TOKEN", "")
+# POST /law/evaluate/batch: items per request, items per validate+evaluate chunk
+LAW_BATCH_MAX_ITEMS = int(os.getenv("LAW_BATCH_MAX_ITEMS", "100000"))
+LAW_BATCH_CHUNK_SIZE = 1024
+# POST /execute/proposals: proposals per batch, and how many of a batch's
+# allowed proposals are executed and verified at once.
+EXECUTE_BATCH_MAX_ITEMS = int(os.getenv("EXECUTE_BATCH_MAX_ITEMS", "100"))
+EXECUTE_BATCH_CONCURRENCY = int(os.getenv("EXECUTE_BATCH_CONCURRENCY", "16"))
+# Receipts kept for GET /receipts/{proposal_id}: how many, and for how long
+# after completion.  Long-polls (?wait=) are capped at RECEIPT_WAIT_MAX_SECONDS;
+# receipt event streams send a keep-alive comment every RECEIPT_SSE_KEEPALIVE_SECONDS.
+RECEIPT_STORE_MAX_ENTRIES = int(os.getenv("RECEIPT_STORE_MAX_ENTRIES", "10000"))
+RECEIPT_STORE_TTL_SECONDS = float(os.getenv("RECEIPT_STORE_TTL_SECONDS", "900"))
+RECEIPT_WAIT_MAX_SECONDS = 60.0
+RECEIPT_SSE_KEEPALIVE_SECONDS = 15.0
 
 
 # ---------------------------------------------------------------------------
-# Policy Loader — YAML parsed once at startup
+# Policy Loader — YAML parsed at startup and on reload
 # ---------------------------------------------------------------------------
 
-def _load_policy() -> dict[str, Any]:
+def _load_policy() -> PolicySnapshot:
     """
-    Load shammash_policy.yaml.  Returns a dict with defaults if the file
-    doesn't exist or can't be parsed.
+    Load shammash_policy.yaml into a snapshot.  Falls back to defaults if
+    the file doesn't exist or can't be parsed/validated.
     """
-    policy_path = Path(
-        os.getenv("SHAMMASH_POLICY_PATH", "shared/policy/v1/shammash_policy.yaml")
-    )
-    defaults: dict[str, Any] = {
-        "default_decision": "deny",
-        "allow_actions": ["toggle_entity", "turn_on", "turn_off"],
-        "allow_entities": [],
-        "enforce_target_verify_equality": True,
-        "max_blast_radius": "room",
-        "verification": {
-            "max_timeout_seconds": 60,
-            "default_timeout_seconds": 10,
-            "poll_interval_seconds": 1,
-        },
-    }
-    if not policy_path.exists():
-        return defaults
+    if not POLICY_PATH.exists():
+        return build_snapshot(DEFAULT_POLICY, allowlist=env_allowlist())
     try:
-        with open(policy_path, encoding="utf-8") as f:
-            data = yaml.safe_load(f) or {}
-        # Merge missing keys from defaults
-        for key, val in defaults.items():
-            data.setdefault(key, val)
-        return data
-    except Exception as exc:
-        warnings.warn(f"Failed to parse policy YAML ({policy_path}): {exc}")
-        return defaults
+        return load_snapshot(POLICY_PATH, allowlist=env_allowlist())
+    except PolicyError as exc:
+        warnings.warn(f"Failed to parse policy YAML ({POLICY_PATH}): {exc}")
+        return build_snapshot(DEFAULT_POLICY, allowlist=env_allowlist())
 
 
-# Load policy once at import time
-_POLICY = _load_policy()
+# The snapshot every request judges against.  Replaced as a whole by
+# _publish_policy(); never mutated.
+_policy_snapshot: PolicySnapshot
 
-# Allowed action types — from policy YAML
-ALLOWED_ACTION_TYPES: set[str] = set(_POLICY.get("allow_actions", []))
 
-# Entity allowlist — env var overrides YAML (not merged)
-_env_allowlist = os.getenv("SHAMMASH_ALLOWLIST", "").strip()
-if _env_allowlist:
-    SHAMMASH_ALLOWLIST: set[str] = set(
-        e.strip() for e in _env_allowlist.split(",") if e.strip()
-    )
-else:
-    SHAMMASH_ALLOWLIST: set[str] = set(_POLICY.get("allow_entities", []))
+def _publish_policy(snapshot: PolicySnapshot) -> None:
+    """
+    Swap in ``snapshot`` and mirror it into the legacy module globals.
+    The globals are read-only views; rebinding them changes nothing.
+    """
+    global _policy_snapshot, _POLICY
+    global ALLOWED_ACTION_TYPES, SHAMMASH_ALLOWLIST
+    global POLICY_MAX_BLAST_RADIUS, POLICY_MAX_TIMEOUT, POLICY_ENFORCE_TARGET_VERIFY
+    _policy_snapshot = snapshot
+    _POLICY = snapshot.raw
+    ALLOWED_ACTION_TYPES = snapshot.allow_actions
+    # Entity allowlist — env var overrides YAML (not merged)
+    SHAMMASH_ALLOWLIST = snapshot.allow_entities
+    POLICY_MAX_BLAST_RADIUS = snapshot.max_blast_radius
+    POLICY_MAX_TIMEOUT = snapshot.max_timeout_seconds
+    POLICY_ENFORCE_TARGET_VERIFY = snapshot.enforce_target_verify
+
+
+def _get_policy_snapshot() -> PolicySnapshot:
+    """
+    The current policy snapshot.  Take it once per request and pass it
+    down, so one proposal never sees two versions.
+    """
+    return _policy_snapshot
+
 
-# policy-level caps
-POLICY_MAX_BLAST_RADIUS: str = _POLICY.get("max_blast_radius", "room")
-POLICY_MAX_TIMEOUT: int = _POLICY.get("verification", {}).get("max_timeout_seconds", 60)
-POLICY_ENFORCE_TARGET_VERIFY: bool = _POLICY.get("enforce_target_verify_equality", True)
+# Initial policy; reloads publish a replacement snapshot
+_publish_policy(_load_policy())
 
 
 # ---------------------------------------------------------------------------
@@ -218,6 +358,9 @@ class ExecutionProposal(BaseModel):
 class Verification(BaseModel):
     pass_: bool = Field(alias="pass")
     evidence: str = Field(max_length=1500)
+    poll_schedule: Optional[list[float]] = None  # offsets (s) of the REST reads made
+    schedule_basis: Optional[Literal["entity", "domain", "default"]] = None
+    settle_seconds: Optional[float] = None
 
     model_config = {"extra": "forbid", "populate_by_name": True}
 
@@ -233,8 +376,29 @@ class ExecutionReceipt(BaseModel):
     verification: Verification
     before_state: Optional[dict[str, Any]] = None
     after_state: Optional[dict[str, Any]] = None
+    before_state_source: Optional[dict[str, Any]] = None
+    before_state_ref: Optional[str] = None
+    after_state_ref: Optional[str] = None
+    state_diff: Optional[dict[str, Any]] = None
     audit_ref: str
     failure_language_hint: Optional[str] = None
+    retry_after_seconds: Optional[float] = None
+    entity_queue: Optional[dict[str, Any]] = None  # {depth, wait_ms}
+    no_op: Optional[bool] = None  # True: already satisfied, no service call made
+    admission: Optional[dict[str, Any]] = None  # {lane, depth, wait_ms}
+
+    model_config = {"extra": "forbid"}
+
+
+class BatchReceipt(BaseModel):
+    schema_version: Literal["v1"] = "v1"
+    batch_id: str
+    timestamp: str
+    source: dict[str, str]
+    policy_version: str
+    counts: dict[str, int]  # per decision
+    duration_ms: float
+    receipts: list[ExecutionReceipt]  # in request order
 
     model_config = {"extra": "forbid"}
 
@@ -253,23 +417,79 @@ class AuditEvent(BaseModel):
 # Audit Logger — append-only JSONL
 # ---------------------------------------------------------------------------
 
+# Background group-commit writer — created in lifespan, None otherwise.
+_audit_sink: AuditSink | None = None
+# Synchronous writer used when no sink is running (tests, scripts).
+_fallback_audit_writer: SegmentedAuditWriter | None = None
+# Worker slot held for the process lifetime when AUDIT_WORKER_STREAMS is on.
+_worker_slot: WorkerSlot | None = None
+
+
 def _ensure_audit_dir() -> None:
     """Create audit directory if it doesn't exist (mkdir -p)."""
     AUDIT_JSONL_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
+def _audit_stream_path() -> Path:
+    """Where this process appends: AUDIT_JSONL_PATH or its worker stream."""
+    global _worker_slot
+    if not AUDIT_WORKER_STREAMS:
+        return AUDIT_JSONL_PATH
+    slot = _worker_slot
+    if slot is None or slot.path != AUDIT_JSONL_PATH or slot.instance != SHAMMASH_INSTANCE:
+        if slot is not None:
+            slot.release()
+        slot = _worker_slot = WorkerSlot(AUDIT_JSONL_PATH, SHAMMASH_INSTANCE)
+    return slot.stream_path
+
+
+def _new_audit_writer() -> SegmentedAuditWriter:
+    path = _audit_stream_path()
+    return SegmentedAuditWriter(
+        path,
+        max_bytes=AUDIT_SEGMENT_MAX_BYTES,
+        max_age_seconds=AUDIT_SEGMENT_MAX_AGE_SECONDS,
+        compression=AUDIT_COMPRESSION,
+        index=AuditIndex(path) if AUDIT_INDEX_ENABLED else None,
+        chain=ChainState(
+            AUDIT_CHECKPOINT_EVERY, AUDIT_CHECKPOINT_KEY.encode("utf-8") or None
+        ) if AUDIT_HASH_CHAIN else None,
+    )
+
+
+def _get_fallback_audit_writer() -> SegmentedAuditWriter:
+    """Return the synchronous writer for the current audit stream."""
+    global _fallback_audit_writer
+    writer = _fallback_audit_writer
+    if writer is None or writer.path != _audit_stream_path():
+        if writer is not None:
+            writer.close()
+        _ensure_audit_dir()
+        writer = _fallback_audit_writer = _new_audit_writer()
+    return writer
+
+
 def append_audit_event(event: AuditEvent) -> None:
     """
-    Append a single audit event as one JSON line.  Best-effort, single write.
+    Append a single audit event as one JSON line.
 
-    Improvement #3: single .write() + .flush() so each line is atomic-ish
-    even without file locks (single instance for v1).
+    When the lifespan audit sink is running the record is queued and
+    written by the background group-commit writer — no file I/O on the
+    event loop.  Without a sink (tests, scripts) it falls back to a direct
+    single write + flush through the same segmented writer.
     """
-    _ensure_audit_dir()
-    line = event.model_dump_json() + "\n"
-    with open(AUDIT_JSONL_PATH, "a", encoding="utf-8") as f:
-        f.write(line)
-        f.flush()
+    record = AuditRecord(
+        line=event.model_dump_json() + "\n",
+        timestamp=event.timestamp,
+        event_type=event.event_type,
+        request_id=event.correlation.get("request_id", ""),
+        proposal_id=event.correlation.get("proposal_id", ""),
+    )
+    sink = _audit_sink
+    if sink is not None and sink.running:
+        sink.submit(record)
+        return
+    _get_fallback_audit_writer().write([record], "flush")
 
 
 def _make_audit_event(
@@ -307,6 +527,52 @@ def _sanitize_proposal_for_audit(proposal: ExecutionProposal) -> dict[str, Any]:
     return data
 
 
+# Snapshot store — one per resolved root, created on first use.
+_snapshot_store: SnapshotStore | None = None
+
+
+def _get_snapshot_store() -> SnapshotStore:
+    """Return the snapshot store for the current SNAPSHOT_STORE_PATH / audit dir."""
+    global _snapshot_store
+    root = Path(SNAPSHOT_STORE_PATH) if SNAPSHOT_STORE_PATH else AUDIT_JSONL_PATH.parent / "snapshots"
+    if _snapshot_store is None or _snapshot_store.root != root:
+        _snapshot_store = SnapshotStore(root)
+    return _snapshot_store
+
+
+async def _emit_receipt(receipt: ExecutionReceipt, request_id: str) -> ExecutionReceipt:
+    """
+    Store before/after state snapshots, audit the receipt and return it.
+
+    The audit event carries snapshot hashes and the changed fields only;
+    the full state dicts are written once to the snapshot store.
+    """
+    exclude: set[str] = set()
+    if SNAPSHOT_STORE_ENABLED and (receipt.before_state or receipt.after_state):
+        store = _get_snapshot_store()
+        before_ref, after_ref = await asyncio.to_thread(
+            store.put_many, [receipt.before_state, receipt.after_state]
+        )
+        receipt.before_state_ref = before_ref
+        receipt.after_state_ref = after_ref
+        if receipt.before_state is not None and receipt.after_state is not None:
+            receipt.state_diff = state_diff(receipt.before_state, receipt.after_state)
+        exclude = {"before_state", "after_state"}
+        if not RECEIPT_INLINE_STATE:
+            receipt.before_state = None
+            receipt.after_state = None
+    append_audit_event(_make_audit_event(
+        event_type="execution_receipt.out",
+        request_id=request_id,
+        proposal_id=receipt.proposal_id,
+        payload=receipt.model_dump(by_alias=True, exclude=exclude),
+    ))
+    store = _receipt_store
+    if store is not None:
+        store.complete(receipt.proposal_id, receipt)
+    return receipt
+
+
 # ---------------------------------------------------------------------------
 # Law Engine
 # ---------------------------------------------------------------------------
@@ -320,15 +586,26 @@ class LawDecision:
         self.reason = reason
 
 
-def _blast_radius_level(radius: str) -> int:
-    """Return the ordinal level of a blast radius (higher = wider scope)."""
-    try:
-        return _BLAST_RADIUS_ORDER.index(radius)
-    except ValueError:
-        return len(_BLAST_RADIUS_ORDER)  # unknown = treat as worst case
+def _law_facts(proposal: ExecutionProposal) -> LawFacts:
+    action = proposal.action
+    return LawFacts(
+        entity_id=action.target.entity_id,
+        verify_entity_id=action.expected_outcome.verify.entity_id,
+        action_type=action.type.value,
+        blast_radius=action.metadata.blast_radius,
+    )
+
+
+def _law_decision(outcome: LawOutcome, policy: PolicySnapshot) -> LawDecision:
+    return LawDecision(
+        outcome.allowed, [*outcome.policy_basis, policy.basis_tag], outcome.reason,
+    )
 
 
-def evaluate_law(proposal: ExecutionProposal) -> LawDecision:
+def evaluate_law(
+    proposal: ExecutionProposal,
+    policy: Optional[PolicySnapshot] = None,
+) -> LawDecision:
     """
     Law engine.  Default deny.  All deny conditions run before any allow.
 
@@ -339,87 +616,141 @@ def evaluate_law(proposal: ExecutionProposal) -> LawDecision:
       4) entity_id in SHAMMASH_ALLOWLIST
       5) blast_radius <= POLICY_MAX_BLAST_RADIUS (semantic ordering)
 
-    If ALL pass → allow.  Rule IDs use law.v1.* namespace.
+    If ALL pass → allow.  Rule IDs use law.v1.* namespace; the basis ends
+    with ``policy=<version>`` of the snapshot judged against.  The rules
+    themselves live in law.py, compiled once per snapshot.
     """
-    action = proposal.action
-    entity_id = action.target.entity_id
-    verify_entity_id = action.expected_outcome.verify.entity_id
-    action_type = action.type.value
+    policy = policy or _get_policy_snapshot()
+    return _law_decision(policy.program.evaluate(_law_facts(proposal)), policy)
 
-    # 1) Defense-in-depth: entity_id format check
-    if not _ENTITY_ID_RE.match(entity_id):
-        return LawDecision(
-            allowed=False,
-            policy_basis=["law.v1.default_deny", "law.v1.invalid_entity_format"],
-            reason=f"Entity ID '{entity_id}' does not match required format",
-        )
-    if not _ENTITY_ID_RE.match(verify_entity_id):
-        return LawDecision(
-            allowed=False,
-            policy_basis=["law.v1.default_deny", "law.v1.invalid_entity_format"],
-            reason=f"Verify entity ID '{verify_entity_id}' does not match required format",
-        )
 
-    # 2) target == verify entity (no cross-entity tricks)
-    if POLICY_ENFORCE_TARGET_VERIFY and entity_id != verify_entity_id:
-        return LawDecision(
-            allowed=False,
-            policy_basis=["law.v1.default_deny", "law.v1.target_verify_mismatch"],
-            reason=(
-                f"target.entity_id ({entity_id}) != "
-                f"verify.entity_id ({verify_entity_id}). "
-                "In v1 they must match."
-            ),
-        )
+def evaluate_law_batch(
+    proposals: list[ExecutionProposal],
+    policy: Optional[PolicySnapshot] = None,
+) -> list[LawDecision]:
+    """evaluate_law() for many proposals in one rule-major pass."""
+    policy = policy or _get_policy_snapshot()
+    outcomes = policy.program.evaluate_batch([_law_facts(p) for p in proposals])
+    return [_law_decision(o, policy) for o in outcomes]
 
-    # 3) action type is allowed by policy
-    if action_type not in ALLOWED_ACTION_TYPES:
-        return LawDecision(
-            allowed=False,
-            policy_basis=["law.v1.default_deny", "law.v1.action_not_allowed"],
-            reason=f"Action type '{action_type}' is not in allowed set: {sorted(ALLOWED_ACTION_TYPES)}",
-        )
 
-    # 4) entity is in allowlist
-    if entity_id not in SHAMMASH_ALLOWLIST:
-        return LawDecision(
-            allowed=False,
-            policy_basis=["law.v1.default_deny", "law.v1.entity_not_allowlisted"],
-            reason=f"Entity '{entity_id}' is not in SHAMMASH_ALLOWLIST",
-        )
+# ---------------------------------------------------------------------------
+# Policy Reload — file watch, SIGHUP, POST /policy/reload
+# ---------------------------------------------------------------------------
 
-    # 5) blast radius within policy limits (semantic ordering)
-    action_radius = action.metadata.blast_radius
-    if _blast_radius_level(action_radius) > _blast_radius_level(POLICY_MAX_BLAST_RADIUS):
-        return LawDecision(
-            allowed=False,
-            policy_basis=["law.v1.default_deny", "law.v1.blast_radius_exceeded"],
-            reason=(
-                f"Blast radius '{action_radius}' exceeds policy max "
-                f"'{POLICY_MAX_BLAST_RADIUS}'"
-            ),
-        )
+_policy_reload_lock = asyncio.Lock()
+# Reloads scheduled from the SIGHUP handler (kept so they aren't GC'd).
+_policy_reload_tasks: set[asyncio.Task] = set()
 
-    # --- All deny checks passed → allow ---
-    return LawDecision(
-        allowed=True,
-        policy_basis=[
-            "law.v1.allowlist_match",
-            f"entity={entity_id}",
-            f"type={action_type}",
-        ],
-    )
+
+def _audit_policy_reload(payload: dict[str, Any]) -> None:
+    append_audit_event(AuditEvent(
+        event_id=str(uuid.uuid4()),
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        service="shammash",
+        event_type="policy_reload",
+        correlation={"request_id": str(uuid.uuid4())},
+        payload=payload,
+    ))
+
+
+async def reload_policy(trigger: str) -> dict[str, Any]:
+    """
+    Re-read POLICY_PATH and swap in the new snapshot.
+
+    Parsing, validation and rule compilation run in a worker thread; the
+    swap is a single reference assignment, so requests already holding the
+    previous snapshot finish against it.  Raises PolicyError — and keeps
+    the running policy — if the file is invalid.
+    """
+    async with _policy_reload_lock:
+        previous = _get_policy_snapshot()
+        payload: dict[str, Any] = {
+            "trigger": trigger,
+            "source": str(POLICY_PATH),
+            "previous_version": previous.version,
+        }
+        try:
+            snapshot = await asyncio.to_thread(load_snapshot, POLICY_PATH, env_allowlist())
+        except PolicyError as exc:
+            _audit_policy_reload({**payload, "changed": False, "error": str(exc)})
+            raise
+        changed = snapshot.version != previous.version
+        if changed:
+            _publish_policy(snapshot)
+        payload.update(version=_policy_snapshot.version, changed=changed)
+        _audit_policy_reload(payload)
+        return payload
+
+
+async def _reload_policy_quietly(trigger: str) -> None:
+    try:
+        await reload_policy(trigger)
+    except PolicyError as exc:
+        warnings.warn(f"Policy reload ({trigger}) rejected, keeping current policy: {exc}")
+
+
+def _on_sighup() -> None:
+    task = asyncio.ensure_future(_reload_policy_quietly("sighup"))
+    _policy_reload_tasks.add(task)
+    task.add_done_callback(_policy_reload_tasks.discard)
+
+
+async def _watch_policy_file(interval: float) -> None:
+    """Reload whenever the policy file's mtime or size changes."""
+    signature = file_signature(POLICY_PATH)
+    while True:
+        await asyncio.sleep(interval)
+        current = file_signature(POLICY_PATH)
+        # A missing file (mid-rename, or deleted) keeps the running policy.
+        if current is None or current == signature:
+            continue
+        signature = current
+        await _reload_policy_quietly("file_watch")
 
 
 # ---------------------------------------------------------------------------
 # Home Assistant REST Client
 # ---------------------------------------------------------------------------
 
-def _ha_headers() -> dict[str, str]:
-    return {
-        "Authorization": f"Bearer {HA_TOKEN}",
-        "Content-Type": "application/json",
-    }
+def _new_transport() -> HATransport:
+    breaker = None
+    if HA_BREAKER_ENABLED:
+        breaker = CircuitBreaker(
+            failure_rate=HA_BREAKER_FAILURE_RATE,
+            slow_call_seconds=HA_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate=HA_BREAKER_SLOW_CALL_RATE,
+            min_calls=HA_BREAKER_MIN_CALLS,
+            window_seconds=HA_BREAKER_WINDOW_SECONDS,
+            open_seconds=HA_BREAKER_OPEN_SECONDS,
+        )
+    return HATransport(
+        HA_URL,
+        HA_TOKEN,
+        # Resolved per request so a policy reload applies to the next call.
+        lambda operation: _get_policy_snapshot().ha_timeout(operation),
+        max_connections=HA_MAX_CONNECTIONS,
+        max_keepalive_connections=HA_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HA_KEEPALIVE_EXPIRY_SECONDS,
+        http2=HA_HTTP2,
+        breaker=breaker,
+    )
+
+
+def _get_transport() -> HATransport:
+    """
+    The HA transport.  Lifespan owns one for the process; outside it (tests,
+    scripts) a single fallback is shared per event loop and HA_URL/HA_TOKEN.
+    """
+    global _fallback_transport, _fallback_transport_key
+    if _ha_transport is not None:
+        return _ha_transport
+    key = (asyncio.get_running_loop(), HA_URL, HA_TOKEN)
+    if _fallback_transport is None or _fallback_transport_key != key:
+        # Connections of a previous loop's client died with that loop.
+        _fallback_transport = _new_transport()
+        _fallback_transport_key = key
+    return _fallback_transport
 
 
 # HA service routing table — maps action type to service path.
@@ -431,18 +762,55 @@ _HA_SERVICE_MAP: dict[str, str] = {
 }
 
 
-async def ha_get_state(entity_id: str, client: httpx.AsyncClient) -> dict[str, Any]:
+async def ha_get_state(entity_id: str) -> dict[str, Any]:
     """GET /api/states/{entity_id} → full state dict."""
-    resp = await client.get(
-        f"{HA_URL}/api/states/{entity_id}",
-        headers=_ha_headers(),
-        timeout=10.0,
-    )
-    resp.raise_for_status()
-    return resp.json()
+    return await _get_transport().get_state(entity_id)
 
 
-async def ha_call_service(action: HAAction, client: httpx.AsyncClient) -> dict[str, Any]:
+async def ha_get_states() -> list[dict[str, Any]]:
+    """GET /api/states → every entity's state (cache warm-up, bulk polls)."""
+    return await _get_transport().get_states()
+
+
+async def _read_state(entity_id: str, max_age: float) -> tuple[dict[str, Any], StateRead]:
+    """
+    State of ``entity_id`` through the entity cache when it is running (no
+    older than ``max_age`` seconds unless tracked), else a live REST read.
+    """
+    cache = _state_cache
+    if cache is None:
+        return await ha_get_state(entity_id), StateRead("live", 0.0, "rest")
+    # Looked up per call so tests can patch ha_get_state.
+    return await cache.get(entity_id, lambda eid: ha_get_state(eid), max_age)
+
+
+async def _poll_state(
+    entity_id: str, poll_watch: Optional[PollWatch], delay: float, deadline: float,
+) -> Optional[dict[str, Any]]:
+    """
+    One verification read, ``delay`` seconds from now.  Through the shared
+    poller when it is running, so concurrent verifications share HA
+    requests; None if ``deadline`` (loop time) passes first.  A failed read
+    raises.
+    """
+    if poll_watch is None:
+        state, _ = await _read_state(entity_id, 0.0)
+        return state
+    cache = _state_cache
+    cached = cache.peek(entity_id, 0.0) if cache is not None and not delay else None
+    if cached is not None:
+        return cached[0]  # kept current by the WebSocket stream
+    loop = asyncio.get_running_loop()
+    poll_watch.request(delay)
+    polled = await poll_watch.next(deadline - loop.time())
+    if polled is None:
+        return None
+    if polled.error is not None:
+        raise polled.error
+    return polled.state
+
+
+async def ha_call_service(action: HAAction) -> dict[str, Any]:
     """
     Call the appropriate HA service based on action.type.
 
@@ -460,15 +828,7 @@ async def ha_call_service(action: HAAction, client: httpx.AsyncClient) -> dict[s
 
     service_path = _HA_SERVICE_MAP[action_type]
     payload = {"entity_id": entity_id}
-    url = f"{HA_URL}/api/services/{service_path}"
-
-    resp = await client.post(
-        url,
-        headers=_ha_headers(),
-        json=payload,
-        timeout=10.0,
-    )
-    resp.raise_for_status()
+    resp = await _get_transport().call_service(service_path, payload)
 
     return {
         "endpoint": f"/api/services/{service_path}",
@@ -482,66 +842,139 @@ async def ha_call_service(action: HAAction, client: httpx.AsyncClient) -> dict[s
 # Verification — poll until expected state or timeout
 # ---------------------------------------------------------------------------
 
-async def verify_outcome(expected: ExpectedOutcome) -> tuple[bool, str, dict[str, Any]]:
+def _observed_value(verify: VerifySpec, state_data: dict[str, Any]) -> Any:
+    if verify.attribute == "state":
+        return state_data.get("state")
+    return state_data.get("attributes", {}).get(verify.attribute)
+
+
+def _value_matches(expected_val: Any, actual: Any) -> bool:
+    # Coerce types for comparison (HA returns strings for most values)
+    if isinstance(expected_val, bool):
+        return actual == expected_val or str(actual).lower() == str(expected_val).lower()
+    if isinstance(expected_val, (int, float)):
+        try:
+            return float(actual) == float(expected_val)
+        except (TypeError, ValueError):
+            return False
+    return str(actual) == str(expected_val)
+
+
+def _plural(count: int, noun: str) -> str:
+    return f"{count} {noun}{'s' if count != 1 else ''}"
+
+
+async def verify_outcome(
+    expected: ExpectedOutcome,
+    policy: Optional[PolicySnapshot] = None,
+) -> tuple[bool, str, dict[str, Any], dict[str, Any]]:
     """
-    Poll HA state until expected_outcome matches or timeout.
+    Wait until HA state matches expected_outcome or timeout.
 
     Per user feedback #3 (round 1):
       attribute == "state" → read top-level "state" key
       otherwise           → read attributes[attribute]
 
-    Timeout is clamped to POLICY_MAX_TIMEOUT so proposals cannot request
+    With the HA WebSocket stream connected, one REST read establishes the
+    current state and every later state arrives as a pushed state_changed
+    event (re-read over REST every HA_WEBSOCKET_RESYNC_SECONDS in case one
+    was missed).  Without it — or as soon as it drops — the loop polls
+    REST at the offsets planned by the verification scheduler, through the
+    shared StatePoller when lifespan started one.
+
+    Timeout is clamped to the policy's max_timeout_seconds (or the
+    matching allowlist entry's override) so proposals cannot request
     arbitrarily long verification windows.
 
-    Returns (passed, evidence_string, final_state_dict).
+    Returns (passed, evidence_string, final_state_dict, timing) where
+    timing holds the receipt's poll_schedule / schedule_basis /
+    settle_seconds.  Raises CircuitOpenError if the HA circuit opens while
+    polling: no read can succeed before it half-opens.
     """
     verify = expected.verify
     loop = asyncio.get_event_loop()
     # Clamp timeout to policy max — never trust the proposal's value
-    effective_timeout = min(expected.timeout_seconds, POLICY_MAX_TIMEOUT)
+    policy = policy or _get_policy_snapshot()
+    effective_timeout = min(expected.timeout_seconds, policy.max_timeout_for(verify.entity_id))
     deadline = loop.time() + effective_timeout
     start_time = loop.time()
+    max_gap = policy.poll_interval_seconds
+    scheduler = _verify_scheduler
+    if scheduler is not None:
+        offsets, basis = scheduler.plan(verify.entity_id, effective_timeout, max_gap)
+    else:
+        offsets = poll_offsets(effective_timeout, VERIFY_FIRST_POLL_SECONDS, max_gap)
+        basis = "default"
+    polled_at: list[float] = []
+    timing: dict[str, Any] = {"poll_schedule": polled_at, "schedule_basis": basis, "settle_seconds": None}
     last_state: dict[str, Any] = {}
     poll_count = 0
+    pushed_count = 0
+    stream = _ha_stream
+    # Registered before the first read so no change can slip in between.
+    watch = stream.watch(verify.entity_id) if stream is not None and stream.connected else None
+    pushed: Optional[dict[str, Any]] = None
+    poller = _state_poller
+    poll_watch = poller.watch(verify.entity_id) if poller is not None else None
+    delay = 0.0
 
-    while loop.time() < deadline:
-        poll_count += 1
-        try:
-            state_data = await ha_get_state(verify.entity_id, _get_http_client())
-            last_state = state_data
-
-            # Extract the value to compare
-            if verify.attribute == "state":
-                actual = state_data.get("state")
+    try:
+        while loop.time() < deadline:
+            state_data: Optional[dict[str, Any]] = None
+            if pushed is not None:
+                state_data, pushed = pushed, None
+                pushed_count += 1
             else:
-                actual = state_data.get("attributes", {}).get(verify.attribute)
-
-            # Coerce types for comparison (HA returns strings for most values)
-            expected_val = verify.equals
-            if isinstance(expected_val, bool):
-                passed = actual == expected_val or str(actual).lower() == str(expected_val).lower()
-            elif isinstance(expected_val, (int, float)):
+                if delay:
+                    if loop.time() + delay >= deadline:
+                        await asyncio.sleep(max(0.0, deadline - loop.time()))
+                        break  # no planned poll left before the deadline
+                    if poll_watch is None:
+                        await asyncio.sleep(delay)
                 try:
-                    passed = float(actual) == float(expected_val)
-                except (TypeError, ValueError):
-                    passed = False
+                    # Only a cache entry the stream keeps current is accepted.
+                    state_data = await _poll_state(verify.entity_id, poll_watch, delay, deadline)
+                except Exception as exc:
+                    if isinstance(exc, CircuitOpenError) and (watch is None or not stream.connected):
+                        raise  # pushed states are the only way left to see the change
+                    last_state = {"error": _sanitize_error(exc)}
+                else:
+                    if state_data is None:
+                        break  # deadline passed waiting for the poller
+                poll_count += 1
+                polled_at.append(round(loop.time() - start_time, 3))
+
+            if state_data is not None:
+                last_state = state_data
+                actual = _observed_value(verify, state_data)
+                if _value_matches(verify.equals, actual):
+                    settled = loop.time() - start_time
+                    timing["settle_seconds"] = round(settled, 3)
+                    if scheduler is not None:
+                        scheduler.record(verify.entity_id, settled)
+                    return (
+                        True,
+                        f"Verified: {verify.entity_id}.{verify.attribute} "
+                        f"expected {verify.equals!r}; observed {actual!r} "
+                        f"after {round(settled, 2)}s ({_verify_counts(poll_count, pushed_count)})",
+                        last_state,
+                        timing,
+                    )
+
+            if watch is not None and stream.connected:
+                wait = min(deadline - loop.time(), HA_WEBSOCKET_RESYNC_SECONDS)
+                pushed = await watch.next(wait)
+                delay = 0.0
             else:
-                passed = str(actual) == str(expected_val)
-
-            if passed:
-                elapsed = round(loop.time() - start_time, 2)
-                return (
-                    True,
-                    f"Verified: {verify.entity_id}.{verify.attribute} "
-                    f"expected {expected_val!r}; observed {actual!r} "
-                    f"after {elapsed}s ({poll_count} poll{'s' if poll_count != 1 else ''})",
-                    last_state,
-                )
-
-        except Exception as exc:
-            last_state = {"error": _sanitize_error(exc)}
-
-        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+                elapsed = loop.time() - start_time
+                # Planned offsets already passed are skipped, not bunched up.
+                upcoming = next((at for at in offsets if at > elapsed), elapsed + max_gap)
+                delay = upcoming - elapsed
+    finally:
+        if watch is not None:
+            watch.close()
+        if poll_watch is not None:
+            poll_watch.close()
 
     # Timeout — build a rich evidence string (improvement #5)
     elapsed = round(loop.time() - start_time, 2)
@@ -554,41 +987,175 @@ async def verify_outcome(expected: ExpectedOutcome) -> tuple[bool, str, dict[str
         False,
         f"Timeout: {verify.entity_id}.{verify.attribute} "
         f"expected {verify.equals!r}; observed {final_actual!r} "
-        f"after {elapsed}s ({poll_count} poll{'s' if poll_count != 1 else ''})",
+        f"after {elapsed}s ({_verify_counts(poll_count, pushed_count)})",
         last_state,
+        timing,
     )
 
 
+def _verify_counts(poll_count: int, pushed_count: int) -> str:
+    counts = _plural(poll_count, "poll")
+    if pushed_count:
+        counts += f", {_plural(pushed_count, 'pushed state')}"
+    return counts
+
+
 # ---------------------------------------------------------------------------
 # FastAPI Application
 # ---------------------------------------------------------------------------
 
 # ---------------------------------------------------------------------------
-# Shared httpx.AsyncClient — created once, reused for connection pooling.
+# Runtime components
 # ---------------------------------------------------------------------------
 
-_http_client: httpx.AsyncClient | None = None
-
-
-def _get_http_client() -> httpx.AsyncClient:
-    """Return the shared httpx client.  Falls back to a fresh client in tests."""
-    if _http_client is not None:
-        return _http_client
-    # Fallback for tests that don't go through lifespan
-    return httpx.AsyncClient()
+# HA REST transport (pooled client) — created in lifespan, None otherwise.
+_ha_transport: HATransport | None = None
+# Outside lifespan: one transport per (event loop, HA_URL, HA_TOKEN).
+_fallback_transport: HATransport | None = None
+_fallback_transport_key: tuple[Any, str, str] | None = None
+# HA state_changed subscription — created in lifespan, None otherwise.
+_ha_stream: HAStateStream | None = None
+# Entity state cache — created in lifespan, None otherwise.
+_state_cache: EntityStateCache | None = None
+# Coalesced verification poller — created in lifespan, None otherwise.
+_state_poller: StatePoller | None = None
+# Learned verification poll schedules — created in lifespan, None otherwise.
+_verify_scheduler: VerificationScheduler | None = None
+# Background /ready checks — created in lifespan, None otherwise.
+_readiness_prober: ReadinessProber | None = None
+# Serializes execution per entity; lanes exist only while in use.
+_entity_queue = EntityQueue()
+# Global in-flight limit with per-source queues and priority lanes.
+_admission = AdmissionController(ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE_PER_SOURCE)
+# Receipts by proposal_id — created in lifespan, None otherwise.
+_receipt_store: ReceiptStore | None = None
+# Executions still verifying after their 202, by proposal_id (kept so
+# they aren't GC'd).
+_async_executions: dict[str, asyncio.Task] = {}
+
+
+async def _persist_settle_times(scheduler: VerificationScheduler) -> None:
+    # Copy on the loop, where verifications record; only the write is threaded.
+    data = scheduler.snapshot()
+    if data is not None:
+        await asyncio.to_thread(scheduler.write, data)
+
+
+async def _save_settle_times(scheduler: VerificationScheduler, interval: float) -> None:
+    """Persist learned settle times every ``interval`` seconds (and at shutdown)."""
+    while True:
+        await asyncio.sleep(interval)
+        await _persist_settle_times(scheduler)
 
 
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI):
-    """Create shared httpx client and ensure audit directory at startup."""
-    global _http_client
+    """
+    Create the HA transport, ensure audit directory and start the audit
+    sink, HA state stream, state poller, readiness prober, receipt store and
+    policy watchers at startup.  On shutdown proposals still verifying after
+    a 202 get up to the policy's max verification timeout to finish, then
+    the sink is drained before returning.
+    """
+    global _ha_transport, _audit_sink, _fallback_audit_writer, _worker_slot
+    global _ha_stream, _state_cache, _state_poller, _verify_scheduler, _readiness_prober
+    global _receipt_store
     _ensure_audit_dir()
-    _http_client = httpx.AsyncClient()
+    _ha_transport = _new_transport()
+    _receipt_store = ReceiptStore(RECEIPT_STORE_MAX_ENTRIES, RECEIPT_STORE_TTL_SECONDS)
+    if HA_WEBSOCKET_ENABLED and HA_TOKEN and ws_connect is not None:
+        _ha_stream = HAStateStream(websocket_url(HA_URL), HA_TOKEN)
+    warmup = None
+    if STATE_CACHE_ENABLED:
+        _state_cache = EntityStateCache(STATE_CACHE_MAX_ENTRIES, stream=_ha_stream)
+        if _ha_stream is not None:
+            _ha_stream.add_listener(_state_cache.on_state_changed)
+        if HA_TOKEN:
+            warmup = asyncio.create_task(_state_cache.warm(ha_get_states))
+    # Looked up per call so tests can patch ha_get_state / ha_get_states.
+    _state_poller = StatePoller(
+        lambda entity_id: ha_get_state(entity_id),
+        lambda: ha_get_states(),
+        min_gap=STATE_POLL_MIN_GAP_SECONDS,
+        bulk_threshold=STATE_POLL_BULK_THRESHOLD,
+        max_concurrency=STATE_POLL_MAX_CONCURRENCY,
+    )
+    if _state_cache is not None:
+        cache = _state_cache
+        _state_poller.add_listener(lambda entity_id, state: cache.put(entity_id, state))
+    _state_poller.start()
+    settle_path = (
+        Path(VERIFY_SETTLE_STATS_PATH) if VERIFY_SETTLE_STATS_PATH
+        else AUDIT_JSONL_PATH.parent / "settle_times.json"
+    )
+    _verify_scheduler = VerificationScheduler(
+        settle_path,
+        first_gap=VERIFY_FIRST_POLL_SECONDS,
+        min_samples=VERIFY_SCHEDULE_MIN_SAMPLES,
+    )
+    await asyncio.to_thread(_verify_scheduler.load)
+    settle_saver = asyncio.create_task(
+        _save_settle_times(_verify_scheduler, VERIFY_SETTLE_SAVE_SECONDS)
+    )
+    if _ha_stream is not None:
+        _ha_stream.start()
+    # The sink's writer owns the active segment from here on.
+    if _fallback_audit_writer is not None:
+        _fallback_audit_writer.close()
+        _fallback_audit_writer = None
+    _audit_sink = AuditSink(
+        _new_audit_writer(),
+        durability=AUDIT_DURABILITY,
+        max_batch=AUDIT_BATCH_MAX_EVENTS,
+    )
+    _audit_sink.start()
+    _readiness_prober = ReadinessProber(_check_readiness, READY_PROBE_INTERVAL_SECONDS)
+    _readiness_prober.start()
+    watcher = None
+    if POLICY_WATCH_INTERVAL_SECONDS > 0:
+        watcher = asyncio.create_task(_watch_policy_file(POLICY_WATCH_INTERVAL_SECONDS))
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, _on_sighup)
+        sighup_installed = True
+    except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+        sighup_installed = False  # no SIGHUP on this platform / not the main thread
     try:
         yield
     finally:
-        await _http_client.aclose()
-        _http_client = None
+        if sighup_installed:
+            loop.remove_signal_handler(signal.SIGHUP)
+        if watcher is not None:
+            watcher.cancel()
+        if warmup is not None:
+            warmup.cancel()
+        # Let 202'd proposals finish verifying while HA and the sink are up.
+        if _async_executions:
+            _, unfinished = await asyncio.wait(
+                set(_async_executions.values()), timeout=_get_policy_snapshot().max_timeout_seconds,
+            )
+            for task in unfinished:
+                task.cancel()
+        _receipt_store = None
+        prober, _readiness_prober = _readiness_prober, None
+        await prober.close()
+        poller, _state_poller = _state_poller, None
+        await poller.close()
+        settle_saver.cancel()
+        scheduler, _verify_scheduler = _verify_scheduler, None
+        await _persist_settle_times(scheduler)
+        _state_cache = None
+        if _ha_stream is not None:
+            stream, _ha_stream = _ha_stream, None
+            await stream.close()
+        transport, _ha_transport = _ha_transport, None
+        await transport.aclose()
+        # Drain off the loop: close() joins the writer thread.
+        sink, _audit_sink = _audit_sink, None
+        await asyncio.to_thread(sink.close)
+        if _worker_slot is not None:
+            _worker_slot.release()
+            _worker_slot = None
 
 
 app = FastAPI(
@@ -609,6 +1176,35 @@ async def health():
     }
 
 
+async def _check_readiness() -> dict[str, Any]:
+    """
+    The expensive part of /ready: a GET /api/ through the HA transport
+    (reachability and token validity) plus audit-sink health.  Run by the
+    background prober under lifespan, inline otherwise.
+    """
+    ha_reachable = False
+    ha_token_valid: Optional[bool] = None
+    if HA_TOKEN:
+        try:
+            await _get_transport().probe()
+            ha_reachable = ha_token_valid = True
+        except httpx.HTTPStatusError as exc:
+            # HA answered: reachable, and a 401/403 means the token is bad.
+            status = exc.response.status_code
+            ha_reachable = status < 500
+            ha_token_valid = status not in (401, 403)
+        except Exception:
+            ha_reachable = False
+    sink = _audit_sink
+    return {
+        "ha_reachable": ha_reachable,
+        "ha_token_valid": ha_token_valid,
+        # Without a sink, audit writes are synchronous and fail the request.
+        "audit_ok": sink is None or sink.healthy,
+        "audit_sink": sink.stats() if sink is not None else {"running": False},
+    }
+
+
 @app.get("/ready")
 async def ready():
     """
@@ -616,7 +1212,13 @@ async def ready():
 
     Reports whether Shammash can actually serve proposals:
       - Is HA_TOKEN configured?
-      - Is HA_URL reachable?
+      - Is HA_URL reachable, and does it accept the token?
+      - Is the audit sink writing (no failed batch waiting for retry)?
+      - Is the HA circuit breaker letting calls through?
+
+    Under lifespan the HA and audit-sink checks come from the background
+    prober's latest result (``probe`` gives its age and latency), so a
+    readiness request never calls HA itself; a stale result is not ready.
 
     Returns 200 with ready=true/false.  Never exposes the token.
     """
@@ -627,105 +1229,778 @@ async def ready():
         "ha_url": HA_URL,
     }
 
-    # Probe HA reachability with a lightweight GET /api/
-    ha_reachable = False
-    if HA_TOKEN:
+    prober = _readiness_prober
+    if prober is not None:
+        probed = prober.result or {
+            "ha_reachable": False, "ha_token_valid": None,
+            "audit_ok": False, "audit_sink": {"running": False},
+        }
+        probe_stats = prober.stats()
+        fresh = not prober.stale
+    else:
+        started = time.perf_counter()
+        probed = await _check_readiness()
+        probe_stats = {
+            "mode": "on_demand",
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        fresh = True
+
+    checks["ha_reachable"] = probed["ha_reachable"]
+    checks["ha_token_valid"] = probed["ha_token_valid"]
+    checks["probe"] = probe_stats
+    transport = _get_transport()
+    checks["ha_transport"] = transport.stats()
+    breaker = transport.breaker
+    circuit_ok = breaker is None or breaker.state != CIRCUIT_OPEN
+    # Informational: verification falls back to REST while disconnected.
+    stream = _ha_stream
+    checks["ha_websocket"] = stream.stats() if stream is not None else {"connected": False}
+    cache = _state_cache
+    checks["state_cache"] = cache.stats() if cache is not None else {"enabled": False}
+    poller = _state_poller
+    checks["state_poller"] = poller.stats() if poller is not None else {"running": False}
+    scheduler = _verify_scheduler
+    checks["verify_scheduler"] = scheduler.stats() if scheduler is not None else {"learning": False}
+    checks["entity_queue"] = _entity_queue.stats()
+    checks["admission"] = _admission.stats()
+    store = _receipt_store
+    checks["receipt_store"] = store.stats() if store is not None else {"running": False}
+    checks["audit_sink"] = probed["audit_sink"]
+    checks["ready"] = (
+        bool(HA_TOKEN)
+        and probed["ha_reachable"]
+        and probed["ha_token_valid"] is True
+        and probed["audit_ok"]
+        and circuit_ok
+        and fresh
+    )
+
+    return checks
+
+
+@app.get("/law/stats")
+async def law_stats():
+    """Per-rule hit counts and nanosecond timings of the compiled Law program."""
+    policy = _get_policy_snapshot()
+    rules = policy.program.stats()
+    return {"policy_version": policy.version, "rule_count": len(rules), "rules": rules}
+
+
+def _validation_error_summary(exc: ValidationError) -> str:
+    errors = exc.errors()
+    first = errors[0]
+    loc = ".".join(str(part) for part in first.get("loc", ())) or "<root>"
+    more = f" (+{len(errors) - 1} more)" if len(errors) > 1 else ""
+    return f"{loc}: {first.get('msg', 'invalid')}{more}"
+
+
+def _evaluate_batch_chunk(
+    items: list[Any],
+    first_index: int,
+    policy: PolicySnapshot,
+    counts: Counter,
+) -> bytes:
+    """
+    Validate then Law-evaluate one chunk; return its NDJSON output lines.
+    NDJSON items arrive as raw bytes and are parsed by pydantic-core
+    directly (no json.loads round trip).
+    """
+    rows: list[Optional[dict[str, Any]]] = [None] * len(items)
+    valid: list[tuple[int, ExecutionProposal]] = []
+    for offset, item in enumerate(items):
         try:
-            client = _get_http_client()
-            resp = await client.get(
-                f"{HA_URL}/api/",
-                headers=_ha_headers(),
-                timeout=5.0,
+            if isinstance(item, (bytes, str)):
+                proposal = ExecutionProposal.model_validate_json(item)
+            else:
+                proposal = ExecutionProposal.model_validate(item)
+        except ValidationError as exc:
+            counts["invalid"] += 1
+            rows[offset] = {"index": first_index + offset, "error": _validation_error_summary(exc)}
+            continue
+        valid.append((offset, proposal))
+    decisions = evaluate_law_batch([proposal for _, proposal in valid], policy)
+    for (offset, proposal), law in zip(valid, decisions):
+        if law.allowed:
+            counts["allowed"] += 1
+        else:
+            counts["denied"] += 1
+            counts[law.policy_basis[1]] += 1
+        rows[offset] = {
+            "index": first_index + offset,
+            "proposal_id": proposal.proposal_id,
+            "allowed": law.allowed,
+            "policy_basis": law.policy_basis,
+            "reason": law.reason,
+        }
+    return "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+
+def _law_batch_too_large(items: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Batch has at least {items} items; limit is {LAW_BATCH_MAX_ITEMS}",
+    )
+
+
+async def _read_ndjson_lines(request: Request) -> list[bytes]:
+    """Non-blank lines of an NDJSON body, split as the body streams in."""
+    lines: list[bytes] = []
+    partial: list[bytes] = []  # pieces of the line still arriving
+    async for chunk in request.stream():
+        parts = chunk.split(b"\n")
+        if len(parts) == 1:
+            partial.append(chunk)
+            continue
+        partial.append(parts[0])
+        complete = [b"".join(partial), *parts[1:-1]]
+        partial = [parts[-1]]
+        lines.extend(line for line in complete if line.strip())
+        if len(lines) > LAW_BATCH_MAX_ITEMS:
+            raise _law_batch_too_large(len(lines))
+    last = b"".join(partial)
+    if last.strip():
+        lines.append(last)
+    return lines
+
+
+@app.post("/law/evaluate/batch")
+async def law_evaluate_batch(request: Request):
+    """
+    Dry-run Law over many proposals.  No HA calls, no per-item audit.
+
+    Body: a JSON array of ExecutionProposals, or NDJSON (one proposal per
+    line, ``Content-Type: application/x-ndjson``).  Response: NDJSON, one
+    line per item in input order — ``{index, proposal_id, allowed,
+    policy_basis, reason}`` or ``{index, error}`` for items that fail
+    validation — streamed chunk by chunk as they are evaluated.  Every item
+    is judged against the same policy snapshot; one summary audit event is
+    written when the stream ends.
+
+    The body is taken in before the response starts: once it has started,
+    Starlette's disconnect listener owns ``receive()``.  NDJSON is split
+    into lines as it arrives (413 as soon as it runs past
+    LAW_BATCH_MAX_ITEMS); a JSON array is parsed off the event loop.
+    """
+    policy = _get_policy_snapshot()
+    content_type = request.headers.get("content-type", "")
+    items: list[Any]
+    if "ndjson" in content_type or "jsonl" in content_type:
+        # Raw lines; pydantic-core parses each one directly.
+        items = await _read_ndjson_lines(request)
+    else:
+        body = await request.body()
+        try:
+            # A large array takes a while to parse: keep the loop free.
+            items = await asyncio.to_thread(json.loads, body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if len(items) > LAW_BATCH_MAX_ITEMS:
+        raise _law_batch_too_large(len(items))
+
+    async def _stream() -> AsyncIterator[bytes]:
+        counts: Counter = Counter()
+        started = time.perf_counter()
+        total = 0
+        completed = False
+        try:
+            for start in range(0, len(items), LAW_BATCH_CHUNK_SIZE):
+                chunk = items[start:start + LAW_BATCH_CHUNK_SIZE]
+                total += len(chunk)
+                # CPU-bound: keep the event loop free for verifications.
+                yield await asyncio.to_thread(_evaluate_batch_chunk, chunk, start, policy, counts)
+            completed = True
+        finally:
+            reasons = {k: v for k, v in counts.items() if k.startswith("law.")}
+            append_audit_event(AuditEvent(
+                event_id=str(uuid.uuid4()),
+                timestamp=datetime.now(timezone.utc).isoformat(),
+                service="shammash",
+                event_type="law_evaluation.batch",
+                correlation={"request_id": str(uuid.uuid4())},
+                payload={
+                    "dry_run": True,
+                    "policy_version": policy.version,
+                    "total": total,
+                    "allowed": counts["allowed"],
+                    "denied": counts["denied"],
+                    "invalid": counts["invalid"],
+                    "denial_reasons": dict(sorted(reasons.items(), key=lambda kv: -kv[1])),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "completed": completed,
+                },
+            ))
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+@app.get("/policy")
+async def policy_info():
+    """The policy snapshot proposals are currently judged against."""
+    policy = _get_policy_snapshot()
+    return {
+        "version": policy.version,
+        "loaded_at": policy.loaded_at,
+        "source": policy.source,
+        "allow_actions": sorted(policy.allow_actions),
+        "allowlist_size": len(policy.allow_entities),
+        "max_blast_radius": policy.max_blast_radius,
+        "enforce_target_verify_equality": policy.enforce_target_verify,
+        "max_timeout_seconds": policy.max_timeout_seconds,
+        "poll_interval_seconds": policy.poll_interval_seconds,
+        "ha_timeouts": policy.ha_timeouts,
+        "skip_satisfied_actions": sorted(policy.skip_satisfied_actions),
+    }
+
+
+@app.post("/policy/reload")
+async def policy_reload(authorization: Optional[str] = Header(default=None)):
+    """
+    Re-read the policy file now.  Requires ``Authorization: Bearer
+    <SHAMMASH_ADMIN_TOKEN>``; disabled when no admin token is configured.
+    422 (and the running policy kept) if the new file is invalid.
+    """
+    if not SHAMMASH_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Policy reload endpoint is disabled")
+    if not hmac.compare_digest(authorization or "", f"Bearer {SHAMMASH_ADMIN_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    try:
+        return await reload_policy("admin_endpoint")
+    except PolicyError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+async def _lookup_audit(**keys: Any) -> list[dict[str, Any]]:
+    """Indexed audit lookup, off the event loop, after queued events land."""
+    if not AUDIT_INDEX_ENABLED:
+        raise HTTPException(status_code=503, detail="Audit index is disabled")
+    sink = _audit_sink
+    if sink is not None and sink.running:
+        await asyncio.to_thread(sink.flush, 2.0)
+    return await asyncio.to_thread(lookup_merged, AUDIT_JSONL_PATH, **keys)
+
+
+@app.get("/audit/{proposal_id}")
+async def audit_for_proposal(
+    proposal_id: str,
+    limit: int = Query(default=1000, ge=1, le=10000),
+):
+    """Every audit event for one proposal, oldest first (index lookup)."""
+    events = await _lookup_audit(proposal_id=proposal_id, limit=limit)
+    if not events:
+        raise HTTPException(status_code=404, detail=f"No audit events for proposal {proposal_id}")
+    return {"proposal_id": proposal_id, "count": len(events), "events": events}
+
+
+@app.get("/audit")
+async def audit_query(
+    request_id: Optional[str] = None,
+    proposal_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=10000),
+):
+    """Audit events matching every given key.  At least one key is required."""
+    if request_id is None and proposal_id is None and event_type is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide at least one of request_id, proposal_id, event_type",
+        )
+    events = await _lookup_audit(
+        request_id=request_id,
+        proposal_id=proposal_id,
+        event_type=event_type,
+        limit=limit,
+    )
+    return {"count": len(events), "events": events}
+
+
+@app.get("/snapshots/{snapshot_hash}")
+async def get_snapshot(snapshot_hash: str):
+    """Full HA state referenced by a receipt's before_state_ref / after_state_ref."""
+    if not is_snapshot_hash(snapshot_hash):
+        raise HTTPException(status_code=400, detail="Snapshot hash must be 64 lowercase hex characters")
+    try:
+        state = await asyncio.to_thread(_get_snapshot_store().get, snapshot_hash)
+    except SnapshotCorruptError as exc:
+        raise HTTPException(status_code=500, detail=f"Snapshot failed integrity check: {exc}")
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot {snapshot_hash}")
+    return {"hash": snapshot_hash, "state": state}
+
+
+def _require_receipt_store() -> ReceiptStore:
+    store = _receipt_store
+    if store is None:
+        raise HTTPException(status_code=503, detail="Receipt store is not running")
+    return store
+
+
+@app.get("/receipts/{proposal_id}", response_model=ExecutionReceipt)
+async def get_receipt(
+    proposal_id: str,
+    wait: float = Query(default=0, ge=0, description="Long-poll: seconds to wait for a pending receipt"),
+):
+    """
+    The receipt for ``proposal_id``.  While it is still being verified:
+    ``202`` with its handle (after waiting up to ``wait`` seconds, capped at
+    RECEIPT_WAIT_MAX_SECONDS, for it to complete).  404 once unknown or
+    expired from the store.
+    """
+    store = _require_receipt_store()
+    stored = await store.wait(proposal_id, min(wait, RECEIPT_WAIT_MAX_SECONDS))
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"No receipt for proposal {proposal_id}")
+    if stored.status == RECEIPT_PENDING:
+        return JSONResponse(status_code=202, content=stored.handle)
+    return stored.receipt
+
+
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+@app.get("/receipts/{proposal_id}/events")
+async def receipt_events(proposal_id: str):
+    """
+    Server-Sent Events for one proposal: a ``pending`` event with the handle
+    while it is verifying (keep-alive comments meanwhile), then one
+    ``receipt`` event and the end of the stream.  ``abandoned`` if the
+    execution stopped without a receipt (shutdown).
+    """
+    store = _require_receipt_store()
+    if store.get(proposal_id) is None:
+        raise HTTPException(status_code=404, detail=f"No receipt for proposal {proposal_id}")
+
+    async def _stream() -> AsyncIterator[bytes]:
+        announced = False
+        while True:
+            stored = await store.wait(proposal_id, RECEIPT_SSE_KEEPALIVE_SECONDS if announced else 0)
+            if stored is None:
+                yield _sse("abandoned", {"proposal_id": proposal_id})
+                return
+            if stored.status != RECEIPT_PENDING:
+                yield _sse("receipt", stored.receipt.model_dump(mode="json", by_alias=True))
+                return
+            if announced:
+                yield b": keep-alive\n\n"
+            else:
+                yield _sse("pending", stored.handle)
+                announced = True
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _urgency(priority: Optional[str]) -> Optional[int]:
+    """Urgency (0 most urgent … 7) from an RFC 9218 ``Priority`` header."""
+    for param in (priority or "").split(","):
+        key, _, value = param.strip().partition("=")
+        if key == "u" and value.isdigit():
+            return min(int(value), 7)
+    return None
+
+
+def _admission_lane(proposal: ExecutionProposal, priority: Optional[str]) -> str:
+    metadata = proposal.action.metadata
+    urgency = _urgency(priority)
+    if ADMISSION_URGENT_TAGS.intersection(metadata.safety_tags) or (urgency is not None and urgency <= 1):
+        return "urgent"
+    if metadata.blast_radius in ("whole_home", "network_wide") or (urgency is not None and urgency >= 5):
+        return "bulk"
+    return "normal"
+
+
+def _admission_source(proposal: ExecutionProposal) -> str:
+    return f"{proposal.source.service}/{proposal.source.instance}"
+
+
+def _admission_rejected(
+    proposal: ExecutionProposal,
+    law: LawDecision,
+    exc: AdmissionRejected,
+    response: Response,
+    now_iso: str,
+) -> ExecutionReceipt:
+    """Failed receipt for a proposal turned away by admission control."""
+    receipt = ExecutionReceipt(
+        proposal_id=proposal.proposal_id,
+        timestamp=now_iso,
+        source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
+        decision="failed",
+        policy_basis=[*law.policy_basis, ADMISSION_REJECTED_BASIS],
+        verification=Verification(**{
+            "pass": False,
+            "evidence": f"Not admitted: {exc}",
+        }),
+        audit_ref=f"audit:{proposal.proposal_id}",
+        failure_language_hint="Shammash is at capacity; retry later",
+        retry_after_seconds=round(exc.retry_after, 3),
+    )
+    response.headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return receipt
+
+
+def _circuit_open(
+    receipt: ExecutionReceipt, exc: CircuitOpenError, response: Response,
+) -> ExecutionReceipt:
+    """Mark a failed receipt as an HA-circuit fast-fail with a retry hint."""
+    receipt.policy_basis = [*receipt.policy_basis, CIRCUIT_OPEN_BASIS]
+    receipt.retry_after_seconds = round(exc.retry_after, 3)
+    response.headers["Retry-After"] = str(max(1, math.ceil(exc.retry_after)))
+    return receipt
+
+
+def _misconfigured_receipt(proposal: ExecutionProposal, now_iso: str) -> ExecutionReceipt:
+    return ExecutionReceipt(
+        proposal_id=proposal.proposal_id,
+        timestamp=now_iso,
+        source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
+        decision="failed",
+        policy_basis=["law.v1.misconfigured.no_token"],
+        verification=Verification(**{
+            "pass": False,
+            "evidence": "HA_TOKEN is not configured. Cannot reach Home Assistant.",
+        }),
+        audit_ref=f"audit:{proposal.proposal_id}",
+        failure_language_hint="Shammash is misconfigured: HA_TOKEN is empty.",
+    )
+
+
+def _audit_law_decision(
+    proposal: ExecutionProposal, law: LawDecision, policy: PolicySnapshot,
+) -> None:
+    append_audit_event(_make_audit_event(
+        event_type="law_decision",
+        request_id=proposal.request_id,
+        proposal_id=proposal.proposal_id,
+        payload={
+            "allowed": law.allowed,
+            "policy_basis": law.policy_basis,
+            "reason": law.reason,
+            "policy_version": policy.version,
+        },
+    ))
+
+
+def _denied_receipt(
+    proposal: ExecutionProposal, law: LawDecision, now_iso: str,
+) -> ExecutionReceipt:
+    return ExecutionReceipt(
+        proposal_id=proposal.proposal_id,
+        timestamp=now_iso,
+        source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
+        decision="denied",
+        policy_basis=law.policy_basis,
+        verification=Verification(**{"pass": False, "evidence": law.reason}),
+        audit_ref=f"audit:{proposal.proposal_id}",
+        failure_language_hint=law.reason,
+    )
+
+
+def _proposal_fingerprint(proposal: ExecutionProposal) -> str:
+    """Hash of the validated proposal: key order and whitespace don't matter."""
+    return hashlib.sha256(proposal.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def _check_fingerprint(
+    stored: Optional[StoredReceipt], fingerprint: str, proposal_id: str,
+) -> None:
+    if stored is not None and stored.fingerprint not in (None, fingerprint):
+        raise HTTPException(
+            status_code=409,
+            detail=f"proposal_id {proposal_id} was already submitted with a different body",
+        )
+
+
+def _rerunnable(stored: StoredReceipt) -> bool:
+    """
+    Failed before its service call was sent (no token, before-state read
+    failed, circuit open, not admitted): HA is unchanged, so a retry runs
+    again.  A failed service call may still have been applied by HA, so it
+    is replayed like any other receipt.
+    """
+    return (
+        stored.status == RECEIPT_COMPLETE
+        and not stored.call_sent
+        and stored.receipt.decision == "failed"
+        and stored.receipt.action_taken is None
+    )
+
+
+def _mark_call_sent(proposal_id: str) -> None:
+    store = _receipt_store
+    if store is not None:
+        store.mark_call_sent(proposal_id)
+
+
+def _claim_proposal(
+    store: ReceiptStore, proposal: ExecutionProposal, fingerprint: str,
+) -> Optional[StoredReceipt]:
+    """
+    Idempotency check: what the store holds for a re-submitted proposal_id,
+    or None once this proposal is registered as in flight — it must then
+    complete (via _emit_receipt) or be abandoned.  409 on a body mismatch.
+    """
+    proposal_id = proposal.proposal_id
+    stored = store.get(proposal_id)
+    _check_fingerprint(stored, fingerprint, proposal_id)
+    if stored is None or _rerunnable(stored):
+        store.begin(proposal_id, _receipt_handle(proposal_id), fingerprint)
+        return None
+    store.replays += 1
+    return stored
+
+
+async def _replayed_receipt(
+    store: ReceiptStore, stored: StoredReceipt, proposal_id: str,
+) -> ExecutionReceipt:
+    """The stored receipt, once the execution in flight (if any) completes."""
+    while stored.status == RECEIPT_PENDING:
+        waited = await store.wait(proposal_id, RECEIPT_WAIT_MAX_SECONDS)
+        if waited is None:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Execution of proposal {proposal_id} ended without a receipt; resubmit it",
             )
-            ha_reachable = resp.status_code == 200
-        except Exception:
-            ha_reachable = False
+        stored = waited
+    return stored.receipt
 
-    checks["ha_reachable"] = ha_reachable
-    checks["ready"] = bool(HA_TOKEN) and ha_reachable
 
-    return checks
+async def _replay(
+    store: ReceiptStore,
+    stored: StoredReceipt,
+    proposal_id: str,
+    prefer: Optional[str],
+    response: Response,
+) -> Union[ExecutionReceipt, JSONResponse]:
+    if stored.status == RECEIPT_PENDING and _prefers_async(prefer):
+        return JSONResponse(
+            status_code=202,
+            content=stored.handle,
+            headers={
+                "Location": stored.handle["receipt_url"],
+                "Preference-Applied": "respond-async",
+                "Idempotent-Replayed": "true",
+            },
+        )
+    receipt = await _replayed_receipt(store, stored, proposal_id)
+    response.headers["Idempotent-Replayed"] = "true"
+    return receipt
+
+
+def _prefers_async(prefer: Optional[str]) -> bool:
+    """RFC 7240 ``Prefer: respond-async``."""
+    return prefer is not None and any(
+        token.split("=", 1)[0].strip().lower() == "respond-async"
+        for token in prefer.replace(";", ",").split(",")
+    )
+
+
+def _receipt_handle(proposal_id: str) -> dict[str, Any]:
+    return {
+        "proposal_id": proposal_id,
+        "status": RECEIPT_PENDING,
+        "receipt_url": f"/receipts/{proposal_id}",
+        "events_url": f"/receipts/{proposal_id}/events",
+    }
+
+
+async def _execute_async(
+    proposal: ExecutionProposal,
+    policy: PolicySnapshot,
+    law: LawDecision,
+    response: Response,
+    now_iso: str,
+    store: ReceiptStore,
+    admission: Admission,
+) -> Union[ExecutionReceipt, JSONResponse]:
+    """
+    Run an allowed proposal on its own task and answer 202 with a receipt
+    handle once the service call has gone out; verification continues in
+    the background and its receipt lands in the receipt store.  A proposal
+    that ends before the call (before-state or service call failed) is
+    answered with its receipt as usual.
+    """
+    proposal_id = proposal.proposal_id
+    issued: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def on_call(action_taken: dict[str, Any]) -> None:
+        if not issued.done():
+            issued.set_result(action_taken)
+
+    def on_done(task: asyncio.Task) -> None:
+        _async_executions.pop(proposal_id, None)
+        if task.cancelled() or task.exception() is not None:
+            store.abandon(proposal_id)  # no receipt is coming
+
+    handle = _receipt_handle(proposal_id)
+    # Not awaited directly: a client disconnecting must not cancel it.
+    task = asyncio.create_task(
+        _execute_allowed(proposal, policy, law, response, now_iso, on_call, admission),
+        name=f"shammash-execute-{proposal_id}",
+    )
+    _async_executions[proposal_id] = task
+    task.add_done_callback(on_done)
+    await asyncio.wait({task, issued}, return_when=asyncio.FIRST_COMPLETED)
+    if task.done():
+        return task.result()
+    issued_action = issued.result()
+    store.update(proposal_id, action_taken=issued_action)
+    return JSONResponse(
+        status_code=202,
+        content={**handle, "action_taken": issued_action},
+        headers={"Location": handle["receipt_url"], "Preference-Applied": "respond-async"},
+    )
 
 
 @app.post("/execute/proposal", response_model=ExecutionReceipt)
-async def execute_proposal(proposal: ExecutionProposal):
+async def execute_proposal(
+    proposal: ExecutionProposal,
+    response: Response,
+    prefer: Optional[str] = Header(default=None),
+    priority: Optional[str] = Header(default=None),
+):
     """
     Receive an ExecutionProposal, run it through Law, execute via HA REST,
     verify outcome, log audit events, and return an ExecutionReceipt.
+
+    While the HA circuit breaker is open an allowed proposal fails at once:
+    policy_basis ends with CIRCUIT_OPEN_BASIS, the receipt carries
+    retry_after_seconds and the response a Retry-After header.
+
+    With ``Prefer: respond-async`` (and the receipt store running) an
+    allowed proposal is answered ``202 Accepted`` as soon as its service
+    call has been issued, with a handle pointing at
+    ``GET /receipts/{proposal_id}`` and its event stream.
+
+    Re-submitting a proposal_id is idempotent while its receipt is in the
+    store: the same body gets the stored receipt (or waits for the
+    execution in flight) without touching HA, marked ``Idempotent-Replayed``;
+    a different body is rejected with 409.
+
+    Allowed proposals pass admission control first: they may queue for an
+    execution slot in their source's queue and priority lane (the receipt
+    records it under ``admission``), or, with that queue full, get a failed
+    receipt with status 429, policy_basis ending ADMISSION_REJECTED_BASIS
+    and a Retry-After header.  An RFC 9218 ``Priority: u=<0-7>`` header is
+    the urgency hint.
     """
+    store = _receipt_store
+    if store is not None:
+        stored = _claim_proposal(store, proposal, _proposal_fingerprint(proposal))
+        if stored is not None:
+            return await _replay(store, stored, proposal.proposal_id, prefer, response)
+    try:
+        return await _run_proposal(proposal, response, prefer, priority)
+    except BaseException:
+        # Async executions settle their own entry.
+        if store is not None and proposal.proposal_id not in _async_executions:
+            store.abandon(proposal.proposal_id)
+        raise
+
+
+async def _run_proposal(
+    proposal: ExecutionProposal,
+    response: Response,
+    prefer: Optional[str],
+    priority: Optional[str],
+) -> Union[ExecutionReceipt, JSONResponse]:
     now_iso = datetime.now(timezone.utc).isoformat()
     request_id = proposal.request_id
-    proposal_id = proposal.proposal_id
-    client = _get_http_client()
 
     # --- 0. Fail fast if HA_TOKEN is not configured ---
     if not HA_TOKEN:
-        receipt = ExecutionReceipt(
-            proposal_id=proposal_id,
-            timestamp=now_iso,
-            source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
-            decision="failed",
-            policy_basis=["law.v1.misconfigured.no_token"],
-            verification=Verification(**{
-                "pass": False,
-                "evidence": "HA_TOKEN is not configured. Cannot reach Home Assistant.",
-            }),
-            audit_ref=f"audit:{proposal_id}",
-            failure_language_hint="Shammash is misconfigured: HA_TOKEN is empty.",
-        )
-        append_audit_event(_make_audit_event(
-            event_type="execution_receipt.out",
-            request_id=request_id,
-            proposal_id=proposal_id,
-            payload=receipt.model_dump(by_alias=True),
-        ))
-        return receipt
+        return await _emit_receipt(_misconfigured_receipt(proposal, now_iso), request_id)
 
     # --- 1. Audit: proposal received (improvement #2: sanitized, no secrets) ---
     append_audit_event(_make_audit_event(
         event_type="execution_proposal.in",
         request_id=request_id,
-        proposal_id=proposal_id,
+        proposal_id=proposal.proposal_id,
         payload=_sanitize_proposal_for_audit(proposal),
     ))
 
-    # --- 2. Law check ---
-    law = evaluate_law(proposal)
-
-    append_audit_event(_make_audit_event(
-        event_type="law_decision",
-        request_id=request_id,
-        proposal_id=proposal_id,
-        payload={
-            "allowed": law.allowed,
-            "policy_basis": law.policy_basis,
-            "reason": law.reason,
-        },
-    ))
+    # --- 2. Law check (against one policy snapshot for the whole request) ---
+    policy = _get_policy_snapshot()
+    law = evaluate_law(proposal, policy)
+    _audit_law_decision(proposal, law, policy)
 
     if not law.allowed:
-        receipt = ExecutionReceipt(
-            proposal_id=proposal_id,
-            timestamp=now_iso,
-            source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
-            decision="denied",
-            policy_basis=law.policy_basis,
-            verification=Verification(**{"pass": False, "evidence": law.reason}),
-            audit_ref=f"audit:{proposal_id}",
-            failure_language_hint=law.reason,
+        return await _emit_receipt(_denied_receipt(proposal, law, now_iso), request_id)
+
+    # --- 2b. Admission: wait for an execution slot, or 429 ---
+    try:
+        admission = await _admission.acquire(
+            _admission_source(proposal), _admission_lane(proposal, priority),
         )
-        append_audit_event(_make_audit_event(
-            event_type="execution_receipt.out",
-            request_id=request_id,
-            proposal_id=proposal_id,
-            payload=receipt.model_dump(by_alias=True),
-        ))
-        return receipt
+    except AdmissionRejected as exc:
+        response.status_code = 429
+        receipt = _admission_rejected(proposal, law, exc, response, now_iso)
+        return await _emit_receipt(receipt, request_id)
+
+    store = _receipt_store
+    if store is not None and _prefers_async(prefer):
+        return await _execute_async(proposal, policy, law, response, now_iso, store, admission)
+    return await _execute_allowed(proposal, policy, law, response, now_iso, admission=admission)
+
+
+async def _execute_allowed(
+    proposal: ExecutionProposal,
+    policy: PolicySnapshot,
+    law: LawDecision,
+    response: Response,
+    now_iso: str,
+    on_call: Optional[Callable[[dict[str, Any]], None]] = None,
+    admission: Optional[Admission] = None,
+) -> ExecutionReceipt:
+    """
+    Steps 3–6 of a proposal Law allowed: before-state, call, verify, receipt.
+
+    Steps 3–5 hold the proposal's entities in the entity queue, so
+    proposals for the same entity run one after another in arrival order
+    while other entities proceed in parallel.  The receipt records the
+    wait under ``entity_queue``.  ``on_call(action_taken)`` runs once the
+    service call has succeeded, before verification starts.  An
+    ``admission`` slot is released once steps 3–5 are done.
+    """
+    action = proposal.action
+    keys = (action.target.entity_id, action.expected_outcome.verify.entity_id)
+    try:
+        async with _entity_queue.hold(keys) as ticket:
+            receipt = await _execute_in_order(proposal, policy, law, response, now_iso, on_call)
+    finally:
+        if admission is not None:
+            _admission.release(admission)
+    receipt.entity_queue = ticket.to_dict()
+    if admission is not None:
+        receipt.admission = admission.to_dict()
+    # --- 6. Snapshot states, audit receipt ---
+    return await _emit_receipt(receipt, proposal.request_id)
+
+
+async def _execute_in_order(
+    proposal: ExecutionProposal,
+    policy: PolicySnapshot,
+    law: LawDecision,
+    response: Response,
+    now_iso: str,
+    on_call: Optional[Callable[[dict[str, Any]], None]],
+) -> ExecutionReceipt:
+    request_id = proposal.request_id
+    proposal_id = proposal.proposal_id
 
-    # --- 3. GET before state ---
+    # --- 3. GET before state (fails at once while the HA circuit is open) ---
     entity_id = proposal.action.target.entity_id
+    breaker = _get_transport().breaker
     try:
-        before_state = await ha_get_state(entity_id, client)
+        if breaker is not None and breaker.retry_after() > 0:
+            raise CircuitOpenError(breaker.retry_after())
+        before_state, before_read = await _read_state(entity_id, STATE_CACHE_MAX_AGE_SECONDS)
     except Exception as exc:
         safe_msg = _sanitize_error(exc)
         receipt = ExecutionReceipt(
@@ -741,14 +2016,48 @@ async def execute_proposal(proposal: ExecutionProposal):
             audit_ref=f"audit:{proposal_id}",
             failure_language_hint=f"Could not reach HA to read state for {entity_id}",
         )
-        append_audit_event(_make_audit_event(
-            event_type="execution_receipt.out",
-            request_id=request_id,
-            proposal_id=proposal_id,
-            payload=receipt.model_dump(by_alias=True),
-        ))
+        if isinstance(exc, CircuitOpenError):
+            _circuit_open(receipt, exc, response)
         return receipt
 
+    # --- 3b. Already in the expected state? (opt-in, idempotent actions) ---
+    verify = proposal.action.expected_outcome.verify
+    if (
+        proposal.action.type.value in policy.skip_satisfied_actions
+        and verify.entity_id == entity_id
+        and _value_matches(verify.equals, _observed_value(verify, before_state))
+    ):
+        confirmed = True
+        if before_read.source == "cache":
+            # Skipping on an untracked cached state could leave the device
+            # wrong; confirm with a read no older than the stream's last event.
+            try:
+                before_state, before_read = await _read_state(entity_id, 0.0)
+            except Exception:
+                confirmed = False  # execute as usual
+        actual = _observed_value(verify, before_state)
+        if confirmed and _value_matches(verify.equals, actual):
+            return ExecutionReceipt(
+                proposal_id=proposal_id,
+                timestamp=datetime.now(timezone.utc).isoformat(),
+                source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
+                decision="allowed",
+                policy_basis=[*law.policy_basis, NO_OP_BASIS],
+                verification=Verification(**{
+                    "pass": True,
+                    "evidence": (
+                        f"Already satisfied: {verify.entity_id}.{verify.attribute} "
+                        f"expected {verify.equals!r}; observed {actual!r} before any "
+                        f"service call ({before_read.source} read); nothing executed"
+                    ),
+                }),
+                before_state=before_state,
+                before_state_source=before_read.to_dict(),
+                after_state=before_state,
+                audit_ref=f"audit:{proposal_id}",
+                no_op=True,
+            )
+
     # --- 4. Execute service call ---
     append_audit_event(_make_audit_event(
         event_type="execution_attempt",
@@ -761,8 +2070,12 @@ async def execute_proposal(proposal: ExecutionProposal):
     ))
 
     try:
-        service_result = await ha_call_service(proposal.action, client)
+        service_result = await ha_call_service(proposal.action)
     except Exception as exc:
+        # An open breaker rejects before sending; any other error (a read
+        # timeout, a 5xx) may follow a request HA has already applied.
+        if not isinstance(exc, CircuitOpenError):
+            _mark_call_sent(proposal_id)
         safe_msg = _sanitize_error(exc)
         receipt = ExecutionReceipt(
             proposal_id=proposal_id,
@@ -775,50 +2088,209 @@ async def execute_proposal(proposal: ExecutionProposal):
                 "evidence": f"Service call failed: {safe_msg}",
             }),
             before_state=before_state,
+            before_state_source=before_read.to_dict(),
             audit_ref=f"audit:{proposal_id}",
             failure_language_hint=f"HA service call failed for {entity_id}",
         )
-        append_audit_event(_make_audit_event(
-            event_type="execution_receipt.out",
-            request_id=request_id,
-            proposal_id=proposal_id,
-            payload=receipt.model_dump(by_alias=True),
-        ))
+        if isinstance(exc, CircuitOpenError):
+            _circuit_open(receipt, exc, response)
         return receipt
 
+    _mark_call_sent(proposal_id)
+
+    # Improvement #7: action_taken includes exact endpoint, domain/service, payload
+    action_taken = {
+        "type": proposal.action.type.value,
+        "entity_id": entity_id,
+        "endpoint": service_result.get("endpoint"),
+        "domain_service": service_result.get("domain_service"),
+        "payload": service_result.get("payload"),
+        "status_code": service_result.get("status_code"),
+    }
+    if on_call is not None:
+        on_call(action_taken)
+
     # --- 5. Verify outcome ---
-    passed, evidence, after_state = await verify_outcome(proposal.action.expected_outcome)
+    try:
+        passed, evidence, after_state, timing = await verify_outcome(
+            proposal.action.expected_outcome, policy,
+        )
+    except CircuitOpenError as exc:
+        receipt = ExecutionReceipt(
+            proposal_id=proposal_id,
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
+            decision="failed",
+            policy_basis=law.policy_basis,
+            action_taken=action_taken,
+            verification=Verification(**{
+                "pass": False,
+                "evidence": f"Service call sent; verification stopped: {exc}",
+            }),
+            before_state=before_state,
+            before_state_source=before_read.to_dict(),
+            audit_ref=f"audit:{proposal_id}",
+            failure_language_hint=f"HA became unavailable before {entity_id} could be verified",
+        )
+        return _circuit_open(receipt, exc, response)
 
     decision = "allowed" if passed else "failed"
 
-    # Improvement #7: action_taken includes exact endpoint, domain/service, payload
     receipt = ExecutionReceipt(
         proposal_id=proposal_id,
         timestamp=datetime.now(timezone.utc).isoformat(),
         source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
         decision=decision,
         policy_basis=law.policy_basis,
-        action_taken={
-            "type": proposal.action.type.value,
-            "entity_id": entity_id,
-            "endpoint": service_result.get("endpoint"),
-            "domain_service": service_result.get("domain_service"),
-            "payload": service_result.get("payload"),
-            "status_code": service_result.get("status_code"),
-        },
-        verification=Verification(**{"pass": passed, "evidence": evidence}),
+        action_taken=action_taken,
+        verification=Verification(**{"pass": passed, "evidence": evidence, **timing}),
         before_state=before_state,
+        before_state_source=before_read.to_dict(),
         after_state=after_state,
         audit_ref=f"audit:{proposal_id}",
         failure_language_hint=evidence if not passed else None,
     )
+    return receipt
 
-    # --- 6. Audit: receipt ---
-    append_audit_event(_make_audit_event(
-        event_type="execution_receipt.out",
-        request_id=request_id,
-        proposal_id=proposal_id,
-        payload=receipt.model_dump(by_alias=True),
-    ))
 
-    return receipt
+async def _execute_batch_items(
+    items: list[tuple[int, ExecutionProposal]],
+    policy: PolicySnapshot,
+    response: Response,
+    priority: Optional[str],
+    receipts: list[Optional[ExecutionReceipt]],
+) -> None:
+    """Run ``(index, proposal)`` items of a batch; receipts land at their index."""
+    now_iso = datetime.now(timezone.utc).isoformat()
+    if not HA_TOKEN:
+        for i, proposal in items:
+            receipts[i] = await _emit_receipt(
+                _misconfigured_receipt(proposal, now_iso), proposal.request_id,
+            )
+        return
+    for _, proposal in items:
+        append_audit_event(_make_audit_event(
+            event_type="execution_proposal.in",
+            request_id=proposal.request_id,
+            proposal_id=proposal.proposal_id,
+            payload=_sanitize_proposal_for_audit(proposal),
+        ))
+    decisions = evaluate_law_batch([proposal for _, proposal in items], policy)
+    allowed: list[tuple[int, ExecutionProposal, LawDecision]] = []
+    for (i, proposal), law in zip(items, decisions):
+        _audit_law_decision(proposal, law, policy)
+        if law.allowed:
+            allowed.append((i, proposal, law))
+        else:
+            receipts[i] = await _emit_receipt(
+                _denied_receipt(proposal, law, now_iso), proposal.request_id,
+            )
+
+    cache = _state_cache
+    if cache is not None and len(allowed) >= STATE_POLL_BULK_THRESHOLD:
+        await cache.warm(ha_get_states)
+    semaphore = asyncio.Semaphore(max(1, EXECUTE_BATCH_CONCURRENCY))
+
+    async def run(i: int, proposal: ExecutionProposal, law: LawDecision) -> None:
+        async with semaphore:
+            try:
+                admission = await _admission.acquire(
+                    _admission_source(proposal), _admission_lane(proposal, priority),
+                )
+            except AdmissionRejected as exc:
+                receipt = _admission_rejected(proposal, law, exc, response, now_iso)
+                receipts[i] = await _emit_receipt(receipt, proposal.request_id)
+                return
+            receipts[i] = await _execute_allowed(
+                proposal, policy, law, response, now_iso, admission=admission,
+            )
+
+    await asyncio.gather(*(run(i, proposal, law) for i, proposal, law in allowed))
+
+
+@app.post("/execute/proposals", response_model=BatchReceipt)
+async def execute_proposals(
+    proposals: list[ExecutionProposal],
+    response: Response,
+    priority: Optional[str] = Header(default=None),
+):
+    """
+    Execute a batch of proposals — a scene — and return one BatchReceipt.
+
+    Law judges every proposal against one policy snapshot in a single pass;
+    the allowed ones then run concurrently, at most EXECUTE_BATCH_CONCURRENCY
+    at a time.  Each is executed exactly as by POST /execute/proposal and
+    keeps its own receipt and audit trail, while their HA reads are shared:
+    before-states come from one bulk GET /api/states when the batch reaches
+    STATE_POLL_BULK_THRESHOLD entities (with the state cache running), and
+    concurrent verifications are served by the same poller ticks or pushed
+    state_changed events.  A Retry-After header is set if any proposal hit
+    the open HA circuit or was turned away by admission control (each
+    allowed proposal is admitted on its own; see POST /execute/proposal).
+
+    Proposals already in the receipt store are not executed again: their
+    stored (or in-flight) receipts are returned in place.  A proposal_id
+    re-submitted with a different body rejects the batch with 409.
+    """
+    if len(proposals) > EXECUTE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(proposals)} proposals; limit is {EXECUTE_BATCH_MAX_ITEMS}",
+        )
+    proposal_ids = [p.proposal_id for p in proposals]
+    if len(set(proposal_ids)) != len(proposal_ids):
+        raise HTTPException(status_code=400, detail="proposal_id values must be unique within a batch")
+
+    started = time.perf_counter()
+    batch_id = str(uuid.uuid4())
+    policy = _get_policy_snapshot()
+    receipts: list[Optional[ExecutionReceipt]] = [None] * len(proposals)
+
+    store = _receipt_store
+    replays: dict[int, StoredReceipt] = {}
+    if store is not None:
+        fingerprints = [_proposal_fingerprint(p) for p in proposals]
+        # All checked before any is claimed, so a 409 leaves nothing in flight.
+        for proposal, fingerprint in zip(proposals, fingerprints):
+            _check_fingerprint(store.get(proposal.proposal_id), fingerprint, proposal.proposal_id)
+        for i, (proposal, fingerprint) in enumerate(zip(proposals, fingerprints)):
+            stored = _claim_proposal(store, proposal, fingerprint)
+            if stored is not None:
+                replays[i] = stored
+    fresh = [(i, proposal) for i, proposal in enumerate(proposals) if i not in replays]
+    try:
+        await _execute_batch_items(fresh, policy, response, priority, receipts)
+    except BaseException:
+        if store is not None:
+            for _, proposal in fresh:
+                store.abandon(proposal.proposal_id)
+        raise
+    for i, stored in replays.items():
+        receipts[i] = await _replayed_receipt(store, stored, proposals[i].proposal_id)
+
+    done = [receipt for receipt in receipts if receipt is not None]
+    counts = Counter(receipt.decision for receipt in done)
+    batch = BatchReceipt(
+        batch_id=batch_id,
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        source={"service": "shammash", "instance": SHAMMASH_INSTANCE},
+        policy_version=policy.version,
+        counts={decision: counts[decision] for decision in ("allowed", "denied", "failed")},
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+        receipts=done,
+    )
+    append_audit_event(AuditEvent(
+        event_id=str(uuid.uuid4()),
+        timestamp=batch.timestamp,
+        service="shammash",
+        event_type="execution_batch",
+        correlation={"request_id": batch_id},
+        payload={
+            "batch_id": batch_id,
+            "policy_version": policy.version,
+            "proposal_ids": proposal_ids,
+            "counts": batch.counts,
+            "duration_ms": batch.duration_ms,
+        },
+    ))
+    return batch
@@ -0,0 +1,151 @@
+"""
+Hash chain and signed Merkle checkpoints for the Shammash audit log.
+
+Every stored line ends with a chain object spliced in by the writer:
+
+    {...event...,"chain":{"index":41,"prev":"<hex>","hash":"<hex>"}}
+
+where ``hash = sha256(bytes.fromhex(prev) + body)`` and ``body`` is the line
+without the chain suffix (i.e. exactly what AuditEvent.model_dump_json()
+produced).  Removing, reordering or editing any event breaks the chain.
+
+Every AUDIT_CHECKPOINT_EVERY events (and whenever a segment is sealed) the
+writer records a checkpoint in that segment's manifest entry: the Merkle
+root of the window's event hashes, the last hash, and an HMAC-SHA256
+signature keyed by AUDIT_CHECKPOINT_KEY.  A verifier that trusts one
+checkpoint only has to re-hash the events written after it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+from typing import Any, Optional
+
+GENESIS_HASH = "0" * 64
+
+_CHAIN_MARKER = b',"chain":'
+
+
+def event_hash(prev_hex: str, body: bytes) -> str:
+    return hashlib.sha256(bytes.fromhex(prev_hex) + body).hexdigest()
+
+
+def split_chain(line: bytes) -> tuple[bytes, Optional[dict[str, Any]]]:
+    """
+    Split a stored line into (body, chain).  ``chain`` is None for lines
+    written before chaining was enabled.
+
+    The chain object is always the last key, and a literal ``,"chain":``
+    cannot occur inside a JSON string (quotes are escaped), so the last
+    occurrence is ours even if the payload has its own "chain" key.
+    """
+    line = line.rstrip(b"\r\n")
+    cut = line.rfind(_CHAIN_MARKER)
+    if cut < 0:
+        return line, None
+    try:
+        chain = json.loads(line[cut + len(_CHAIN_MARKER):-1])
+    except ValueError:
+        return line, None
+    if not isinstance(chain, dict) or "hash" not in chain:
+        return line, None
+    return line[:cut] + b"}", chain
+
+
+def merkle_root(leaves: list[bytes]) -> str:
+    """Binary Merkle root (odd nodes are paired with themselves)."""
+    if not leaves:
+        return GENESIS_HASH
+    level = leaves
+    while len(level) > 1:
+        if len(level) % 2:
+            level = level + [level[-1]]
+        level = [
+            hashlib.sha256(level[i] + level[i + 1]).digest()
+            for i in range(0, len(level), 2)
+        ]
+    return level[0].hex()
+
+
+def _checkpoint_message(checkpoint: dict[str, Any]) -> bytes:
+    unsigned = {k: v for k, v in checkpoint.items() if k != "sig"}
+    return json.dumps(unsigned, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def sign_checkpoint(checkpoint: dict[str, Any], key: Optional[bytes]) -> dict[str, Any]:
+    checkpoint["sig"] = (
+        hmac.new(key, _checkpoint_message(checkpoint), hashlib.sha256).hexdigest()
+        if key else None
+    )
+    return checkpoint
+
+
+def checkpoint_signature_valid(checkpoint: dict[str, Any], key: Optional[bytes]) -> bool:
+    if not key:
+        return True  # unsigned deployment: chain + roots still checked
+    sig = checkpoint.get("sig")
+    if not sig:
+        return False
+    expected = hmac.new(key, _checkpoint_message(checkpoint), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, sig)
+
+
+class ChainState:
+    """Running chain head plus the event hashes since the last checkpoint."""
+
+    def __init__(self, checkpoint_every: int = 1024, key: Optional[bytes] = None) -> None:
+        self.checkpoint_every = max(1, int(checkpoint_every))
+        self.key = key
+        self.last_hash = GENESIS_HASH
+        self.next_index = 0
+        self.window: list[bytes] = []
+        self.window_first_index = 0
+
+    def link(self, body: bytes) -> tuple[bytes, dict[str, Any]]:
+        """Chain one event body; return (stored line without newline, chain)."""
+        digest = event_hash(self.last_hash, body)
+        chain = {"index": self.next_index, "prev": self.last_hash, "hash": digest}
+        if not self.window:
+            self.window_first_index = self.next_index
+        self.window.append(bytes.fromhex(digest))
+        self.last_hash = digest
+        self.next_index += 1
+        suffix = json.dumps(chain, separators=(",", ":")).encode("utf-8")
+        return body[:-1] + _CHAIN_MARKER + suffix + b"}", chain
+
+    def observe(self, chain: dict[str, Any]) -> None:
+        """Replay an already-stored event (recovery)."""
+        if not self.window:
+            self.window_first_index = chain["index"]
+        self.window.append(bytes.fromhex(chain["hash"]))
+        self.last_hash = chain["hash"]
+        self.next_index = chain["index"] + 1
+
+    def save(self) -> tuple[Any, ...]:
+        """Opaque copy of the head, for rewinding a batch that failed to write."""
+        return (self.last_hash, self.next_index, len(self.window), self.window_first_index)
+
+    def restore(self, saved: tuple[Any, ...]) -> None:
+        self.last_hash, self.next_index, window_len, self.window_first_index = saved
+        del self.window[window_len:]
+
+    @property
+    def due(self) -> bool:
+        return len(self.window) >= self.checkpoint_every
+
+    def checkpoint(self, segment_seq: int, end_offset: int) -> Optional[dict[str, Any]]:
+        """Close the current window into a signed checkpoint."""
+        if not self.window:
+            return None
+        checkpoint = {
+            "segment": segment_seq,
+            "first_index": self.window_first_index,
+            "last_index": self.next_index - 1,
+            "end_offset": end_offset,
+            "root": merkle_root(self.window),
+            "last_hash": self.last_hash,
+        }
+        self.window = []
+        return sign_checkpoint(checkpoint, self.key)
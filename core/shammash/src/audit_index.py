@@ -0,0 +1,274 @@
+"""
+Sidecar lookup index for Shammash audit segments.
+
+Maps proposal_id, request_id and event_type to (segment seq, byte offset)
+in an SQLite database next to the log (``events.index.sqlite3``).  Rows are
+added by the audit writer thread one transaction per batch, so the index
+is built incrementally as events are appended and never rescans history.
+
+Compressed segments are written as independent gzip members / zstd frames
+(see audit_segments); the ``blocks`` table maps uncompressed offsets to
+compressed byte ranges so a lookup decompresses one small block instead of
+the whole segment.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Iterable, Optional, Sequence
+
+from .audit_segments import (
+    AuditRecord,
+    open_segment,
+    record_from_line,
+    segment_path_for,
+    zstandard,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    event_type TEXT,
+    request_id TEXT,
+    proposal_id TEXT,
+    PRIMARY KEY (seq, offset)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_by_proposal ON events (proposal_id);
+CREATE INDEX IF NOT EXISTS events_by_request ON events (request_id);
+CREATE INDEX IF NOT EXISTS events_by_type ON events (event_type);
+CREATE TABLE IF NOT EXISTS blocks (
+    seq INTEGER NOT NULL,
+    ustart INTEGER NOT NULL,
+    cstart INTEGER NOT NULL,
+    clen INTEGER NOT NULL,
+    PRIMARY KEY (seq, ustart)
+) WITHOUT ROWID;
+"""
+
+
+def index_path_for(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.index.sqlite3")
+
+
+class AuditIndex:
+    """Write side of the index.  Owned by one SegmentedAuditWriter."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.db_path = index_path_for(self.path)
+        self._lock = threading.Lock()
+        try:
+            self._conn = self._connect()
+        except sqlite3.DatabaseError:
+            # Derived data: a damaged index is discarded and rebuilt by catch_up().
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{self.db_path}{suffix}").unlink(missing_ok=True)
+            self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # The index is rebuildable from the segments, so skip commit fsyncs.
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def add(self, records: Sequence[AuditRecord], locations: Sequence[tuple[int, int]]) -> None:
+        rows = [
+            (seq, offset, r.event_type or None, r.request_id or None, r.proposal_id or None)
+            for r, (seq, offset) in zip(records, locations)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute("COMMIT")
+
+    def add_blocks(self, seq: int, blocks: Iterable[tuple[int, int, int]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM blocks WHERE seq = ?", (seq,))
+            self._conn.executemany(
+                "INSERT INTO blocks VALUES (?, ?, ?, ?)",
+                [(seq, u, c, n) for u, c, n in blocks],
+            )
+            self._conn.execute("COMMIT")
+
+    def catch_up(self, manifest: dict[str, Any]) -> int:
+        """
+        Re-index any segment whose row count lags the manifest (crash
+        between file write and index commit, or a brand-new index).
+        Returns the number of events indexed.
+        """
+        segments = list(manifest["segments"])
+        if manifest.get("active") is not None:
+            segments.append(manifest["active"])
+        indexed = 0
+        for segment in segments:
+            with self._lock:
+                (count,) = self._conn.execute(
+                    "SELECT COUNT(*) FROM events WHERE seq = ?", (segment["seq"],)
+                ).fetchone()
+            if count >= segment["events"]:
+                continue
+            records: list[AuditRecord] = []
+            locations: list[tuple[int, int]] = []
+            offset = 0
+            with open_segment(self.path, segment) as fh:
+                for raw in fh:
+                    if raw.strip():
+                        try:
+                            records.append(record_from_line(raw.decode("utf-8")))
+                            locations.append((segment["seq"], offset))
+                        except ValueError:
+                            pass
+                    offset += len(raw)
+            self.add(records, locations)
+            indexed += len(records)
+        return indexed
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Read side
+# ---------------------------------------------------------------------------
+
+def _decompress_block(data: bytes, suffix: str) -> bytes:
+    if suffix == ".zst":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data, wbits=31)
+
+
+def _read_compressed(
+    conn: sqlite3.Connection,
+    seg_path: Path,
+    seq: int,
+    offsets: list[int],
+) -> dict[int, bytes]:
+    blocks = conn.execute(
+        "SELECT ustart, cstart, clen FROM blocks WHERE seq = ? ORDER BY ustart", (seq,)
+    ).fetchall()
+    found: dict[int, bytes] = {}
+    if not blocks:
+        # Compressed before the index existed: one sequential pass.
+        wanted = set(offsets)
+        pos = 0
+        with open_segment(seg_path, {"file": seg_path.name}) as fh:
+            for raw in fh:
+                if pos in wanted:
+                    found[pos] = raw
+                    if len(found) == len(wanted):
+                        break
+                pos += len(raw)
+        return found
+    starts = [b[0] for b in blocks]
+    cache: dict[int, bytes] = {}
+    with open(seg_path, "rb") as fh:
+        for offset in offsets:
+            i = bisect.bisect_right(starts, offset) - 1
+            if i < 0:
+                continue
+            if i not in cache:
+                ustart, cstart, clen = blocks[i]
+                fh.seek(cstart)
+                cache[i] = _decompress_block(fh.read(clen), seg_path.suffix)
+            block = cache[i]
+            rel = offset - starts[i]
+            end = block.find(b"\n", rel)
+            found[offset] = block[rel: end + 1 if end >= 0 else len(block)]
+    return found
+
+
+def _read_plain(seg_path: Path, offsets: list[int]) -> dict[int, bytes]:
+    found: dict[int, bytes] = {}
+    with open(seg_path, "rb") as fh:
+        for offset in offsets:
+            fh.seek(offset)
+            found[offset] = fh.readline()
+    return found
+
+
+def _read_segment_lines(
+    conn: sqlite3.Connection,
+    path: Path,
+    seq: int,
+    offsets: list[int],
+) -> dict[int, bytes]:
+    """Resolve a segment by naming convention: compressed, sealed, active."""
+    sealed = segment_path_for(path, seq)
+    for suffix in (".gz", ".zst"):
+        candidate = sealed.with_name(sealed.name + suffix)
+        if candidate.exists():
+            return _read_compressed(conn, candidate, seq, offsets)
+    for candidate in (sealed, path):
+        try:
+            return _read_plain(candidate, offsets)
+        except FileNotFoundError:
+            continue
+    return {}
+
+
+def lookup_events(
+    path: Path,
+    proposal_id: Optional[str] = None,
+    request_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    limit: int = 1000,
+) -> list[dict[str, Any]]:
+    """
+    Return audit events matching every given key, oldest first.
+
+    Cost is one indexed query plus one seek (or one small block
+    decompression) per matching event — independent of total log size.
+    """
+    path = Path(path)
+    keys = {"proposal_id": proposal_id, "request_id": request_id, "event_type": event_type}
+    where = [(col, val) for col, val in keys.items() if val is not None]
+    if not where:
+        raise ValueError("At least one of proposal_id, request_id, event_type is required")
+    db_path = index_path_for(path)
+    if not db_path.exists():
+        return []
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        sql = (
+            "SELECT seq, offset FROM events WHERE "
+            + " AND ".join(f"{col} = ?" for col, _ in where)
+            + " ORDER BY seq, offset LIMIT ?"
+        )
+        rows = conn.execute(sql, [val for _, val in where] + [limit]).fetchall()
+        by_seq: dict[int, list[int]] = {}
+        for seq, offset in rows:
+            by_seq.setdefault(seq, []).append(offset)
+        events: list[dict[str, Any]] = []
+        for seq, offsets in by_seq.items():
+            lines = _read_segment_lines(conn, path, seq, offsets)
+            for offset in offsets:
+                raw = lines.get(offset)
+                if not raw:
+                    continue
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    continue
+                # Guard against a rotation racing the read: keys must match.
+                correlation = event.get("correlation") or {}
+                if all(
+                    (event.get(col) if col == "event_type" else correlation.get(col)) == val
+                    for col, val in where
+                ):
+                    events.append(event)
+        return events
+    finally:
+        conn.close()
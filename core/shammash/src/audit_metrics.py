@@ -0,0 +1,542 @@
+"""
+Columnar audit export and offline metrics (SPEC.md "Metrics").
+
+Run from repository root:
+    python -m core.shammash.src.audit_metrics shared/audit/events.jsonl \
+        [--since 2026-01-01] [--until 2026-02-01] [--by month] [--parquet out.parquet]
+
+Reads Shammash ``AuditEvent`` logs and reference ``AuditEntry`` logs
+(segmented or not) and converts each file once into NumPy columns cached
+under ``<stem>.columns/``.  Sealed segments are immutable, so only the
+active file is re-parsed on later runs; a monthly report is then a handful
+of vectorized group-bys over in-memory arrays.
+
+Columns: ``ts`` (float64 epoch seconds), ``outcome`` (int8: 1 positive,
+0 negative, -1 n/a), ``flags`` (uint8 bitmask; executions are counted from
+attempts, successes from verified receipts) and dictionary-encoded
+``kind``, ``event_type``, ``proposal_id``, ``entity``, ``policy_basis`` and
+``status``.  ``policy_basis`` holds the deciding rule (last ``law.*`` basis
+entry for Shammash, the decision/skip reason for the reference gate).
+
+Requires ``numpy``; ``--parquet`` additionally requires ``pyarrow``
+(see requirements-analytics.txt).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+try:  # optional analytics dependencies
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - depends on environment
+    pyarrow = None
+try:  # ~3x faster line parsing when available
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - depends on environment
+    _loads = json.loads
+
+from .audit_segments import manifest_path_for, open_segment
+from .audit_streams import discover_streams
+
+DICT_COLUMNS = ("kind", "event_type", "proposal_id", "entity", "policy_basis", "status")
+
+FLAG_EXECUTED = 1  # an execution was attempted (Shammash: execution_attempt)
+FLAG_RATE_LIMITED = 2
+FLAG_ROLLBACK = 4
+FLAG_SUCCEEDED = 8  # an execution completed and verified
+
+# Bump when row normalization changes so stale caches are rebuilt.
+_CACHE_VERSION = 2
+
+_SHAMMASH_KINDS = {
+    "execution_proposal.in": "proposal",
+    "law_decision": "decision",
+    "execution_attempt": "attempt",
+    "execution_receipt.out": "execution",
+}
+_REFERENCE_KINDS = {
+    "propose": "proposal",
+    "decision": "decision",
+    "execute": "execution",
+    "learn": "learn",
+    "rollback": "rollback",
+}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy is required for audit metrics (pip install numpy)")
+
+
+def _epoch(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+# ---------------------------------------------------------------------------
+# Row normalization
+# ---------------------------------------------------------------------------
+
+def _rate_limited(text: str) -> bool:
+    lowered = text.lower()
+    return "rate limit" in lowered or "rate_limit" in lowered
+
+
+def _normalize(event: dict[str, Any]) -> tuple:
+    """
+    Map one Shammash or reference event to
+    (ts, kind, event_type, proposal_id, entity, policy_basis, status, outcome, flags).
+    """
+    payload = event.get("payload") or {}
+    outcome = -1
+    flags = 0
+    entity = basis = status = ""
+    if "stage" in event:  # reference AuditEntry
+        event_type = event["stage"]
+        kind = _REFERENCE_KINDS.get(event_type, "other")
+        proposal_id = event.get("proposal_id") or ""
+        if kind == "proposal":
+            entity = payload.get("resource") or ""
+        elif kind == "decision":
+            outcome = 1 if payload.get("approved") else 0
+            basis = payload.get("reason") or ""
+        elif kind == "execution":
+            status = payload.get("status") or ""
+            if status != "SKIPPED":
+                flags |= FLAG_EXECUTED
+                outcome = 1 if status == "SUCCESS" else 0
+            if status == "SUCCESS":
+                flags |= FLAG_SUCCEEDED
+            else:
+                basis = payload.get("details") or ""
+        elif kind == "learn":
+            status = payload.get("execution_status") or ""
+        return (
+            float(event["timestamp"]), kind, event_type, proposal_id, entity,
+            basis, status, outcome, flags | _extra_flags(kind, basis, payload),
+        )
+
+    event_type = event.get("event_type") or ""
+    kind = _SHAMMASH_KINDS.get(event_type, "other")
+    proposal_id = (event.get("correlation") or {}).get("proposal_id") or ""
+    policy_basis = payload.get("policy_basis") or []
+    if policy_basis:
+        # The deciding rule; later entries may be tags like policy=<version>.
+        basis = next((b for b in reversed(policy_basis) if b.startswith("law.")), policy_basis[-1])
+    if kind == "proposal":
+        entity = ((payload.get("action") or {}).get("target") or {}).get("entity_id") or ""
+    elif kind == "decision":
+        outcome = 1 if payload.get("allowed") else 0
+    elif kind == "attempt":
+        # Counted here, not on the receipt: a failed service call yields a
+        # receipt without action_taken but was still an execution.
+        entity = payload.get("entity_id") or ""
+        flags |= FLAG_EXECUTED
+    elif kind == "execution":
+        status = payload.get("decision") or ""
+        action_taken = payload.get("action_taken") or {}
+        entity = action_taken.get("entity_id") or ""
+        if action_taken and (payload.get("verification") or {}).get("pass"):
+            flags |= FLAG_SUCCEEDED
+            outcome = 1
+        elif status == "failed":
+            outcome = 0
+    return (
+        _epoch(event.get("timestamp")) or 0.0, kind, event_type, proposal_id, entity,
+        basis, status, outcome, flags | _extra_flags(kind, basis, payload),
+    )
+
+
+def _extra_flags(kind: str, basis: str, payload: dict[str, Any]) -> int:
+    flags = 0
+    if basis and _rate_limited(basis):
+        flags |= FLAG_RATE_LIMITED
+    if kind == "rollback" or payload.get("rolled_back") is True:
+        flags |= FLAG_ROLLBACK
+    return flags
+
+
+# ---------------------------------------------------------------------------
+# Columnar table
+# ---------------------------------------------------------------------------
+
+class AuditColumns:
+    """Column arrays plus one string dictionary per dictionary-encoded column."""
+
+    def __init__(
+        self,
+        ts: "np.ndarray",
+        outcome: "np.ndarray",
+        flags: "np.ndarray",
+        codes: dict[str, "np.ndarray"],
+        dictionaries: dict[str, "np.ndarray"],
+        malformed: int = 0,
+    ) -> None:
+        self.ts = ts
+        self.outcome = outcome
+        self.flags = flags
+        self.codes = codes
+        self.dictionaries = dictionaries
+        self.malformed = malformed
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def code(self, column: str, value: str) -> int:
+        """Dictionary code of ``value`` in ``column`` (-1 if absent)."""
+        hits = np.flatnonzero(self.dictionaries[column] == value)
+        return int(hits[0]) if hits.size else -1
+
+    def save(self, path: Path) -> None:
+        arrays = {
+            "version": np.array(_CACHE_VERSION),
+            "ts": self.ts,
+            "outcome": self.outcome,
+            "flags": self.flags,
+            "malformed": np.array(self.malformed),
+        }
+        for name in DICT_COLUMNS:
+            arrays[name] = self.codes[name]
+            arrays[f"{name}__dict"] = self.dictionaries[name]
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["AuditColumns"]:
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != _CACHE_VERSION:
+                return None
+            return cls(
+                data["ts"], data["outcome"], data["flags"],
+                {name: data[name] for name in DICT_COLUMNS},
+                {name: data[f"{name}__dict"] for name in DICT_COLUMNS},
+                int(data["malformed"]),
+            )
+
+    @classmethod
+    def concat(cls, parts: list["AuditColumns"]) -> "AuditColumns":
+        """Concatenate parts, re-mapping each part's codes into merged dictionaries."""
+        codes: dict[str, "np.ndarray"] = {}
+        dictionaries: dict[str, "np.ndarray"] = {}
+        for name in DICT_COLUMNS:
+            values = [part.dictionaries[name] for part in parts]
+            if not values:
+                codes[name] = np.zeros(0, np.int32)
+                dictionaries[name] = np.array([""], dtype=str)
+                continue
+            # One sort over all part dictionaries; ``inverse`` maps each
+            # part-local code to its merged code.
+            merged, inverse = np.unique(np.concatenate(values), return_inverse=True)
+            bounds = np.cumsum([0] + [len(v) for v in values])
+            codes[name] = np.concatenate([
+                inverse[bounds[i]:bounds[i + 1]].astype(np.int32)[part.codes[name]]
+                for i, part in enumerate(parts)
+            ])
+            dictionaries[name] = merged
+        return cls(
+            np.concatenate([p.ts for p in parts]) if parts else np.zeros(0),
+            np.concatenate([p.outcome for p in parts]) if parts else np.zeros(0, np.int8),
+            np.concatenate([p.flags for p in parts]) if parts else np.zeros(0, np.uint8),
+            codes,
+            dictionaries,
+            sum(p.malformed for p in parts),
+        )
+
+    def select(self, mask: "np.ndarray") -> "AuditColumns":
+        return AuditColumns(
+            self.ts[mask], self.outcome[mask], self.flags[mask],
+            {name: codes[mask] for name, codes in self.codes.items()},
+            self.dictionaries,
+            self.malformed,
+        )
+
+
+def columns_from_lines(lines: Iterator[bytes]) -> AuditColumns:
+    """Parse audit lines of either format into an AuditColumns table."""
+    _require_numpy()
+    ts = array("d")
+    outcome = array("b")
+    flags = array("B")
+    codes = {name: array("i") for name in DICT_COLUMNS}
+    dictionaries: dict[str, dict[str, int]] = {name: {"": 0} for name in DICT_COLUMNS}
+    malformed = 0
+    for raw in lines:
+        if not raw.strip():
+            continue
+        if not raw.endswith(b"\n"):
+            break  # in-flight append at the end of the active file
+        try:
+            row = _normalize(_loads(raw))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            malformed += 1
+            continue
+        ts.append(row[0])
+        for name, value in zip(DICT_COLUMNS, row[1:7]):
+            lookup = dictionaries[name]
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            codes[name].append(code)
+        outcome.append(row[7])
+        flags.append(row[8])
+    return AuditColumns(
+        np.frombuffer(ts, dtype=np.float64).copy(),
+        np.frombuffer(outcome, dtype=np.int8).copy(),
+        np.frombuffer(flags, dtype=np.uint8).copy(),
+        {name: np.frombuffer(codes[name], dtype=np.int32).copy() for name in DICT_COLUMNS},
+        {name: np.array(list(lookup), dtype=str) for name, lookup in dictionaries.items()},
+        malformed,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Sources and cache
+# ---------------------------------------------------------------------------
+
+def cache_dir_for(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.columns")
+
+
+def _resolve(base: Path, name: str) -> Optional[Path]:
+    # Shammash renames entries on compression; the reference log only adds .gz.
+    for candidate in (name, name + ".gz", name + ".zst"):
+        if (base / candidate).exists():
+            return base / candidate
+    stem = name.removesuffix(".gz").removesuffix(".zst")
+    for candidate in (stem, stem + ".gz", stem + ".zst"):
+        if (base / candidate).exists():
+            return base / candidate
+    return None
+
+
+def _sources(
+    path: Path,
+    since: Optional[float],
+    until: Optional[float],
+) -> list[tuple[Path, bool]]:
+    """(file, immutable) pairs overlapping [since, until], oldest first."""
+    sources: list[tuple[Path, bool]] = []
+    try:
+        with open(manifest_path_for(path), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {"segments": []}
+    for segment in manifest["segments"]:
+        last = _epoch(segment.get("last_ts"))
+        first = _epoch(segment.get("first_ts"))
+        if since is not None and last is not None and last < since:
+            continue
+        if until is not None and first is not None and first > until:
+            continue
+        resolved = _resolve(path.parent, segment["file"])
+        if resolved is not None:
+            sources.append((resolved, True))
+    if path.exists():
+        sources.append((path, False))
+    return sources
+
+
+def load_columns(
+    path: Path,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    cache_dir: Optional[Path] = None,
+) -> AuditColumns:
+    """
+    Columnar view of the audit log restricted to [since, until].
+
+    Each sealed segment is parsed once and cached as ``.npz``; the active
+    file is always re-read.  All worker streams are included.
+    """
+    _require_numpy()
+    path = Path(path)
+    parts: list[AuditColumns] = []
+    sources = [
+        (source, immutable, Path(cache_dir) if cache_dir else cache_dir_for(stream))
+        for stream in discover_streams(path) or [path]
+        for source, immutable in _sources(stream, since, until)
+    ]
+    for source, immutable, cache in sources:
+        cached = cache / (source.name.removesuffix(".gz").removesuffix(".zst") + ".npz")
+        part = None
+        if immutable and cached.exists():
+            part = AuditColumns.load(cached)
+        if part is None:
+            with open_segment(source, {"file": source.name}) as fh:
+                part = columns_from_lines(fh)
+            if immutable:
+                cache.mkdir(parents=True, exist_ok=True)
+                part.save(cached)
+        parts.append(part)
+    table = AuditColumns.concat(parts)
+    if since is not None or until is not None:
+        mask = np.ones(len(table), dtype=bool)
+        if since is not None:
+            mask &= table.ts >= since
+        if until is not None:
+            mask &= table.ts <= until
+        table = table.select(mask)
+    return table
+
+
+def export_parquet(table: AuditColumns, out: Path) -> None:
+    """Write the table as Parquet with dictionary-encoded string columns."""
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is required for Parquet export (pip install pyarrow)")
+    columns = {
+        "ts": pyarrow.array((table.ts * 1e9).astype("int64"), type=pyarrow.timestamp("ns", tz="UTC")),
+        "outcome": pyarrow.array(table.outcome),
+        "flags": pyarrow.array(table.flags),
+    }
+    for name in DICT_COLUMNS:
+        columns[name] = pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(table.codes[name]), pyarrow.array(table.dictionaries[name].tolist())
+        )
+    pyarrow.parquet.write_table(pyarrow.table(columns), out)
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def _rate(numerator: int, denominator: int) -> Optional[float]:
+    return round(numerator / denominator, 6) if denominator else None
+
+
+def _first_ts_per_proposal(table: AuditColumns, mask: "np.ndarray") -> "np.ndarray":
+    first = np.full(len(table.dictionaries["proposal_id"]), np.inf)
+    np.minimum.at(first, table.codes["proposal_id"][mask], table.ts[mask])
+    return first
+
+
+def _time_to_decision(table: AuditColumns, kind: "np.ndarray") -> dict[str, Any]:
+    has_proposal = table.codes["proposal_id"] != table.code("proposal_id", "")
+    proposed = _first_ts_per_proposal(table, has_proposal & (kind == table.code("kind", "proposal")))
+    decided = _first_ts_per_proposal(table, has_proposal & (kind == table.code("kind", "decision")))
+    valid = np.isfinite(proposed) & np.isfinite(decided) & (decided >= proposed)
+    ms = (decided[valid] - proposed[valid]) * 1000.0
+    if not ms.size:
+        return {"count": 0}
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def _period_keys(ts: "np.ndarray", by: str) -> "np.ndarray":
+    unit = {"day": "D", "month": "M"}[by]
+    return ts.astype("datetime64[s]").astype(f"datetime64[{unit}]")
+
+
+def compute_metrics(table: AuditColumns, top_n: int = 10, by: Optional[str] = None) -> dict[str, Any]:
+    """All SPEC.md metrics over ``table`` (optionally also per day/month)."""
+    _require_numpy()
+    kind = table.codes["kind"]
+    decisions = kind == table.code("kind", "decision")
+    approved = decisions & (table.outcome == 1)
+    denied = decisions & (table.outcome == 0)
+    executed = (table.flags & FLAG_EXECUTED) != 0
+    succeeded = (table.flags & FLAG_SUCCEEDED) != 0
+
+    reason_counts = np.bincount(
+        table.codes["policy_basis"][denied], minlength=len(table.dictionaries["policy_basis"])
+    )
+    top = np.argsort(-reason_counts, kind="stable")[:top_n]
+    n_decisions = int(decisions.sum())
+    n_executed = int(executed.sum())
+    report: dict[str, Any] = {
+        "events": len(table),
+        "first_ts": datetime.fromtimestamp(float(table.ts.min()), timezone.utc).isoformat()
+        if len(table) else None,
+        "last_ts": datetime.fromtimestamp(float(table.ts.max()), timezone.utc).isoformat()
+        if len(table) else None,
+        "decisions": n_decisions,
+        "approval_rate": _rate(int(approved.sum()), n_decisions),
+        "denial_reasons": [
+            {"policy_basis": str(table.dictionaries["policy_basis"][code]), "count": int(reason_counts[code])}
+            for code in top if reason_counts[code]
+        ],
+        "time_to_decision": _time_to_decision(table, kind),
+        "executions": n_executed,
+        "execution_success_rate": _rate(int(succeeded.sum()), n_executed),
+        "rollback_incidence": _rate(int(((table.flags & FLAG_ROLLBACK) != 0).sum()), n_executed),
+        "rate_limit_hits": int(((table.flags & FLAG_RATE_LIMITED) != 0).sum()),
+        "durability": {"malformed_lines": table.malformed},
+    }
+    if by is not None and len(table):
+        periods, inverse = np.unique(_period_keys(table.ts, by), return_inverse=True)
+        n = len(periods)
+        counts = {
+            "events": np.bincount(inverse, minlength=n),
+            "decisions": np.bincount(inverse, weights=decisions, minlength=n),
+            "approved": np.bincount(inverse, weights=approved, minlength=n),
+            "executions": np.bincount(inverse, weights=executed, minlength=n),
+            "succeeded": np.bincount(inverse, weights=succeeded, minlength=n),
+        }
+        report["periods"] = [
+            {
+                "period": str(periods[i]),
+                "events": int(counts["events"][i]),
+                "decisions": int(counts["decisions"][i]),
+                "approval_rate": _rate(int(counts["approved"][i]), int(counts["decisions"][i])),
+                "executions": int(counts["executions"][i]),
+                "execution_success_rate": _rate(
+                    int(counts["succeeded"][i]), int(counts["executions"][i])
+                ),
+            }
+            for i in range(n)
+        ]
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compute SPEC metrics from an audit log.")
+    parser.add_argument("audit_path", type=Path, help="Active audit log (AUDIT_JSONL_PATH or AuditLog path)")
+    parser.add_argument("--since", help="ISO date/time (UTC if no offset)")
+    parser.add_argument("--until", help="ISO date/time (UTC if no offset)")
+    parser.add_argument("--by", choices=("day", "month"), help="Also report per period")
+    parser.add_argument("--top", type=int, default=10, help="Number of denial reasons")
+    parser.add_argument("--cache-dir", type=Path, default=None)
+    parser.add_argument("--parquet", type=Path, default=None, help="Also export the columns as Parquet")
+    args = parser.parse_args(argv)
+
+    table = load_columns(
+        args.audit_path,
+        since=_epoch(args.since),
+        until=_epoch(args.until),
+        cache_dir=args.cache_dir,
+    )
+    if args.parquet is not None:
+        export_parquet(table, args.parquet)
+    print(json.dumps(compute_metrics(table, top_n=args.top, by=args.by), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,606 @@
+"""
+Segmented, rotating and compressed audit storage for Shammash.
+
+The active segment always lives at AUDIT_JSONL_PATH (``events.jsonl``) so
+``tail -f`` keeps working.  When it exceeds AUDIT_SEGMENT_MAX_BYTES or
+AUDIT_SEGMENT_MAX_AGE_SECONDS it is sealed: renamed to
+``events-000123.jsonl`` and compressed in the background
+(``events-000123.jsonl.gz``, or ``.zst`` with the optional ``zstandard``
+package).
+
+A small manifest (``events.manifest.json``) records each segment's time
+range, event count and first/last proposal_id, so readers only open the
+segments that overlap the window they ask for.
+
+Compressed segments are a concatenation of independent gzip members (or
+zstd frames) of ~COMPRESSION_BLOCK_BYTES each, cut on line boundaries.  The
+result is still a normal .gz/.zst file, but an AuditIndex can decompress a
+single block to reach one line.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Iterator, NamedTuple, Optional
+
+from .audit_chain import ChainState, split_chain
+
+if TYPE_CHECKING:
+    from .audit_index import AuditIndex
+
+try:  # optional dependency — gzip from the stdlib is always available
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+COMPRESSION_MODES = ("gzip", "zstd", "none")
+_COMPRESSED_SUFFIX = {"gzip": ".gz", "zstd": ".zst"}
+
+DEFAULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+COMPRESSION_BLOCK_BYTES = 256 * 1024
+
+
+class AuditRecord(NamedTuple):
+    """One audit line plus the correlation keys the storage layer indexes."""
+    line: str
+    timestamp: str
+    event_type: str = ""
+    request_id: str = ""
+    proposal_id: str = ""
+
+
+def manifest_path_for(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.manifest.json")
+
+
+def segment_path_for(path: Path, seq: int) -> Path:
+    return path.with_name(f"{path.stem}-{seq:06d}{path.suffix}")
+
+
+def _parse_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _new_segment(seq: int, name: str) -> dict[str, Any]:
+    return {
+        "seq": seq,
+        "file": name,
+        "state": "active",
+        "opened_at": _now_iso(),
+        "bytes": 0,
+        "events": 0,
+        "first_ts": None,
+        "last_ts": None,
+        "first_proposal_id": None,
+        "last_proposal_id": None,
+    }
+
+
+def _note_record(
+    segment: dict[str, Any],
+    record: AuditRecord,
+    nbytes: int,
+    chain: Optional[dict[str, Any]] = None,
+) -> None:
+    segment["bytes"] += nbytes
+    segment["events"] += 1
+    if segment["first_ts"] is None:
+        segment["first_ts"] = record.timestamp
+        segment["first_proposal_id"] = record.proposal_id or None
+    segment["last_ts"] = record.timestamp
+    if record.proposal_id:
+        segment["last_proposal_id"] = record.proposal_id
+    if chain is not None:
+        if "chain_prev" not in segment:
+            segment["chain_prev"] = chain["prev"]
+            segment["chain_first_index"] = chain["index"]
+        segment["chain_last_hash"] = chain["hash"]
+        segment["chain_last_index"] = chain["index"]
+
+
+def record_from_line(line: str) -> AuditRecord:
+    """Rebuild an AuditRecord from a stored JSONL line (used on recovery)."""
+    data = json.loads(line)
+    correlation = data.get("correlation") or {}
+    return AuditRecord(
+        line=line,
+        timestamp=data.get("timestamp", ""),
+        event_type=data.get("event_type", ""),
+        request_id=correlation.get("request_id", ""),
+        proposal_id=correlation.get("proposal_id", ""),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+def load_manifest(path: Path) -> dict[str, Any]:
+    """Read the manifest for the audit log at ``path`` (empty if missing)."""
+    mpath = manifest_path_for(path)
+    try:
+        with open(mpath, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {"version": 1, "next_seq": 1, "active": None, "segments": []}
+    data.setdefault("segments", [])
+    data.setdefault("active", None)
+    data.setdefault("next_seq", 1)
+    return data
+
+
+def _save_manifest(path: Path, manifest: dict[str, Any]) -> None:
+    """Atomic replace — readers never see a half-written manifest."""
+    mpath = manifest_path_for(path)
+    tmp = mpath.with_name(mpath.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp, mpath)
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+class SegmentedAuditWriter:
+    """
+    Appends batches of AuditRecords to the active segment and rotates it.
+
+    Not thread-safe for concurrent write() calls — the AuditSink writer
+    thread is the only producer.  Background compression and readers share
+    the manifest through ``_lock``.  When an AuditIndex is given, every
+    batch is indexed right after it is written.  When a ChainState is given,
+    every line is hash-chained and signed checkpoints are recorded in the
+    segment's manifest entry.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES,
+        max_age_seconds: float = 0,
+        compression: str = "gzip",
+        compress_in_background: bool = True,
+        index: Optional["AuditIndex"] = None,
+        chain: Optional[ChainState] = None,
+    ) -> None:
+        if compression not in COMPRESSION_MODES:
+            raise ValueError(
+                f"Unknown audit compression '{compression}'; "
+                f"expected one of {list(COMPRESSION_MODES)}"
+            )
+        if compression == "zstd" and zstandard is None:
+            warnings.warn("zstandard is not installed; compressing audit segments with gzip")
+            compression = "gzip"
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self.max_age_seconds = float(max_age_seconds)
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._fh: Optional[IO[bytes]] = None
+        self._compressor: Optional[ThreadPoolExecutor] = None
+        self._compress_in_background = compress_in_background
+        self._index = index
+        self._chain = chain
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._manifest = load_manifest(self.path)
+        self._recover()
+
+    # -- recovery -----------------------------------------------------------
+
+    def _recover(self) -> None:
+        """Reconcile the manifest with what is actually on disk."""
+        active = self._manifest.get("active")
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if active is not None and active.get("bytes") == size:
+            pass
+        elif size == 0:
+            self._manifest["active"] = None
+        else:
+            # Crash or pre-segment log: rescan the (bounded) active file.
+            if active is None:
+                active = _new_segment(self._manifest["next_seq"], self.path.name)
+                self._manifest["next_seq"] += 1
+            else:
+                active.update(_new_segment(active["seq"], self.path.name))
+            with open(self.path, "rb") as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        # Torn write from a crash: drop it so the next
+                        # append does not glue onto half a line.
+                        f.close()
+                        os.truncate(self.path, active["bytes"])
+                        break
+                    if not raw.strip():
+                        active["bytes"] += len(raw)
+                        continue
+                    try:
+                        record = record_from_line(raw.decode("utf-8"))
+                    except ValueError:
+                        active["bytes"] += len(raw)
+                        continue
+                    _note_record(active, record, len(raw), split_chain(raw)[1])
+            self._manifest["active"] = active
+        pending = [
+            s for s in self._manifest["segments"]
+            if s["state"] == "sealed" and self.compression != "none"
+        ]
+        self._recover_chain()
+        _save_manifest(self.path, self._manifest)
+        if self._index is not None:
+            self._index.catch_up(self._manifest)
+        for segment in pending:
+            self._schedule_compression(segment["seq"])
+
+    def _recover_chain(self) -> None:
+        """Restore the chain head and the un-checkpointed window."""
+        chain = self._chain
+        if chain is None:
+            return
+        active = self._manifest.get("active")
+        candidates = list(self._manifest["segments"]) + ([active] if active else [])
+        for segment in reversed(candidates):
+            if segment.get("chain_last_hash"):
+                chain.last_hash = segment["chain_last_hash"]
+                chain.next_index = segment["chain_last_index"] + 1
+                break
+        if active is None or not self.path.exists():
+            return
+        checkpoints = active.get("checkpoints") or []
+        start = checkpoints[-1]["end_offset"] if checkpoints else 0
+        chain.window = []
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            for raw in f:
+                link = split_chain(raw)[1]
+                if link is not None:
+                    chain.observe(link)
+
+    # -- writing ------------------------------------------------------------
+
+    def _open(self) -> IO[bytes]:
+        if self._fh is None:
+            if self._manifest.get("active") is None:
+                seq = self._manifest["next_seq"]
+                self._manifest["next_seq"] = seq + 1
+                self._manifest["active"] = _new_segment(seq, self.path.name)
+                with self._lock:
+                    _save_manifest(self.path, self._manifest)
+            self._fh = open(self.path, "ab")
+        return self._fh
+
+    def _age_exceeded(self) -> bool:
+        active = self._manifest.get("active")
+        if not self.max_age_seconds or active is None or not active["events"]:
+            return False
+        opened = _parse_ts(active["opened_at"])
+        age = (datetime.now(timezone.utc) - opened).total_seconds()
+        return age >= self.max_age_seconds
+
+    def write(self, records: list[AuditRecord], durability: str = "flush") -> list[tuple[int, int]]:
+        """
+        Write a batch; return (segment seq, byte offset) for each record.
+
+        One write() per batch unless durability is fsync-per-event.
+        """
+        if self._age_exceeded():
+            self.rotate()
+        fh = self._open()
+        active = self._manifest["active"]
+        chain = self._chain
+        saved = None if chain is None else chain.save()
+        links: list[Optional[dict[str, Any]]] = []
+        if chain is None:
+            encoded = [r.line.encode("utf-8") for r in records]
+            links = [None] * len(records)
+        else:
+            encoded = []
+            for r in records:
+                line, link = chain.link(r.line.rstrip("\n").encode("utf-8"))
+                encoded.append(line + b"\n")
+                links.append(link)
+        offset = active["bytes"]
+        locations: list[tuple[int, int]] = []
+        try:
+            if durability == "fsync-per-event":
+                for data in encoded:
+                    fh.write(data)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+            else:
+                fh.write(b"".join(encoded))
+                if durability != "none":
+                    fh.flush()
+                if durability == "fsync-per-batch":
+                    os.fsync(fh.fileno())
+        except BaseException:
+            self._abort_write(offset, saved)
+            raise
+        checkpointed = False
+        for record, data, link in zip(records, encoded, links):
+            locations.append((active["seq"], offset))
+            offset += len(data)
+            _note_record(active, record, len(data), link)
+            if chain is not None and chain.due:
+                self._checkpoint(active)
+                checkpointed = True
+        if checkpointed:
+            with self._lock:
+                _save_manifest(self.path, self._manifest)
+        if self._index is not None:
+            self._index.add(records, locations)
+        if self.max_bytes and active["bytes"] >= self.max_bytes:
+            self.rotate()
+        return locations
+
+    def _abort_write(self, offset: int, saved: Optional[tuple[Any, ...]]) -> None:
+        """
+        Undo a failed batch: drop the file handle (and anything it still
+        buffers), cut the file back to ``offset`` and rewind the chain, so
+        the caller can retry the same records without a torn line or gap.
+        """
+        fh, self._fh = self._fh, None
+        if fh is not None:
+            try:
+                fh.close()
+            except OSError:
+                pass
+        try:
+            if self.path.exists() and self.path.stat().st_size > offset:
+                os.truncate(self.path, offset)
+        except OSError:
+            pass
+        if saved is not None:
+            self._chain.restore(saved)
+
+    def _checkpoint(self, segment: dict[str, Any]) -> None:
+        checkpoint = self._chain.checkpoint(segment["seq"], segment["bytes"])
+        if checkpoint is not None:
+            segment.setdefault("checkpoints", []).append(checkpoint)
+
+    def flush(self) -> None:
+        if self._fh is not None:
+            self._fh.flush()
+
+    def rotate(self) -> Optional[dict[str, Any]]:
+        """Seal the active segment (rename + schedule compression)."""
+        active = self._manifest.get("active")
+        if active is None or not active["events"]:
+            return None
+        if self._chain is not None:
+            # Sealed segments are always fully covered by checkpoints.
+            self._checkpoint(active)
+        if self._fh is not None:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            self._fh = None
+        sealed_path = segment_path_for(self.path, active["seq"])
+        with self._lock:
+            os.replace(self.path, sealed_path)
+            active["state"] = "sealed"
+            active["file"] = sealed_path.name
+            active["sealed_at"] = _now_iso()
+            self._manifest["segments"].append(active)
+            self._manifest["active"] = None
+            _save_manifest(self.path, self._manifest)
+        if self.compression != "none":
+            self._schedule_compression(active["seq"])
+        return active
+
+    def close(self) -> None:
+        """Close the active file, persist the manifest, finish compression."""
+        if self._fh is not None:
+            self._fh.flush()
+            self._fh.close()
+            self._fh = None
+        active = self._manifest.get("active")
+        if self._chain is not None and active is not None:
+            # Clean shutdown: checkpoint the tail so verifiers can trust it.
+            self._checkpoint(active)
+        with self._lock:
+            _save_manifest(self.path, self._manifest)
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
+            self._compressor = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    # -- compression --------------------------------------------------------
+
+    def _schedule_compression(self, seq: int) -> None:
+        if not self._compress_in_background:
+            self._compress(seq)
+            return
+        if self._compressor is None:
+            self._compressor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="shammash-audit-compress"
+            )
+        self._compressor.submit(self._compress, seq)
+
+    def _compress(self, seq: int) -> None:
+        with self._lock:
+            segment = next(
+                (s for s in self._manifest["segments"] if s["seq"] == seq), None
+            )
+            if segment is None or segment["state"] != "sealed":
+                return
+            src = self.path.with_name(segment["file"])
+        dst = src.with_name(src.name + _COMPRESSED_SUFFIX[self.compression])
+        tmp = dst.with_name(dst.name + ".tmp")
+        blocks: list[tuple[int, int, int]] = []
+        try:
+            with open(src, "rb") as fin, open(tmp, "wb") as fout:
+                ustart = cstart = 0
+                for chunk in _line_chunks(fin, COMPRESSION_BLOCK_BYTES):
+                    data = _compress_block(chunk, self.compression)
+                    fout.write(data)
+                    blocks.append((ustart, cstart, len(data)))
+                    ustart += len(chunk)
+                    cstart += len(data)
+            os.replace(tmp, dst)
+        except Exception as exc:
+            warnings.warn(f"Failed to compress audit segment {src.name}: {exc}")
+            tmp.unlink(missing_ok=True)
+            return
+        if self._index is not None:
+            self._index.add_blocks(seq, blocks)
+        with self._lock:
+            segment["state"] = "compressed"
+            segment["file"] = dst.name
+            segment["compression"] = self.compression
+            segment["stored_bytes"] = dst.stat().st_size
+            _save_manifest(self.path, self._manifest)
+        src.unlink(missing_ok=True)
+
+    # -- introspection ------------------------------------------------------
+
+    def manifest(self) -> dict[str, Any]:
+        """A consistent copy of the in-memory manifest."""
+        with self._lock:
+            return json.loads(json.dumps(self._manifest))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            active = self._manifest.get("active") or {}
+            segments = self._manifest["segments"]
+            return {
+                "active_seq": active.get("seq"),
+                "active_bytes": active.get("bytes", 0),
+                "sealed_segments": len(segments),
+                "pending_compression": sum(1 for s in segments if s["state"] == "sealed"),
+            }
+
+
+def _line_chunks(fh: IO[bytes], target: int) -> Iterator[bytes]:
+    """Yield ~target-sized chunks of ``fh`` that always end on a newline."""
+    carry = b""
+    while True:
+        data = fh.read(target)
+        if not data:
+            if carry:
+                yield carry
+            return
+        data = carry + data
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            carry = data
+            continue
+        carry = data[cut + 1:]
+        yield data[: cut + 1]
+
+
+def _compress_block(data: bytes, compression: str) -> bytes:
+    """One self-contained gzip member / zstd frame."""
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+
+def open_segment(path: Path, segment: dict[str, Any]) -> IO[bytes]:
+    """Open a segment for binary reading, transparently decompressing it."""
+    seg_path = path.with_name(segment["file"])
+    if seg_path.suffix == ".gz":
+        return gzip.open(seg_path, "rb")
+    if seg_path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {seg_path.name}")
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(
+                open(seg_path, "rb"), closefd=True, read_across_frames=True
+            )
+        )
+    return open(seg_path, "rb")
+
+
+def _overlaps(
+    segment: dict[str, Any],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> bool:
+    if segment["state"] == "active":
+        # Open-ended: the manifest copy of the active segment may be stale.
+        last = None
+    else:
+        last = _parse_ts(segment.get("last_ts"))
+    first = _parse_ts(segment.get("first_ts"))
+    if since is not None and last is not None and last < since:
+        return False
+    if until is not None and first is not None and first > until:
+        return False
+    return True
+
+
+def select_segments(
+    path: Path,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    manifest: Optional[dict[str, Any]] = None,
+) -> list[dict[str, Any]]:
+    """Manifest entries (oldest first) whose time range overlaps [since, until]."""
+    path = Path(path)
+    manifest = manifest if manifest is not None else load_manifest(path)
+    segments = list(manifest["segments"])
+    if manifest.get("active") is not None:
+        segments.append(manifest["active"])
+    elif path.exists():
+        # Never opened by a writer (legacy log or a copied file).
+        segments.append(_new_segment(manifest["next_seq"], path.name))
+    return [s for s in segments if _overlaps(s, since, until)]
+
+
+def iter_audit_events(
+    path: Path,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield parsed audit events in write order, restricted to [since, until].
+
+    Only segments whose manifest range overlaps the window are opened, so
+    the cost scales with the window rather than total history.
+    """
+    path = Path(path)
+    for segment in select_segments(path, since, until):
+        try:
+            fh = open_segment(path, segment)
+        except FileNotFoundError:
+            # Sealed or compressed since we read the manifest — re-resolve.
+            fresh = {s["seq"]: s for s in select_segments(path)}
+            if segment["seq"] not in fresh:
+                continue
+            fh = open_segment(path, fresh[segment["seq"]])
+        with fh:
+            for raw in fh:
+                if not raw.strip():
+                    continue
+                event = json.loads(raw)
+                if since is not None or until is not None:
+                    ts = _parse_ts(event.get("timestamp"))
+                    if ts is None:
+                        continue
+                    if since is not None and ts < since:
+                        continue
+                    if until is not None and ts > until:
+                        continue
+                yield event
@@ -0,0 +1,240 @@
+"""
+Group-commit audit sink for Shammash.
+
+Request handlers hand finished JSONL lines to an in-memory queue and move on.
+A dedicated writer thread drains the queue in batches and hands each batch
+to a SegmentedAuditWriter (one write per batch), so blocking file I/O never
+runs on the asyncio event loop.
+
+Durability policies (AUDIT_DURABILITY):
+  none             → write only; the OS flushes when it likes
+  flush            → flush the Python buffer after every batch (v1 default)
+  fsync-per-batch  → flush + os.fsync once per batch
+  fsync-per-event  → flush + os.fsync after every line (slowest, strongest)
+
+A batch that fails to write is kept and retried with exponential backoff
+(the writer rolls the file and hash chain back first, so a retry never
+leaves a torn line or a gap).  Up to ``max_retained`` events are held; past
+that the oldest are dropped and counted.  flush() returns False while
+writes are failing, and stats() reports the failure for /ready.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import warnings
+from typing import Any, Optional
+
+from .audit_segments import AuditRecord, SegmentedAuditWriter
+
+DURABILITY_MODES = ("none", "flush", "fsync-per-batch", "fsync-per-event")
+
+
+class _Barrier:
+    """Queue marker: set once every line enqueued before it has been written."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.ok = True
+
+
+_STOP = object()
+
+
+class AuditSink:
+    """
+    Background, batching writer for audit records.
+
+    submit() is non-blocking and safe to call from the event loop.  close()
+    drains everything still queued before returning, so lifespan shutdown
+    never drops events.  The writer thread owns ``writer`` exclusively.
+    """
+
+    def __init__(
+        self,
+        writer: SegmentedAuditWriter,
+        durability: str = "flush",
+        max_batch: int = 512,
+        retry_initial_seconds: float = 0.05,
+        retry_max_seconds: float = 5.0,
+        max_retained: int = 100_000,
+    ) -> None:
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Unknown audit durability '{durability}'; "
+                f"expected one of {list(DURABILITY_MODES)}"
+            )
+        self.writer = writer
+        self.durability = durability
+        self.max_batch = max(1, int(max_batch))
+        self.retry_initial_seconds = retry_initial_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_retained = max(1, int(max_retained))
+        # Records from failed batches, oldest first; owned by the writer thread.
+        self._retained: list[AuditRecord] = []
+        self._queue: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        # Counters — read without locking; they are monotonic ints.
+        self.events_written = 0
+        self.batches_written = 0
+        self.largest_batch = 0
+        self.write_errors = 0
+        self.consecutive_failures = 0
+        self.dropped_events = 0
+        self.last_error: Optional[str] = None
+        self.last_write_monotonic: Optional[float] = None
+
+    # -- lifecycle ----------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="shammash-audit-writer", daemon=True
+        )
+        self._thread.start()
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Drain the queue, write the final batch and stop the writer."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    # -- producer side ------------------------------------------------------
+
+    def submit(self, record: AuditRecord) -> None:
+        """Enqueue one record (newline-terminated line).  Never blocks on I/O."""
+        with self._pending_lock:
+            self._pending += 1
+        self._queue.put(record)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every line submitted before this call is written.
+
+        Returns False on timeout or while writes are failing.  Intended for
+        shutdown paths, tests and read-your-writes endpoints — never call it
+        from the hot path.
+        """
+        if not self.running:
+            return True
+        barrier = _Barrier()
+        self._queue.put(barrier)
+        return barrier.done.wait(timeout) and barrier.ok
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    @property
+    def healthy(self) -> bool:
+        """Running, and the last write attempt succeeded."""
+        return self.running and self.consecutive_failures == 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "healthy": self.healthy,
+            "durability": self.durability,
+            "queue_depth": self.queue_depth,
+            "events_written": self.events_written,
+            "batches_written": self.batches_written,
+            "largest_batch": self.largest_batch,
+            "write_errors": self.write_errors,
+            "consecutive_failures": self.consecutive_failures,
+            "retained_events": len(self._retained),
+            "dropped_events": self.dropped_events,
+            "last_error": self.last_error,
+            **self.writer.stats(),
+        }
+
+    # -- writer thread ------------------------------------------------------
+
+    def _retry_delay(self) -> float:
+        exponent = min(self.consecutive_failures - 1, 30)
+        return min(self.retry_initial_seconds * (2 ** exponent), self.retry_max_seconds)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            records: list[AuditRecord] = []
+            barriers: list[_Barrier] = []
+            try:
+                # With a failed batch held, wake up to retry it even if idle.
+                item = self._queue.get(timeout=self._retry_delay() if self._retained else None)
+            except queue.Empty:
+                item = None
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _Barrier):
+                    barriers.append(item)
+                else:
+                    records.append(item)
+                if len(records) >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            ok = True
+            if self._retained or records:
+                batch, self._retained = self._retained + records, []
+                ok = self._write_batch(batch)
+            if barriers and ok:
+                # A barrier promises readers can see the lines, even under "none".
+                try:
+                    self.writer.flush()
+                except OSError as exc:
+                    ok = False
+                    self.last_error = str(exc)
+            for barrier in barriers:
+                barrier.ok = ok
+                barrier.done.set()
+        if self._retained:
+            self._drop(len(self._retained), "still failing at shutdown")
+            self._retained = []
+        self.writer.close()
+
+    def _write_batch(self, records: list[AuditRecord]) -> bool:
+        """Write ``records``; on failure keep them for retry and return False."""
+        try:
+            self.writer.write(records, self.durability)
+        except Exception as exc:
+            self.write_errors += 1
+            self.consecutive_failures += 1
+            self.last_error = str(exc)
+            if self.consecutive_failures == 1:
+                warnings.warn(
+                    f"Audit sink failed to write {len(records)} event(s), will retry: {exc}"
+                )
+            overflow = len(records) - self.max_retained
+            if overflow > 0:
+                self._drop(overflow, "retry buffer full")
+                records = records[overflow:]
+            self._retained = records
+            return False
+        self.events_written += len(records)
+        self.batches_written += 1
+        self.largest_batch = max(self.largest_batch, len(records))
+        self.last_write_monotonic = time.monotonic()
+        self.consecutive_failures = 0
+        with self._pending_lock:
+            self._pending -= len(records)
+        return True
+
+    def _drop(self, count: int, why: str) -> None:
+        self.dropped_events += count
+        with self._pending_lock:
+            self._pending -= count
+        warnings.warn(f"Audit sink dropped {count} event(s) ({why}): {self.last_error}")
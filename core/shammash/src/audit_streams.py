@@ -0,0 +1,125 @@
+"""
+Per-worker audit streams for multi-process Shammash deployments.
+
+With AUDIT_WORKER_STREAMS=true every uvicorn worker appends to its own
+segmented stream next to AUDIT_JSONL_PATH::
+
+    events.jsonl                      # single-process / legacy stream
+    events.shammash-01-w0.jsonl       # SHAMMASH_INSTANCE + worker slot
+    events.shammash-01-w1.jsonl
+
+Each stream has its own manifest, index and hash chain, so no lock is
+taken on the hot path.  Worker slots are claimed once at startup with a
+non-blocking ``flock`` on ``events.<instance>-w<N>.lock``; a restarted
+worker reuses the lowest free slot, so stream names stay stable.
+
+Readers call :func:`iter_merged_events` / :func:`lookup_merged`, which
+k-way merge all streams by timestamp with ``heapq.merge``.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional
+
+from .audit_index import lookup_events
+from .audit_segments import iter_audit_events, manifest_path_for
+
+try:  # advisory locks are POSIX-only
+    import fcntl
+except ImportError:  # pragma: no cover - depends on platform
+    fcntl = None
+
+_MIN_TS = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def stream_path_for(path: Path, instance: str, worker: int) -> Path:
+    return path.with_name(f"{path.stem}.{instance}-w{worker}{path.suffix}")
+
+
+def discover_streams(path: Path) -> list[Path]:
+    """The base log (if present) plus every per-worker stream, sorted by name."""
+    path = Path(path)
+    streams: list[Path] = []
+    if path.exists() or manifest_path_for(path).exists():
+        streams.append(path)
+    pattern = re.compile(rf"^{re.escape(path.stem)}\.(.+)-w(\d+){re.escape(path.suffix)}$")
+    if path.parent.is_dir():
+        streams.extend(sorted(
+            p for p in path.parent.iterdir()
+            if pattern.match(p.name) and p.name != path.name
+        ))
+    return streams
+
+
+class WorkerSlot:
+    """An exclusively held worker number for ``(path, instance)``."""
+
+    def __init__(self, path: Path, instance: str, max_slots: int = 1024) -> None:
+        self.path = Path(path)
+        self.instance = instance
+        self._fh: Optional[IO[str]] = None
+        self.worker = self._claim(max_slots)
+
+    def _claim(self, max_slots: int) -> int:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            return os.getpid()
+        for worker in range(max_slots):
+            lock_path = self.path.with_name(f"{self.path.stem}.{self.instance}-w{worker}.lock")
+            fh = open(lock_path, "a+")
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                fh.close()
+                continue
+            self._fh = fh
+            return worker
+        raise RuntimeError(f"No free audit worker slot for {self.instance} (max {max_slots})")
+
+    @property
+    def stream_path(self) -> Path:
+        return stream_path_for(self.path, self.instance, self.worker)
+
+    def release(self) -> None:
+        if self._fh is not None:
+            self._fh.close()  # closing the descriptor drops the flock
+            self._fh = None
+
+
+def _event_ts(event: dict[str, Any]) -> datetime:
+    try:
+        ts = datetime.fromisoformat(event["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return _MIN_TS
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def iter_merged_events(
+    path: Path,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    One timestamp-ordered stream over every worker stream.
+
+    Each stream is already in write order, so ``heapq.merge`` needs only
+    one buffered event per stream: O(log k) per event, O(k) memory.
+    """
+    streams = [iter_audit_events(p, since, until) for p in discover_streams(path)]
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=_event_ts)
+
+
+def lookup_merged(path: Path, limit: int = 1000, **keys: Any) -> list[dict[str, Any]]:
+    """lookup_events() across all streams, merged by timestamp."""
+    results = [lookup_events(p, limit=limit, **keys) for p in discover_streams(path)]
+    if len(results) == 1:
+        return results[0]
+    merged = heapq.merge(*results, key=_event_ts)
+    return [event for _, event in zip(range(limit), merged)]
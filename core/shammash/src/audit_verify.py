@@ -0,0 +1,315 @@
+"""
+Incremental verifier for the Shammash audit hash chain.
+
+Run from repository root:
+    python -m core.shammash.src.audit_verify shared/audit/events.jsonl
+
+Inside the container:
+    python -m src.audit_verify /app/shared/audit/events.jsonl
+
+Verification starts at the last trusted checkpoint recorded in the trust
+file (``events.trust.json`` by default — keep it somewhere the service
+cannot write in production), so cost is O(events written since then).
+Each segment is verified independently in a worker process; segments are
+then linked by comparing each segment's first ``prev`` with the previous
+segment's last hash.  On success the trust file advances to the newest
+verified checkpoint.
+
+With AUDIT_WORKER_STREAMS every worker stream is verified in turn against
+its own trust file.
+
+Exit status: 0 = chain intact, 1 = tampering or corruption detected.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from .audit_chain import (
+    GENESIS_HASH,
+    checkpoint_signature_valid,
+    event_hash,
+    merkle_root,
+    split_chain,
+)
+from .audit_segments import load_manifest, open_segment
+from .audit_streams import discover_streams
+
+_MAX_ERRORS_PER_SEGMENT = 20
+
+
+def trust_path_for(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.trust.json")
+
+
+def _load_trust(trust_path: Path) -> Optional[dict[str, Any]]:
+    try:
+        with open(trust_path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_trust(trust_path: Path, checkpoint: dict[str, Any]) -> None:
+    trust = {**checkpoint, "verified_at": datetime.now(timezone.utc).isoformat()}
+    tmp = trust_path.with_name(trust_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(trust, f, indent=2)
+    os.replace(tmp, trust_path)
+
+
+def _skip_to(fh: Any, offset: int) -> None:
+    if not offset:
+        return
+    try:
+        fh.seek(offset)
+    except (OSError, io.UnsupportedOperation):
+        remaining = offset
+        while remaining:
+            chunk = fh.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+
+
+def verify_segment(
+    path: str,
+    segment: dict[str, Any],
+    start_offset: int = 0,
+    start_prev: Optional[str] = None,
+    start_index: Optional[int] = None,
+    key: Optional[bytes] = None,
+) -> dict[str, Any]:
+    """
+    Re-hash one segment from ``start_offset`` and check its checkpoints.
+
+    ``start_prev`` / ``start_index`` pin the expected chain position when
+    resuming from a trusted checkpoint; otherwise the segment's first
+    event defines them and the caller checks cross-segment linkage.
+
+    Only a leading run of unchained lines (written before chaining was
+    enabled) is tolerated; the caller rejects it too unless no earlier
+    segment was chained.  An unchained line after a chained one is an
+    error — it was inserted or had its chain suffix stripped.
+    """
+    errors: list[str] = []
+    result: dict[str, Any] = {
+        "seq": segment["seq"],
+        "events": 0,
+        "unchained": 0,
+        "leading_unchained": 0,
+        "first_prev": None,
+        "last_hash": start_prev,
+        "last_index": None if start_index is None else start_index - 1,
+        "last_checkpoint": None,
+        "errors": errors,
+    }
+    checkpoints = sorted(
+        (
+            cp for cp in segment.get("checkpoints") or []
+            if start_index is None or cp["last_index"] >= start_index
+        ),
+        key=lambda cp: cp["last_index"],
+    )
+    next_cp = 0
+    window: list[bytes] = []
+    expected_prev = start_prev
+    expected_index = start_index
+
+    def error(message: str) -> None:
+        if len(errors) < _MAX_ERRORS_PER_SEGMENT:
+            errors.append(f"segment {segment['seq']}: {message}")
+
+    # Resuming from a checkpoint means chaining was already on.
+    chained = start_prev is not None
+    with open_segment(Path(path), segment) as fh:
+        _skip_to(fh, start_offset)
+        for line_no, raw in enumerate(fh, 1):
+            if not raw.endswith(b"\n"):
+                break  # in-flight append at the end of the active segment
+            if not raw.strip():
+                continue
+            body, link = split_chain(raw)
+            if link is None:
+                result["unchained"] += 1
+                if chained:
+                    error(
+                        f"unchained line {line_no} after event #{result['last_index']} "
+                        "(inserted, or chain suffix stripped)"
+                    )
+                else:
+                    result["leading_unchained"] += 1
+                continue
+            chained = True
+            index = link["index"]
+            if result["first_prev"] is None:
+                result["first_prev"] = link["prev"]
+            if expected_index is not None and index != expected_index:
+                error(f"expected event #{expected_index}, found #{index} (gap or reorder)")
+            if expected_prev is not None and link["prev"] != expected_prev:
+                error(f"event #{index} does not link to the previous event")
+            if event_hash(link["prev"], body) != link["hash"]:
+                error(f"event #{index} content does not match its hash")
+            expected_prev = link["hash"]
+            expected_index = index + 1
+            window.append(bytes.fromhex(link["hash"]))
+            result["events"] += 1
+            result["last_hash"] = link["hash"]
+            result["last_index"] = index
+            while next_cp < len(checkpoints) and checkpoints[next_cp]["last_index"] == index:
+                cp = checkpoints[next_cp]
+                next_cp += 1
+                if cp["root"] != merkle_root(window) or cp["last_hash"] != link["hash"]:
+                    error(f"checkpoint ending at #{index} does not match the events")
+                elif not checkpoint_signature_valid(cp, key):
+                    error(f"checkpoint ending at #{index} has an invalid signature")
+                else:
+                    result["last_checkpoint"] = cp
+                window = []
+    for cp in checkpoints[next_cp:]:
+        if result["last_index"] is None or cp["last_index"] > result["last_index"]:
+            if segment.get("state") != "active" or cp["end_offset"] <= segment.get("bytes", 0):
+                error(f"checkpoint ending at #{cp['last_index']} refers to missing events")
+    return result
+
+
+def verify_log(
+    path: Path,
+    key: Optional[bytes] = None,
+    trust_path: Optional[Path] = None,
+    full: bool = False,
+    workers: int = 0,
+    update_trust: bool = True,
+) -> dict[str, Any]:
+    """Verify the chain since the trusted checkpoint; return a report dict."""
+    path = Path(path)
+    trust_path = trust_path or trust_path_for(path)
+    manifest = load_manifest(path)
+    segments = list(manifest["segments"])
+    if manifest.get("active") is not None:
+        segments.append(manifest["active"])
+    trust = None if full else _load_trust(trust_path)
+
+    errors: list[str] = []
+    if trust is not None and not any(s["seq"] == trust["segment"] for s in segments):
+        errors.append(
+            f"trusted checkpoint segment {trust['segment']} is missing from the manifest"
+        )
+
+    jobs: list[tuple[Any, ...]] = []
+    for segment in segments:
+        if trust is not None and segment["seq"] < trust["segment"]:
+            continue
+        if trust is not None and segment["seq"] == trust["segment"]:
+            jobs.append((str(path), segment, trust["end_offset"], trust["last_hash"],
+                         trust["last_index"] + 1, key))
+        else:
+            jobs.append((str(path), segment, 0, None, None, key))
+
+    if workers != 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers or None) as pool:
+            results = list(pool.map(verify_segment, *zip(*jobs)))
+    else:
+        results = [verify_segment(*job) for job in jobs]
+
+    prev_hash = GENESIS_HASH if trust is None else None
+    prev_index = -1 if trust is None else None
+    seen_chained = trust is not None
+    legacy = 0  # lines from before chaining was enabled (tolerated)
+    for result in results:
+        errors.extend(result["errors"])
+        if seen_chained and result["leading_unchained"]:
+            errors.append(
+                f"segment {result['seq']}: {result['leading_unchained']} unchained line(s) "
+                "after chained events (inserted, or chain suffix stripped)"
+            )
+        elif not seen_chained:
+            legacy += result["leading_unchained"]
+        seen_chained = seen_chained or result["events"] > 0
+        if result["first_prev"] is not None:
+            if prev_hash is not None and result["first_prev"] != prev_hash:
+                errors.append(
+                    f"segment {result['seq']}: does not link to the end of the previous segment"
+                )
+        if result["last_hash"] is not None:
+            prev_hash = result["last_hash"]
+            prev_index = result["last_index"]
+
+    newest = next(
+        (r["last_checkpoint"] for r in reversed(results) if r["last_checkpoint"]), None
+    )
+    if not errors and newest is not None and update_trust:
+        _save_trust(trust_path, newest)
+    return {
+        "ok": not errors,
+        "segments_checked": len(results),
+        "events_checked": sum(r["events"] for r in results),
+        "unchained_events": legacy,
+        "resumed_from": trust,
+        "last_index": prev_index,
+        "trusted_checkpoint": newest or trust,
+        "errors": errors,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify the Shammash audit hash chain.")
+    parser.add_argument("audit_path", type=Path, help="Active audit log (AUDIT_JSONL_PATH)")
+    parser.add_argument("--trust-file", type=Path, default=None,
+                        help="Trust file for a single stream (default: <stem>.trust.json)")
+    parser.add_argument("--trust-dir", type=Path, default=None,
+                        help="Directory holding one trust file per worker stream")
+    parser.add_argument("--full", action="store_true", help="Ignore the trust file; verify everything")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 = CPU count)")
+    parser.add_argument("--key-env", default="AUDIT_CHECKPOINT_KEY",
+                        help="Env var holding the checkpoint HMAC key")
+    parser.add_argument("--no-update", action="store_true", help="Do not advance the trust file")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    key = os.getenv(args.key_env, "").encode("utf-8") or None
+    # Multi-worker deployments: every stream has its own chain and trust file.
+    streams = discover_streams(args.audit_path) or [args.audit_path]
+    ok = True
+    for stream in streams:
+        if args.trust_file is not None and len(streams) == 1:
+            trust_path = args.trust_file
+        elif args.trust_dir is not None:
+            trust_path = args.trust_dir / trust_path_for(stream).name
+        else:
+            trust_path = None
+        report = verify_log(
+            stream,
+            key=key,
+            trust_path=trust_path,
+            full=args.full,
+            workers=args.workers,
+            update_trust=not args.no_update,
+        )
+        ok = ok and report["ok"]
+        if args.json:
+            print(json.dumps({"stream": str(stream), **report}, indent=2))
+            continue
+        status = "OK" if report["ok"] else "FAILED"
+        print(
+            f"{status}: {stream.name}: {report['events_checked']} event(s) in "
+            f"{report['segments_checked']} segment(s) verified"
+            + (f", {report['unchained_events']} unchained" if report["unchained_events"] else "")
+        )
+        for message in report["errors"]:
+            print(f"  {message}")
+    if not key and not args.json:
+        print("warning: no checkpoint key configured; signatures were not checked")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Circuit breaker for Shammash's Home Assistant transport.
+
+Closed → open when, over the last ``window_seconds`` and at least
+``min_calls`` calls, the failure rate reaches ``failure_rate`` or the share
+of calls slower than ``slow_call_seconds`` reaches ``slow_call_rate``.
+While open every call is rejected at once with CircuitOpenError carrying a
+``retry_after`` hint.  After ``open_seconds`` the breaker is half-open and
+lets ``half_open_probes`` calls through: one failure re-opens it, that many
+successes close it.
+
+Failures are outages — connection errors, timeouts, HTTP 5xx.  A 4xx means
+HA answered and counts as a success.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """HA calls are being rejected until the breaker half-opens."""
+
+    def __init__(self, retry_after: float) -> None:
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(f"Home Assistant circuit open; retry after {self.retry_after:.1f}s")
+
+
+def is_outage(exc: BaseException) -> bool:
+    """True for errors that say HA is down or struggling, not that it refused."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, OSError))
+
+
+class CircuitBreaker:
+    """Single event loop only; not thread-safe."""
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 5.0,
+        slow_call_rate: float = 0.8,
+        min_calls: int = 5,
+        window_seconds: float = 30.0,
+        open_seconds: float = 10.0,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = max(1, int(min_calls))
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, int(half_open_probes))
+        self._clock = clock
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._calls: deque[tuple[float, bool, bool]] = deque()  # (at, failed, slow)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        # Counters — monotonic ints, read without locking.
+        self.opened = 0
+        self.rejected = 0
+        self.last_trip_reason: Optional[str] = None
+
+    # -- state --------------------------------------------------------------
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until calls may be attempted again (0 unless open)."""
+        if self.state != OPEN:
+            return 0.0
+        return self._opened_at + self.open_seconds - self._clock()
+
+    def _trip(self, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self.opened += 1
+        self.last_trip_reason = reason
+
+    # -- calls --------------------------------------------------------------
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or raise CircuitOpenError.  Returns whether the call is
+        a half-open probe; pass that to record() / release().
+        """
+        state = self.state
+        if state == OPEN:
+            self.rejected += 1
+            raise CircuitOpenError(self.retry_after())
+        if state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                # The probe settles it within one call's time.
+                raise CircuitOpenError(min(1.0, self.open_seconds))
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def release(self, probe: bool) -> None:
+        """An admitted call ended without an outcome (cancelled)."""
+        if probe and self._state == HALF_OPEN and self._probes_in_flight:
+            self._probes_in_flight -= 1
+
+    def record(self, failed: bool, latency: float, probe: bool = False) -> None:
+        now = self._clock()
+        slow = latency >= self.slow_call_seconds
+        if probe:
+            if self._state != HALF_OPEN:
+                return  # another probe already decided
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed or slow:
+                self._trip("half-open probe " + ("failed" if failed else "was slow"))
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_probes:
+                self._state = CLOSED
+            return
+        if self._state != CLOSED:
+            return  # admitted before the trip; the window was already reset
+        self._calls.append((now, failed, slow))
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+        total = len(self._calls)
+        if total < self.min_calls:
+            return
+        failures = sum(1 for _, f, _ in self._calls if f)
+        slow_calls = sum(1 for _, _, s in self._calls if s)
+        if failures / total >= self.failure_rate:
+            self._trip(f"{failures}/{total} calls failed in {self.window_seconds:g}s")
+        elif slow_calls / total >= self.slow_call_rate:
+            self._trip(f"{slow_calls}/{total} calls slower than {self.slow_call_seconds:g}s")
+
+    def stats(self) -> dict[str, Any]:
+        state = self.state
+        return {
+            "state": state,
+            "retry_after_seconds": round(self.retry_after(), 3) if state == OPEN else None,
+            "window_calls": len(self._calls),
+            "window_failures": sum(1 for _, f, _ in self._calls if f),
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "last_trip_reason": self.last_trip_reason,
+        }
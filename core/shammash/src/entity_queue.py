@@ -0,0 +1,106 @@
+"""
+Per-entity execution ordering for Shammash.
+
+Two proposals for the same entity must not interleave: each reads a
+before-state, calls a service and verifies, and a second toggle landing
+between another's call and verification makes both receipts wrong.  An
+EntityQueue serializes holders of the same key in arrival order (FIFO)
+while different keys proceed fully in parallel.  A proposal holds every
+entity it touches — target and verify entity — acquired in sorted order so
+two holders of overlapping sets cannot deadlock.
+
+A key's lane exists only while someone holds or waits for it, so the
+queue's size follows the number of busy entities, not all entities seen.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Iterable, NamedTuple, Optional
+
+_LATENCY_WINDOW = 1024
+
+
+class QueueTicket(NamedTuple):
+    """How long a holder queued, and how many were ahead of it on arrival."""
+    depth: int
+    wait_seconds: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"depth": self.depth, "wait_ms": round(self.wait_seconds * 1000, 3)}
+
+
+class _Lane:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0  # the holder plus waiters
+
+
+class EntityQueue:
+    """Keyed FIFO mutex.  Single event loop; lanes never outlive their users."""
+
+    def __init__(self) -> None:
+        self._lanes: dict[str, _Lane] = {}
+        self._waits: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        # Counters — monotonic ints, read without locking.
+        self.acquisitions = 0
+        self.contended = 0
+        self.peak_depth = 0
+
+    @asynccontextmanager
+    async def hold(self, keys: Iterable[str]) -> AsyncIterator[QueueTicket]:
+        """Wait until no earlier holder of any of ``keys`` remains, then hold them."""
+        ordered = sorted(set(keys))
+        lanes = [self._lanes.setdefault(key, _Lane()) for key in ordered]
+        depth = max((lane.users for lane in lanes), default=0)
+        for lane in lanes:
+            lane.users += 1
+        self.peak_depth = max(self.peak_depth, depth)
+        started = time.perf_counter()
+        acquired: list[_Lane] = []
+        try:
+            for lane in lanes:
+                await lane.lock.acquire()
+                acquired.append(lane)
+            wait = time.perf_counter() - started
+            self.acquisitions += 1
+            if depth:
+                self.contended += 1
+            self._waits.append(wait)
+            yield QueueTicket(depth, wait)
+        finally:
+            for lane in acquired:
+                lane.lock.release()
+            for key, lane in zip(ordered, lanes):
+                lane.users -= 1
+                if not lane.users:
+                    del self._lanes[key]
+
+    def depth(self, key: str) -> int:
+        """Holders plus waiters for ``key`` right now."""
+        lane = self._lanes.get(key)
+        return lane.users if lane is not None else 0
+
+    def stats(self) -> dict[str, Any]:
+        ordered = sorted(self._waits)
+
+        def ms(q: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 3)
+
+        return {
+            "busy_entities": len(self._lanes),
+            "queued": sum(lane.users - 1 for lane in self._lanes.values()),
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "peak_depth": self.peak_depth,
+            "wait_p50_ms": ms(0.5),
+            "wait_p99_ms": ms(0.99),
+            "wait_max_ms": round(ordered[-1] * 1000, 3) if ordered else None,
+        }
@@ -0,0 +1,219 @@
+"""
+Home Assistant REST transport for Shammash.
+
+Every REST call to HA goes through one HATransport — a single pooled
+``httpx.AsyncClient`` (optionally HTTP/2) with:
+
+  * connection limits and keep-alive expiry from the environment;
+  * a timeout per operation (``get_state``, ``get_states``,
+    ``call_service``, ``probe``), looked up on every request so a policy
+    reload takes effect immediately;
+  * per-operation counters — requests, errors, timeouts, latency and time
+    spent waiting for a pooled connection — reported by ``stats()``;
+  * an optional CircuitBreaker: while it is open, requests raise
+    CircuitOpenError without touching the network.
+
+Pool wait is measured with httpcore's trace hook: the time from issuing a
+request until its first connection event (a new TCP connect, or request
+headers going out on a reused connection).
+
+HTTP/2 requires ``h2``, which requirements.txt installs via ``httpx[http2]``.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+import httpx
+
+from .circuit_breaker import CircuitBreaker, is_outage
+
+try:  # optional: only needed for http2=True
+    import h2
+except ImportError:  # pragma: no cover - depends on environment
+    h2 = None
+
+OPERATIONS = ("get_state", "get_states", "call_service", "probe")
+_LATENCY_WINDOW = 1024
+
+
+def _percentile(ordered: list[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class _OperationStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.pool_wait_max = 0.0
+        self._pool_wait_total = 0.0
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+
+    def observe(self, latency: float, pool_wait: float) -> None:
+        self.requests += 1
+        self._latencies.append(latency)
+        self._pool_wait_total += pool_wait
+        self.pool_wait_max = max(self.pool_wait_max, pool_wait)
+
+    def to_dict(self) -> dict[str, Any]:
+        ordered = sorted(self._latencies)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "latency_p50_ms": ms(_percentile(ordered, 0.5)),
+            "latency_p99_ms": ms(_percentile(ordered, 0.99)),
+            "pool_wait_mean_ms": ms(self._pool_wait_total / self.requests) if self.requests else None,
+            "pool_wait_max_ms": ms(self.pool_wait_max),
+        }
+
+
+class HATransport:
+    """
+    Pooled HA REST client.  Must be used, and closed, on one event loop.
+    ``timeout_for(operation)`` supplies each request's timeout in seconds.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        timeout_for: Callable[[str], float],
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        if http2 and h2 is None:
+            raise RuntimeError("h2 is required for HTTP/2 to Home Assistant (pip install 'httpx[http2]')")
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.http2 = http2
+        self.breaker = breaker
+        self._timeout_for = timeout_for
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            limits=self._limits,
+            http2=http2,
+            transport=transport,
+        )
+        self._ops = {operation: _OperationStats() for operation in OPERATIONS}
+        self.connections_opened = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._client.is_closed
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    # -- requests -----------------------------------------------------------
+
+    async def request(
+        self, operation: str, method: str, path: str, json: Any = None,
+    ) -> httpx.Response:
+        """
+        Send one request under ``operation``'s timeout; raises on HTTP errors,
+        or CircuitOpenError at once while the breaker is open.
+        """
+        stats = self._ops[operation]
+        breaker = self.breaker
+        probe = False
+        if breaker is not None:
+            try:
+                probe = breaker.before_call()
+            except Exception:
+                stats.rejected += 1
+                raise
+        started = time.perf_counter()
+        first_io: Optional[float] = None
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            nonlocal first_io
+            if first_io is None and event.endswith(".started"):
+                first_io = time.perf_counter()
+            if event == "connection.connect_tcp.started":
+                self.connections_opened += 1
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        failed: Optional[bool] = None
+        try:
+            resp = await self._client.request(
+                method,
+                path,
+                json=json,
+                timeout=self._timeout_for(operation),
+                extensions={"trace": trace},
+            )
+            resp.raise_for_status()
+            failed = False
+        except Exception as exc:
+            failed = is_outage(exc)
+            stats.errors += 1
+            if isinstance(exc, httpx.TimeoutException):
+                stats.timeouts += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            now = time.perf_counter()
+            stats.observe(now - started, (first_io or now) - started)
+            if breaker is not None:
+                if failed is None:
+                    breaker.release(probe)  # cancelled: no verdict on HA
+                else:
+                    breaker.record(failed, now - started, probe)
+        return resp
+
+    async def get_state(self, entity_id: str) -> dict[str, Any]:
+        """GET /api/states/{entity_id} → full state dict."""
+        resp = await self.request("get_state", "GET", f"/api/states/{entity_id}")
+        return resp.json()
+
+    async def get_states(self) -> list[dict[str, Any]]:
+        """GET /api/states → every entity's state."""
+        resp = await self.request("get_states", "GET", "/api/states")
+        return resp.json()
+
+    async def call_service(self, service_path: str, payload: dict[str, Any]) -> httpx.Response:
+        """POST /api/services/{domain}/{service}."""
+        return await self.request("call_service", "POST", f"/api/services/{service_path}", json=payload)
+
+    async def probe(self) -> httpx.Response:
+        """GET /api/ — reachability and token check."""
+        return await self.request("probe", "GET", "/api/")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_connections": self._limits.max_connections,
+            "max_keepalive_connections": self._limits.max_keepalive_connections,
+            "keepalive_expiry_seconds": self._limits.keepalive_expiry,
+            "connections_opened": self.connections_opened,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "circuit": self.breaker.stats() if self.breaker is not None else None,
+            "operations": {operation: stats.to_dict() for operation, stats in self._ops.items()},
+        }
@@ -0,0 +1,229 @@
+"""
+Home Assistant WebSocket state stream for Shammash.
+
+One long-lived connection to ``/api/websocket`` per process::
+
+    <- {"type": "auth_required"}
+    -> {"type": "auth", "access_token": HA_TOKEN}
+    <- {"type": "auth_ok"}
+    -> {"id": 1, "type": "subscribe_events", "event_type": "state_changed"}
+    <- {"id": 1, "type": "result", "success": true}
+    <- {"id": 1, "type": "event", "event": {"event_type": "state_changed",
+        "data": {"entity_id": ..., "old_state": {...}, "new_state": {...}}}}
+
+Every ``new_state`` is pushed to the watches registered for its entity, so
+verify_outcome wakes the moment HA reports a change instead of on its next
+poll.  The connection reconnects with exponential backoff; while it is down
+``connected`` is False, open watches receive ``None`` and callers fall back
+to REST polling.
+
+Requires ``websockets`` (installed with uvicorn[standard]).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Callable, Optional
+
+try:  # optional: without it Shammash verifies by REST polling only
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:  # pragma: no cover - depends on environment
+    ws_connect = None
+
+StateListener = Callable[[str, Optional[dict[str, Any]]], None]
+
+
+class HAWebSocketError(Exception):
+    """HA refused the handshake (bad token) or answered out of protocol."""
+
+
+def websocket_url(ha_url: str) -> str:
+    """``http://ha:8123`` → ``ws://ha:8123/api/websocket`` (https → wss)."""
+    base = ha_url.rstrip("/")
+    if base.startswith("https://"):
+        base = "wss://" + base[len("https://"):]
+    elif base.startswith("http://"):
+        base = "ws://" + base[len("http://"):]
+    return f"{base}/api/websocket"
+
+
+class StateWatch:
+    """
+    States of one entity pushed after the watch was opened.  Use as a
+    context manager so the registration is always removed.
+    """
+
+    def __init__(self, stream: "HAStateStream", entity_id: str) -> None:
+        self.entity_id = entity_id
+        self._stream = stream
+        self._queue: asyncio.Queue[Optional[dict[str, Any]]] = asyncio.Queue()
+
+    def __enter__(self) -> "StateWatch":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._stream._unwatch(self)
+
+    def _push(self, state: Optional[dict[str, Any]]) -> None:
+        self._queue.put_nowait(state)
+
+    async def next(self, timeout: float) -> Optional[dict[str, Any]]:
+        """The next pushed state; None on timeout or if the stream dropped."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            return None
+
+
+class HAStateStream:
+    """
+    Background ``state_changed`` subscription.  start() and close() must be
+    called on the event loop that uses the watches.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        reconnect_initial_seconds: float = 0.5,
+        reconnect_max_seconds: float = 30.0,
+    ) -> None:
+        if ws_connect is None:
+            raise RuntimeError("websockets is required for the HA state stream (pip install websockets)")
+        self.url = url
+        self._token = token
+        self.reconnect_initial_seconds = reconnect_initial_seconds
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self._watches: dict[str, set[StateWatch]] = {}
+        self._listeners: list[StateListener] = []
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        # Counters — monotonic ints, read without locking.
+        self.connects = 0
+        self.disconnects = 0
+        self.events_received = 0
+        self.events_delivered = 0
+        self.last_error: Optional[str] = None
+
+    # -- lifecycle ----------------------------------------------------------
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="shammash-ha-websocket")
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._set_disconnected()
+
+    async def wait_connected(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # -- consumers ----------------------------------------------------------
+
+    def watch(self, entity_id: str) -> StateWatch:
+        watch = StateWatch(self, entity_id)
+        self._watches.setdefault(entity_id, set()).add(watch)
+        return watch
+
+    def _unwatch(self, watch: StateWatch) -> None:
+        watches = self._watches.get(watch.entity_id)
+        if watches is not None:
+            watches.discard(watch)
+            if not watches:
+                del self._watches[watch.entity_id]
+
+    def add_listener(self, listener: StateListener) -> None:
+        """Call ``listener(entity_id, new_state)`` for every state_changed event."""
+        self._listeners.append(listener)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "events_received": self.events_received,
+            "events_delivered": self.events_delivered,
+            "watched_entities": len(self._watches),
+            "last_error": self.last_error,
+        }
+
+    # -- connection ---------------------------------------------------------
+
+    def _set_disconnected(self) -> None:
+        if not self.connected:
+            return
+        self._connected.clear()
+        self.disconnects += 1
+        # Wake every waiter so it can fall back to REST immediately.
+        for watches in self._watches.values():
+            for watch in watches:
+                watch._push(None)
+
+    async def _run(self) -> None:
+        delay = self.reconnect_initial_seconds
+        while True:
+            try:
+                async with ws_connect(self.url, open_timeout=10, max_size=None) as ws:
+                    await self._handshake(ws)
+                    delay = self.reconnect_initial_seconds
+                    await self._consume(ws)
+                self.last_error = "connection closed by Home Assistant"
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # network, protocol, auth — all retried
+                self.last_error = f"{type(exc).__name__}: {exc}"
+            self._set_disconnected()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max_seconds)
+
+    async def _handshake(self, ws: Any) -> None:
+        message = json.loads(await ws.recv())
+        if message.get("type") == "auth_required":
+            await ws.send(json.dumps({"type": "auth", "access_token": self._token}))
+            message = json.loads(await ws.recv())
+        if message.get("type") != "auth_ok":
+            raise HAWebSocketError(f"authentication failed: {message.get('type')}")
+        await ws.send(json.dumps({"id": 1, "type": "subscribe_events", "event_type": "state_changed"}))
+        message = json.loads(await ws.recv())
+        if message.get("type") != "result" or not message.get("success"):
+            raise HAWebSocketError(f"subscribe_events rejected: {message}")
+        self.connects += 1
+        self._connected.set()
+
+    async def _consume(self, ws: Any) -> None:
+        async for raw in ws:
+            message = json.loads(raw)
+            if message.get("type") != "event":
+                continue
+            data = (message.get("event") or {}).get("data") or {}
+            entity_id = data.get("entity_id")
+            if not entity_id:
+                continue
+            new_state = data.get("new_state")
+            self.events_received += 1
+            for listener in self._listeners:
+                listener(entity_id, new_state)
+            if new_state is None:
+                continue  # entity removed; waiters keep waiting
+            for watch in self._watches.get(entity_id, ()):
+                watch._push(new_state)
+                self.events_delivered += 1
@@ -0,0 +1,249 @@
+"""
+Immutable policy snapshots for Shammash.
+
+A :class:`PolicySnapshot` is everything a proposal is judged against — the
+parsed ``shammash_policy.yaml``, the effective allowlist (SHAMMASH_ALLOWLIST
+overrides the YAML, not merged), the caps and the compiled Law program —
+frozen together under one version string::
+
+    v1@3f9c2a7d41b0     # <policy "version" key>@<sha256 of effective policy>
+
+Reloads (file watch, SIGHUP, ``POST /policy/reload``) parse and validate a
+new snapshot off the request path with :func:`load_snapshot`; the app then
+swaps a single reference, so a request that took a snapshot keeps judging
+against it even if a reload lands mid-flight.  An invalid file raises
+:class:`PolicyError` and the running snapshot stays in place.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import warnings
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import yaml
+
+from .allowlist import parse_allow_entry
+from .law import BLAST_RADIUS_ORDER, LawProgram, compile_policy
+
+# Action types whose repeat is harmless, so they may be skipped when the
+# entity is already in the expected state.  toggle_entity never is.
+IDEMPOTENT_ACTIONS = frozenset({"turn_on", "turn_off"})
+
+DEFAULT_POLICY: dict[str, Any] = {
+    "default_decision": "deny",
+    "allow_actions": ["toggle_entity", "turn_on", "turn_off"],
+    "allow_entities": [],
+    "enforce_target_verify_equality": True,
+    "max_blast_radius": "room",
+    # Opt-in: action types answered as a no-op, without a service call,
+    # when the before-state already satisfies the verify predicate.
+    "skip_satisfied_actions": [],
+    "verification": {
+        "max_timeout_seconds": 60,
+        "default_timeout_seconds": 10,
+        "poll_interval_seconds": 1,
+    },
+    # Per-operation HA REST timeouts used by the HA transport.
+    "ha_transport": {
+        "get_state_timeout_seconds": 10,
+        "get_states_timeout_seconds": 30,
+        "call_service_timeout_seconds": 10,
+        "probe_timeout_seconds": 5,
+    },
+}
+
+
+class PolicyError(ValueError):
+    """The policy file is unreadable or fails validation."""
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    version: str
+    loaded_at: str
+    source: str
+    allow_actions: frozenset[str]
+    allow_entities: frozenset[str]  # allowlist patterns; overrides live in program.allowlist
+    max_blast_radius: str
+    enforce_target_verify: bool
+    max_timeout_seconds: float
+    poll_interval_seconds: float
+    ha_timeouts: dict[str, float]  # HA transport operation → timeout seconds
+    skip_satisfied_actions: frozenset[str]
+    raw: dict[str, Any] = field(repr=False, compare=False)
+    program: LawProgram = field(repr=False, compare=False)
+
+    @property
+    def basis_tag(self) -> str:
+        """policy_basis entry naming this snapshot."""
+        return f"policy={self.version}"
+
+    def max_timeout_for(self, entity_id: str) -> float:
+        """Verification timeout cap, honouring a per-entity override."""
+        entry = self.program.allowlist.match(entity_id)
+        if entry is not None and entry.max_timeout_seconds is not None:
+            return entry.max_timeout_seconds
+        return self.max_timeout_seconds
+
+    def ha_timeout(self, operation: str) -> float:
+        """Timeout for one HA transport operation (get_state, call_service, ...)."""
+        return self.ha_timeouts[operation]
+
+
+def env_allowlist() -> Optional[set[str]]:
+    """
+    SHAMMASH_ALLOWLIST as a set, or None when unset/empty.  Malformed
+    entries are dropped with a warning rather than failing startup — a
+    dropped entry only ever denies more.
+    """
+    raw = os.getenv("SHAMMASH_ALLOWLIST", "").strip()
+    if not raw:
+        return None
+    entries: set[str] = set()
+    for entry in (e.strip() for e in raw.split(",")):
+        if not entry:
+            continue
+        try:
+            parse_allow_entry(entry)
+        except ValueError as exc:
+            warnings.warn(f"Ignoring SHAMMASH_ALLOWLIST entry: {exc}")
+            continue
+        entries.add(entry)
+    return entries
+
+
+def _with_defaults(data: dict[str, Any]) -> dict[str, Any]:
+    merged = dict(data)
+    for key, val in DEFAULT_POLICY.items():
+        merged.setdefault(key, val)
+    return merged
+
+
+def validate_policy(data: Any) -> dict[str, Any]:
+    """Return ``data`` merged with defaults, or raise PolicyError."""
+    if not isinstance(data, dict):
+        raise PolicyError("Policy must be a mapping")
+    data = _with_defaults(data)
+    errors: list[str] = []
+    if data["default_decision"] != "deny":
+        errors.append("default_decision must be 'deny'")
+    actions = data["allow_actions"]
+    if not isinstance(actions, list) or not all(isinstance(v, str) for v in actions):
+        errors.append("allow_actions must be a list of strings")
+    entities = data["allow_entities"]
+    if not isinstance(entities, list):
+        errors.append("allow_entities must be a list")
+    else:
+        for entry in entities:
+            try:
+                rule = parse_allow_entry(entry)
+            except ValueError as exc:
+                errors.append(str(exc))
+                continue
+            if rule.max_blast_radius is not None and rule.max_blast_radius not in BLAST_RADIUS_ORDER:
+                errors.append(
+                    f"'{rule.pattern}': max_blast_radius must be one of {list(BLAST_RADIUS_ORDER)}"
+                )
+    if not isinstance(data["enforce_target_verify_equality"], bool):
+        errors.append("enforce_target_verify_equality must be a boolean")
+    if data["max_blast_radius"] not in BLAST_RADIUS_ORDER:
+        errors.append(f"max_blast_radius must be one of {list(BLAST_RADIUS_ORDER)}")
+    skip = data["skip_satisfied_actions"]
+    if not isinstance(skip, list) or not all(isinstance(v, str) for v in skip):
+        errors.append("skip_satisfied_actions must be a list of strings")
+    elif not set(skip) <= IDEMPOTENT_ACTIONS:
+        errors.append(f"skip_satisfied_actions may only contain {sorted(IDEMPOTENT_ACTIONS)}")
+    for section in ("verification", "ha_transport"):
+        values = data[section]
+        if not isinstance(values, dict):
+            errors.append(f"{section} must be a mapping")
+            continue
+        for key, default in DEFAULT_POLICY[section].items():
+            value = values.get(key, default)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                errors.append(f"{section}.{key} must be a positive number")
+    if errors:
+        raise PolicyError("; ".join(errors))
+    return data
+
+
+def build_snapshot(
+    data: dict[str, Any],
+    source: str = "<defaults>",
+    allowlist: Optional[Iterable[Any]] = None,
+) -> PolicySnapshot:
+    """
+    Freeze an already validated policy dict.  ``allowlist`` (the env
+    override) replaces ``allow_entities`` when given.  Raises PolicyError
+    if an allowlist entry is malformed.
+    """
+    verification = {**DEFAULT_POLICY["verification"], **(data.get("verification") or {})}
+    ha_transport = {**DEFAULT_POLICY["ha_transport"], **(data.get("ha_transport") or {})}
+    actions = frozenset(data["allow_actions"])
+    try:
+        program = compile_policy(
+            actions,
+            allowlist if allowlist is not None else data["allow_entities"],
+            max_blast_radius=data["max_blast_radius"],
+            enforce_target_verify=data["enforce_target_verify_equality"],
+        )
+    except ValueError as exc:
+        raise PolicyError(str(exc)) from exc
+    rules = program.allowlist.rules
+    effective = {
+        "allow_actions": sorted(actions),
+        "allow_entities": [rule.to_entry() for rule in rules],
+        "enforce_target_verify_equality": data["enforce_target_verify_equality"],
+        "max_blast_radius": data["max_blast_radius"],
+        "skip_satisfied_actions": sorted(data["skip_satisfied_actions"]),
+        "verification": verification,
+        "ha_transport": ha_transport,
+    }
+    digest = hashlib.sha256(
+        json.dumps(effective, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+    version = f"{data.get('version', 'v1')}@{digest[:12]}"
+    return PolicySnapshot(
+        version=version,
+        loaded_at=datetime.now(timezone.utc).isoformat(),
+        source=source,
+        allow_actions=actions,
+        allow_entities=frozenset(rule.pattern for rule in rules),
+        max_blast_radius=data["max_blast_radius"],
+        enforce_target_verify=data["enforce_target_verify_equality"],
+        max_timeout_seconds=verification["max_timeout_seconds"],
+        poll_interval_seconds=verification["poll_interval_seconds"],
+        ha_timeouts={
+            key[: -len("_timeout_seconds")]: float(value)
+            for key, value in ha_transport.items()
+            if key.endswith("_timeout_seconds")
+        },
+        skip_satisfied_actions=frozenset(data["skip_satisfied_actions"]),
+        raw=data,
+        program=program,
+    )
+
+
+def load_snapshot(path: Path, allowlist: Optional[Iterable[Any]] = None) -> PolicySnapshot:
+    """Read, validate and freeze the policy at ``path``.  Blocking."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as exc:
+        raise PolicyError(f"Cannot read policy {path}: {exc}") from exc
+    return build_snapshot(validate_policy(data), source=str(path), allowlist=allowlist)
+
+
+def file_signature(path: Path) -> Optional[tuple[int, int]]:
+    """(mtime_ns, size) for change detection, or None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
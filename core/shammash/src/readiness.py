@@ -0,0 +1,115 @@
+"""
+Background readiness probing for Shammash.
+
+``GET /ready`` used to call Home Assistant on every request, so frequent
+health checks during HA slowness piled up connections.  A ReadinessProber
+runs the check once per ``interval`` on its own task and keeps the latest
+result; ``/ready`` serves that result with its age, so the cost of a probe
+no longer depends on how often anyone asks.  A result older than
+``stale_after`` (the prober is stuck behind a hung check) is reported as
+stale.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+Check = Callable[[], Awaitable[dict[str, Any]]]
+_LATENCY_WINDOW = 256
+
+
+class ReadinessProber:
+    """Periodic ``check()`` runner.  start() and close() on the serving loop."""
+
+    def __init__(
+        self,
+        check: Check,
+        interval: float = 5.0,
+        stale_after: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._check = check
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else 3 * interval
+        self._clock = clock
+        self._task: Optional[asyncio.Task] = None
+        self._result: Optional[dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._checked_at_iso: Optional[str] = None
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        # Counters — monotonic ints, read without locking.
+        self.probes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="shammash-readiness-prober")
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> None:
+        """Run the check now and cache its result."""
+        started = self._clock()
+        try:
+            result = await self._check()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # keep serving the previous result, marked by age
+            self.failures += 1
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            return
+        finally:
+            self.probes += 1
+            self._latencies.append(self._clock() - started)
+        self._result = result
+        self._checked_at = self._clock()
+        self._checked_at_iso = datetime.now(timezone.utc).isoformat()
+
+    @property
+    def result(self) -> Optional[dict[str, Any]]:
+        """The latest check result, or None before the first one finished."""
+        return self._result
+
+    @property
+    def stale(self) -> bool:
+        return self._checked_at is None or self._clock() - self._checked_at > self.stale_after
+
+    def stats(self) -> dict[str, Any]:
+        ordered = sorted(self._latencies)
+
+        def ms(q: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+        age = self._clock() - self._checked_at if self._checked_at is not None else None
+        return {
+            "mode": "background",
+            "checked_at": self._checked_at_iso,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "interval_seconds": self.interval,
+            "stale": self.stale,
+            "probes": self.probes,
+            "failures": self.failures,
+            "latency_p50_ms": ms(0.5),
+            "latency_p99_ms": ms(0.99),
+            "latency_max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,171 @@
+"""
+Receipt store for Shammash.
+
+Holds every receipt Shammash issues, keyed by proposal_id, so clients can
+fetch it after the HTTP exchange that produced it — the basis of
+asynchronous execution (``Prefer: respond-async`` → 202, then
+``GET /receipts/{proposal_id}``, a long-poll or a Server-Sent Events
+stream).
+
+An entry is *pending* from ``begin()`` until ``complete()`` (or
+``abandon()``); waiters are woken the moment it completes.  Completed
+receipts are kept for ``ttl_seconds`` and at most ``max_entries`` of them,
+oldest evicted first; pending entries are never evicted.
+
+Each entry may carry a fingerprint of the request that produced it, so a
+re-submitted proposal_id can be told apart from a different request
+reusing it (idempotent retries), and records whether the execution sent
+its service call to Home Assistant: a failed execution that never did may
+safely run again, one that did must not.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional
+
+PENDING = "pending"
+COMPLETE = "complete"
+
+
+class StoredReceipt(NamedTuple):
+    status: str  # PENDING | COMPLETE
+    receipt: Any  # the receipt once complete
+    handle: dict[str, Any]  # what a client is told while pending
+    fingerprint: Optional[str]  # of the request, if begin() was given one
+    call_sent: bool  # mark_call_sent() was called while pending
+
+
+class _Pending:
+    __slots__ = ("handle", "fingerprint", "call_sent", "done")
+
+    def __init__(self, handle: dict[str, Any], fingerprint: Optional[str]) -> None:
+        self.handle = handle
+        self.fingerprint = fingerprint
+        self.call_sent = False
+        self.done = asyncio.Event()
+
+
+class ReceiptStore:
+    """Single event loop only."""
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._pending: dict[str, _Pending] = {}
+        # proposal_id -> (completed_at, receipt, fingerprint, call_sent), oldest first
+        self._complete: OrderedDict[str, tuple[float, Any, Optional[str], bool]] = OrderedDict()
+        # Counters — monotonic ints, read without locking.
+        self.completed = 0
+        self.abandoned = 0
+        self.expired = 0
+        self.evicted = 0
+        self.hits = 0
+        self.misses = 0
+        self.replays = 0  # re-submissions answered from the store
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._complete)
+
+    # -- writers ------------------------------------------------------------
+
+    def begin(
+        self, key: str, handle: dict[str, Any], fingerprint: Optional[str] = None,
+    ) -> None:
+        """
+        Mark ``key`` in flight, replacing any completed receipt for it;
+        ``handle`` is served until it completes.
+        """
+        self._complete.pop(key, None)
+        self._pending[key] = _Pending(handle, fingerprint)
+
+    def update(self, key: str, **fields: Any) -> None:
+        """Add ``fields`` to a pending entry's handle."""
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.handle.update(fields)
+
+    def mark_call_sent(self, key: str) -> None:
+        """Record that a pending entry's service call may have reached HA."""
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.call_sent = True
+
+    def complete(self, key: str, receipt: Any) -> None:
+        self._expire()
+        pending = self._pending.pop(key, None)
+        self._complete.pop(key, None)
+        fingerprint = pending.fingerprint if pending is not None else None
+        call_sent = pending.call_sent if pending is not None else False
+        self._complete[key] = (self._clock(), receipt, fingerprint, call_sent)
+        self.completed += 1
+        while len(self._complete) > self.max_entries:
+            self._complete.popitem(last=False)
+            self.evicted += 1
+        if pending is not None:
+            pending.done.set()
+
+    def abandon(self, key: str) -> None:
+        """Drop a pending entry that will never complete; wakes its waiters."""
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            self.abandoned += 1
+            pending.done.set()
+
+    # -- readers ------------------------------------------------------------
+
+    def _expire(self) -> None:
+        horizon = self._clock() - self.ttl_seconds
+        while self._complete:
+            key, (completed_at, *_) = next(iter(self._complete.items()))
+            if completed_at > horizon:
+                break
+            del self._complete[key]
+            self.expired += 1
+
+    def get(self, key: str) -> Optional[StoredReceipt]:
+        self._expire()
+        done = self._complete.get(key)
+        if done is not None:
+            self.hits += 1
+            return StoredReceipt(COMPLETE, done[1], {}, done[2], done[3])
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return StoredReceipt(PENDING, None, pending.handle, pending.fingerprint, pending.call_sent)
+        self.misses += 1
+        return None
+
+    async def wait(self, key: str, timeout: float) -> Optional[StoredReceipt]:
+        """get(), after waiting up to ``timeout`` seconds for a pending entry."""
+        pending = self._pending.get(key)
+        if pending is not None and timeout > 0:
+            try:
+                await asyncio.wait_for(pending.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get(key)
+
+    def stats(self) -> dict[str, Any]:
+        self._expire()
+        return {
+            "pending": len(self._pending),
+            "stored": len(self._complete),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "completed": self.completed,
+            "abandoned": self.abandoned,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "hits": self.hits,
+            "misses": self.misses,
+            "replays": self.replays,
+        }
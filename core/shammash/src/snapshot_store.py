@@ -0,0 +1,219 @@
+"""
+Content-addressed store for Home Assistant state snapshots.
+
+Receipts and audit events reference ``before_state`` / ``after_state`` by
+hash instead of embedding the full HA state dict (attributes, context and
+timestamps) every time.  A snapshot's hash is the sha256 of its canonical
+JSON, so identical states are stored once.
+
+Objects live under ``<root>/objects/ab/cdef….z`` as zlib-compressed JSON,
+either a full state or a delta against the previous snapshot of the same
+entity::
+
+    {"entity_id": "light.kitchen", "full": {...}}
+    {"entity_id": "light.kitchen", "base": "<hash>", "set": [[path, value], ...], "unset": [path, ...]}
+
+Paths are lists of keys (``["attributes", "brightness"]``).  Delta chains
+are capped at MAX_DELTA_CHAIN so a read never replays more than that.
+Every read re-hashes the reconstructed state; an object (or delta base)
+that does not hash to its name raises :class:`SnapshotCorruptError`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+MAX_DELTA_CHAIN = 16
+_CACHE_SIZE = 256
+
+# Bookkeeping fields that change on every write; kept in the snapshot but
+# left out of the human-facing inline diff.
+_VOLATILE_FIELDS = frozenset({"last_changed", "last_updated", "last_reported", "context"})
+
+_HASH_LEN = 64
+
+
+class SnapshotCorruptError(Exception):
+    """A stored snapshot does not reconstruct to the state its hash names."""
+
+
+def canonical_json(state: dict[str, Any]) -> bytes:
+    return json.dumps(state, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def snapshot_hash(state: dict[str, Any]) -> str:
+    return hashlib.sha256(canonical_json(state)).hexdigest()
+
+
+def is_snapshot_hash(value: str) -> bool:
+    return len(value) == _HASH_LEN and all(c in "0123456789abcdef" for c in value)
+
+
+def _flatten(state: dict[str, Any]) -> dict[tuple[str, ...], Any]:
+    """Two-level flattening: top-level keys, and keys of nested dicts."""
+    flat: dict[tuple[str, ...], Any] = {}
+    for key, value in state.items():
+        if isinstance(value, dict) and value:
+            for sub, sub_value in value.items():
+                flat[(key, sub)] = sub_value
+        else:
+            flat[(key,)] = value
+    return flat
+
+
+def _delta(base: dict[str, Any], state: dict[str, Any]) -> tuple[list[Any], list[Any]]:
+    old, new = _flatten(base), _flatten(state)
+    set_ = [[list(path), value] for path, value in new.items() if path not in old or old[path] != value]
+    unset = [list(path) for path in old if path not in new]
+    return set_, unset
+
+
+def _apply(base: dict[str, Any], set_: list[Any], unset: list[Any]) -> dict[str, Any]:
+    state = json.loads(json.dumps(base))  # deep copy; cached bases stay intact
+    for path in unset:
+        parent = state
+        for key in path[:-1]:
+            parent = parent.get(key, {})
+        if isinstance(parent, dict):
+            parent.pop(path[-1], None)
+    for path, value in set_:
+        parent = state
+        for key in path[:-1]:
+            if not isinstance(parent.get(key), dict):
+                parent[key] = {}
+            parent = parent[key]
+        parent[path[-1]] = value
+    return state
+
+
+def state_diff(before: Optional[dict[str, Any]], after: Optional[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Changed fields between two states as ``{"state": {"before": .., "after": ..},
+    "attributes.brightness": {...}}``, ignoring volatile bookkeeping fields.
+    """
+    old = {p: v for p, v in _flatten(before or {}).items() if p[0] not in _VOLATILE_FIELDS}
+    new = {p: v for p, v in _flatten(after or {}).items() if p[0] not in _VOLATILE_FIELDS}
+    diff: dict[str, Any] = {}
+    for path in sorted(old.keys() | new.keys()):
+        if old.get(path) != new.get(path) or (path in old) != (path in new):
+            diff[".".join(path)] = {"before": old.get(path), "after": new.get(path)}
+    return diff
+
+
+class SnapshotStore:
+    """
+    Thread-safe; ``put`` is called from worker threads via asyncio.to_thread.
+    Puts are serialized, object write included.
+    """
+
+    def __init__(self, root: Path, max_delta_chain: int = MAX_DELTA_CHAIN) -> None:
+        self.root = Path(root)
+        self.max_delta_chain = max_delta_chain
+        self._objects = self.root / "objects"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # entity_id → (hash, delta depth, state) of its latest snapshot
+        self._heads: dict[str, tuple[str, int, dict[str, Any]]] = {}
+        self._cache: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self.stats = {"puts": 0, "deduplicated": 0, "full": 0, "delta": 0, "bytes_written": 0}
+
+    def _object_path(self, digest: str) -> Path:
+        return self._objects / digest[:2] / f"{digest[2:]}.z"
+
+    def _remember(self, digest: str, state: dict[str, Any]) -> None:
+        self._cache[digest] = state
+        self._cache.move_to_end(digest)
+        while len(self._cache) > _CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def put(self, state: dict[str, Any], entity_id: Optional[str] = None) -> str:
+        """Store ``state`` (if new) and return its hash."""
+        entity_id = entity_id or str(state.get("entity_id") or "")
+        digest = snapshot_hash(state)
+        path = self._object_path(digest)
+        with self._lock:
+            self.stats["puts"] += 1
+            head = self._heads.get(entity_id)
+            if path.exists():
+                self.stats["deduplicated"] += 1
+                depth = head[1] if head is not None and head[0] == digest else self.max_delta_chain
+                self._heads[entity_id] = (digest, depth, state)
+                return digest
+            if head is not None and head[1] < self.max_delta_chain and head[0] != digest:
+                set_, unset = _delta(head[2], state)
+                obj: dict[str, Any] = {
+                    "entity_id": entity_id, "base": head[0], "set": set_, "unset": unset,
+                }
+                depth = head[1] + 1
+                self.stats["delta"] += 1
+            else:
+                obj = {"entity_id": entity_id, "full": state}
+                depth = 0
+                self.stats["full"] += 1
+            # The object is on disk before it becomes a head: the next put may
+            # store a delta against it, and that delta must never outlive its
+            # base (another reader, an LRU miss, or a crash in between).
+            self.stats["bytes_written"] += self._write(path, obj)
+            self._heads[entity_id] = (digest, depth, state)
+            self._remember(digest, state)
+        return digest
+
+    def _write(self, path: Path, obj: dict[str, Any]) -> int:
+        data = zlib.compress(canonical_json(obj), 6)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return len(data)
+
+    def put_many(self, states: Iterable[Optional[dict[str, Any]]]) -> list[Optional[str]]:
+        """``put`` each state in order; None entries map to None."""
+        return [self.put(state) if state is not None else None for state in states]
+
+    def get(self, digest: str) -> Optional[dict[str, Any]]:
+        """
+        Reconstruct a snapshot by hash, or None if unknown.  Raises
+        SnapshotCorruptError if the stored objects do not hash to ``digest``.
+        """
+        with self._lock:
+            cached = self._cache.get(digest)
+        if cached is not None:
+            return cached
+        chain: list[dict[str, Any]] = []
+        current = digest
+        while True:
+            with self._lock:
+                base_state = self._cache.get(current)
+            if base_state is not None:
+                break
+            try:
+                with open(self._object_path(current), "rb") as f:
+                    obj = json.loads(zlib.decompress(f.read()))
+            except FileNotFoundError:
+                if current == digest:
+                    return None
+                raise SnapshotCorruptError(f"snapshot {digest}: delta base {current} is missing")
+            except (zlib.error, ValueError) as exc:
+                raise SnapshotCorruptError(f"snapshot {digest}: object {current} is unreadable: {exc}")
+            if "full" in obj:
+                base_state = obj["full"]
+                break
+            chain.append(obj)
+            current = obj["base"]
+        state = base_state
+        for obj in reversed(chain):
+            state = _apply(state, obj["set"], obj["unset"])
+        actual = snapshot_hash(state)
+        if actual != digest:
+            raise SnapshotCorruptError(f"snapshot {digest}: content hashes to {actual}")
+        with self._lock:
+            self._remember(digest, state)
+        return state
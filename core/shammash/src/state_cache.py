@@ -0,0 +1,199 @@
+"""
+In-process Home Assistant entity state cache for Shammash.
+
+Entries are keyed by entity_id and fed three ways: ``state_changed`` events
+from the HA WebSocket stream, opportunistic REST reads, and one bulk
+``GET /api/states`` warm-up at startup.  Every read names its own
+``max_age``; an entry older than that is re-fetched.
+
+While the WebSocket stream is connected, an entry stored since the current
+connection was established is *tracked* — any change to it would have been
+pushed — so it is served regardless of age.  A reconnect ends tracking for
+everything stored before it.
+
+Concurrent misses for one entity share a single fetch (single-flight), and
+the cache is an LRU bounded at STATE_CACHE_MAX_ENTRIES.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple, Optional, Protocol
+
+Fetch = Callable[[str], Awaitable[dict[str, Any]]]
+FetchAll = Callable[[], Awaitable[list[dict[str, Any]]]]
+
+
+class Subscription(Protocol):
+    """What the cache needs from HAStateStream."""
+
+    connected: bool
+    connects: int
+
+
+class _Entry(NamedTuple):
+    state: dict[str, Any]
+    stored_at: float  # monotonic
+    source: str  # "event" | "rest" | "warmup"
+    connection: Optional[int]  # stream.connects when stored while connected
+
+
+class StateRead(NamedTuple):
+    """How a cached read was satisfied — recorded on receipts."""
+    source: str  # "cache" | "live"
+    age_ms: float
+    origin: str  # "event" | "rest" | "warmup" | "shared" (joined an in-flight fetch)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"source": self.source, "age_ms": self.age_ms, "origin": self.origin}
+
+
+def _newer(candidate: dict[str, Any], current: dict[str, Any]) -> bool:
+    """False if ``candidate`` is an older HA state than ``current``."""
+    a, b = candidate.get("last_updated"), current.get("last_updated")
+    if not isinstance(a, str) or not isinstance(b, str):
+        return True
+    return a >= b  # HA emits uniform ISO-8601 UTC strings
+
+
+class EntityStateCache:
+    """Single event loop only; not thread-safe."""
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        stream: Optional[Subscription] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.stream = stream
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared_fetches = 0
+        self.evictions = 0
+        self.warmed = 0
+        self.last_error: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -- writes -------------------------------------------------------------
+
+    def put(self, entity_id: str, state: dict[str, Any], source: str = "rest") -> None:
+        current = self._entries.get(entity_id)
+        if current is not None and source != "event" and not _newer(state, current.state):
+            return  # a pushed event already beat this REST response
+        stream = self.stream
+        connection = stream.connects if stream is not None and stream.connected else None
+        self._entries[entity_id] = _Entry(state, self._clock(), source, connection)
+        self._entries.move_to_end(entity_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, entity_id: str) -> None:
+        self._entries.pop(entity_id, None)
+
+    def on_state_changed(self, entity_id: str, new_state: Optional[dict[str, Any]]) -> None:
+        """HAStateStream listener."""
+        if new_state is None:
+            self.invalidate(entity_id)
+        else:
+            self.put(entity_id, new_state, source="event")
+
+    async def warm(self, fetch_all: FetchAll) -> int:
+        """Load every entity from one bulk read; returns the count stored."""
+        try:
+            states = await fetch_all()
+        except Exception as exc:
+            self.last_error = f"warm-up failed: {type(exc).__name__}: {exc}"
+            return 0
+        count = 0
+        for state in states[-self.max_entries:]:
+            entity_id = state.get("entity_id") if isinstance(state, dict) else None
+            if entity_id:
+                self.put(entity_id, state, source="warmup")
+                count += 1
+        self.warmed += count
+        return count
+
+    # -- reads --------------------------------------------------------------
+
+    def _tracked(self, entry: _Entry) -> bool:
+        stream = self.stream
+        return (
+            stream is not None and stream.connected
+            and entry.connection is not None and entry.connection == stream.connects
+        )
+
+    def peek(self, entity_id: str, max_age: float) -> Optional[tuple[dict[str, Any], StateRead]]:
+        """A fresh-enough cached state, or None (does not count as a miss)."""
+        entry = self._entries.get(entity_id)
+        if entry is None:
+            return None
+        age = self._clock() - entry.stored_at
+        if not (self._tracked(entry) or age < max_age):
+            return None
+        self._entries.move_to_end(entity_id)
+        return entry.state, StateRead("cache", round(age * 1000, 1), entry.source)
+
+    async def get(
+        self, entity_id: str, fetch: Fetch, max_age: float,
+    ) -> tuple[dict[str, Any], StateRead]:
+        """Cached state no older than ``max_age`` seconds, else a live fetch."""
+        cached = self.peek(entity_id, max_age)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        pending = self._inflight.get(entity_id)
+        if pending is not None:
+            self.shared_fetches += 1
+            try:
+                state = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # we were cancelled, not the fetch
+                return await self.get(entity_id, fetch, max_age)
+            return state, StateRead("live", 0.0, "shared")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[entity_id] = future
+        try:
+            state = await fetch(entity_id)
+        except asyncio.CancelledError:
+            future.cancel()  # joiners retry with their own fetch
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody joined
+            raise
+        else:
+            future.set_result(state)
+            self.put(entity_id, state, source="rest")
+        finally:
+            del self._inflight[entity_id]
+        return state, StateRead("live", 0.0, "rest")
+
+    def stats(self) -> dict[str, Any]:
+        now = self._clock()
+        ages = [now - entry.stored_at for entry in self._entries.values()]
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "shared_fetches": self.shared_fetches,
+            "evictions": self.evictions,
+            "warmed": self.warmed,
+            "tracked": sum(1 for entry in self._entries.values() if self._tracked(entry)),
+            "mean_age_seconds": round(sum(ages) / len(ages), 3) if ages else None,
+            "max_age_seconds": round(max(ages), 3) if ages else None,
+            "last_error": self.last_error,
+        }
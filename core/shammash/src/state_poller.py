@@ -0,0 +1,264 @@
+"""
+Coalesced Home Assistant state poller for Shammash.
+
+Every verification that needs a REST read registers a PollWatch and asks
+for its next read with ``request(delay)``.  One background task serves all
+of them: each tick it collects the entities whose reads are due and fetches
+them together —
+
+  * fewer than ``bulk_threshold`` entities → concurrent
+    ``GET /api/states/{entity_id}``, at most ``max_concurrency`` in flight;
+  * otherwise → one ``GET /api/states`` for everything;
+
+then fans each result out to every watch on that entity with a pending
+request.  Ticks are at least ``min_gap`` seconds apart, so HA sees at most
+``1 / min_gap`` rounds per second however many proposals are verifying.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+Fetch = Callable[[str], Awaitable[dict[str, Any]]]
+FetchAll = Callable[[], Awaitable[list[dict[str, Any]]]]
+StateListener = Callable[[str, dict[str, Any]], None]
+
+
+class Polled(NamedTuple):
+    """One delivered read: the state, or the exception that prevented it."""
+    state: Optional[dict[str, Any]]
+    error: Optional[BaseException]
+
+
+class EntityNotFound(LookupError):
+    """A bulk read did not include a watched entity."""
+
+
+class PollWatch:
+    """
+    A waiter's handle on the poller.  Use as a context manager so the
+    registration is always removed.
+    """
+
+    def __init__(self, poller: "StatePoller", entity_id: str) -> None:
+        self.entity_id = entity_id
+        self.due: Optional[float] = None  # loop time of the requested read
+        self._poller = poller
+        self._queue: asyncio.Queue[Polled] = asyncio.Queue()
+
+    def __enter__(self) -> "PollWatch":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._poller._unwatch(self)
+
+    def request(self, delay: float) -> None:
+        """Ask for a read no earlier than ``delay`` seconds from now."""
+        due = asyncio.get_running_loop().time() + max(0.0, delay)
+        if self.due is None or due < self.due:
+            self.due = due
+        self._poller._wake.set()
+
+    def _push(self, polled: Polled) -> None:
+        self.due = None
+        self._queue.put_nowait(polled)
+
+    async def next(self, timeout: float) -> Optional[Polled]:
+        """The next delivered read; None on timeout."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            return None
+
+
+class StatePoller:
+    """
+    Background poll loop.  start() and close() must be called on the event
+    loop that uses the watches.
+    """
+
+    def __init__(
+        self,
+        fetch: Fetch,
+        fetch_all: FetchAll,
+        min_gap: float = 0.1,
+        bulk_threshold: int = 10,
+        max_concurrency: int = 4,
+    ) -> None:
+        self._fetch = fetch
+        self._fetch_all = fetch_all
+        self.min_gap = min_gap
+        self.bulk_threshold = max(1, int(bulk_threshold))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._watches: dict[str, set[PollWatch]] = {}
+        self._listeners: list[StateListener] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        # Counters — monotonic ints, read without locking.
+        self.ticks = 0
+        self.bulk_fetches = 0
+        self.entity_fetches = 0
+        self.deliveries = 0
+        self.fetch_errors = 0
+        self.tick_failures = 0
+        self.peak_watches = 0
+        self.last_error: Optional[str] = None
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="shammash-state-poller")
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    # -- consumers ----------------------------------------------------------
+
+    def watch(self, entity_id: str) -> PollWatch:
+        watch = PollWatch(self, entity_id)
+        self._watches.setdefault(entity_id, set()).add(watch)
+        self.peak_watches = max(self.peak_watches, self.watch_count)
+        return watch
+
+    def _unwatch(self, watch: PollWatch) -> None:
+        watches = self._watches.get(watch.entity_id)
+        if watches is not None:
+            watches.discard(watch)
+            if not watches:
+                del self._watches[watch.entity_id]
+
+    @property
+    def watch_count(self) -> int:
+        return sum(len(watches) for watches in self._watches.values())
+
+    def add_listener(self, listener: StateListener) -> None:
+        """Call ``listener(entity_id, state)`` for every state fetched."""
+        self._listeners.append(listener)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "ticks": self.ticks,
+            "bulk_fetches": self.bulk_fetches,
+            "entity_fetches": self.entity_fetches,
+            "deliveries": self.deliveries,
+            "fetch_errors": self.fetch_errors,
+            "tick_failures": self.tick_failures,
+            "watches": self.watch_count,
+            "peak_watches": self.peak_watches,
+            "watched_entities": len(self._watches),
+            "last_error": self.last_error,
+        }
+
+    # -- loop ---------------------------------------------------------------
+
+    def _next_due(self) -> Optional[float]:
+        dues = [w.due for ws in self._watches.values() for w in ws if w.due is not None]
+        return min(dues) if dues else None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_tick = float("-inf")
+        while True:
+            self._wake.clear()
+            due = self._next_due()
+            if due is None:
+                await self._wake.wait()
+                continue
+            wait = max(due, last_tick + self.min_gap) - loop.time()
+            if wait > 0:
+                try:
+                    # An earlier request wakes us to re-plan.
+                    await asyncio.wait_for(self._wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            last_tick = loop.time()
+            try:
+                await self._tick(last_tick)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # keep polling; undelivered reads stay due
+                self.tick_failures += 1
+                self.last_error = f"tick: {type(exc).__name__}: {exc}"
+
+    async def _tick(self, now: float) -> None:
+        entity_ids = [
+            entity_id for entity_id, watches in self._watches.items()
+            if any(w.due is not None and w.due <= now for w in watches)
+        ]
+        if not entity_ids:
+            return
+        # Every request pending now is answered, due or not; requests made
+        # while the fetch is in flight wait for a read that started after them.
+        pending = {
+            entity_id: [w for w in self._watches[entity_id] if w.due is not None]
+            for entity_id in entity_ids
+        }
+        self.ticks += 1
+        if len(entity_ids) >= self.bulk_threshold:
+            results = await self._fetch_bulk(entity_ids)
+        else:
+            results = await self._fetch_each(entity_ids)
+        for entity_id, polled in results.items():
+            if polled.error is not None:
+                self.fetch_errors += 1
+                self.last_error = f"{entity_id}: {type(polled.error).__name__}: {polled.error}"
+            for watch in pending[entity_id]:
+                watch._push(polled)
+                self.deliveries += 1
+
+    def _notify(self, entity_id: str, state: dict[str, Any]) -> None:
+        for listener in self._listeners:
+            listener(entity_id, state)
+
+    async def _fetch_bulk(self, entity_ids: list[str]) -> dict[str, Polled]:
+        self.bulk_fetches += 1
+        try:
+            states = await self._fetch_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            return {entity_id: Polled(None, exc) for entity_id in entity_ids}
+        by_id: dict[str, dict[str, Any]] = {}
+        for state in states:
+            entity_id = state.get("entity_id") if isinstance(state, dict) else None
+            if entity_id:
+                by_id[entity_id] = state
+                self._notify(entity_id, state)
+        return {
+            entity_id: (
+                Polled(by_id[entity_id], None) if entity_id in by_id
+                else Polled(None, EntityNotFound(f"{entity_id} not in GET /api/states"))
+            )
+            for entity_id in entity_ids
+        }
+
+    async def _fetch_each(self, entity_ids: list[str]) -> dict[str, Polled]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def one(entity_id: str) -> Polled:
+            async with semaphore:
+                self.entity_fetches += 1
+                try:
+                    state = await self._fetch(entity_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    return Polled(None, exc)
+            self._notify(entity_id, state)
+            return Polled(state, None)
+
+        polled = await asyncio.gather(*(one(entity_id) for entity_id in entity_ids))
+        return dict(zip(entity_ids, polled))
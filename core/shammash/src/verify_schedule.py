@@ -0,0 +1,193 @@
+"""
+Latency-aware verification poll schedules for Shammash.
+
+A verification polls at offsets (seconds after the service call) planned
+here rather than on a fixed interval:
+
+  * with no history, aggressively — immediately, then ``first_gap`` apart,
+    doubling up to the policy's ``verification.poll_interval_seconds``;
+  * once an entity (or, failing that, its domain) has ``min_samples``
+    recorded settle times, polls are aimed at the p50 / p90 / p99 of its
+    settle-time histogram before the same backoff continues.
+
+Settle times are kept as log-spaced bucket counts per domain and per
+entity, and persisted as one small JSON file so the learning survives
+restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+# Bucket upper bounds, 25 ms to ~72 s, √2 apart; one overflow bucket above.
+BUCKET_BOUNDS: tuple[float, ...] = tuple(round(0.025 * 2 ** (i / 2), 4) for i in range(24))
+SCHEDULE_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def poll_offsets(
+    timeout: float,
+    first_gap: float,
+    max_gap: float,
+    targets: tuple[float, ...] = (),
+) -> list[float]:
+    """
+    Poll offsets within ``timeout``: 0, each of ``targets`` (ascending,
+    at least ``first_gap`` apart), then gaps doubling from ``first_gap``
+    up to ``max_gap``.
+    """
+    first_gap = max(0.001, min(first_gap, max_gap))
+    offsets = [0.0]
+    for target in targets:
+        if target >= timeout:
+            break
+        if target - offsets[-1] >= first_gap:
+            offsets.append(round(target, 3))
+    gap, at = first_gap, offsets[-1]
+    while at + gap < timeout:
+        at += gap
+        offsets.append(round(at, 3))
+        gap = min(gap * 2, max_gap)
+    return offsets
+
+
+class SettleHistogram:
+    """Counts of settle times per BUCKET_BOUNDS bucket."""
+
+    def __init__(self, counts: Optional[list[int]] = None) -> None:
+        self.counts = list(counts) if counts is not None else [0] * (len(BUCKET_BOUNDS) + 1)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def add(self, seconds: float) -> None:
+        for i, bound in enumerate(BUCKET_BOUNDS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        rank = q * self.total
+        seen = 0
+        for i, count in enumerate(self.counts[:-1]):
+            seen += count
+            if count and seen >= rank:
+                return BUCKET_BOUNDS[i]
+        return BUCKET_BOUNDS[-1]
+
+
+class Schedule(NamedTuple):
+    offsets: list[float]
+    basis: str  # "entity" | "domain" | "default"
+
+
+class VerificationScheduler:
+    """Plans poll offsets and learns from observed settle times."""
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        first_gap: float = 0.1,
+        min_samples: int = 5,
+    ) -> None:
+        self.path = path
+        self.first_gap = first_gap
+        self.min_samples = max(1, int(min_samples))
+        self._domains: dict[str, SettleHistogram] = {}
+        self._entities: dict[str, SettleHistogram] = {}
+        self.recorded = 0
+        self._dirty = False
+        self.last_error: Optional[str] = None
+
+    # -- planning -----------------------------------------------------------
+
+    def _history(self, entity_id: str) -> tuple[Optional[SettleHistogram], str]:
+        entity = self._entities.get(entity_id)
+        if entity is not None and entity.total >= self.min_samples:
+            return entity, "entity"
+        domain = self._domains.get(entity_id.split(".", 1)[0])
+        if domain is not None and domain.total >= self.min_samples:
+            return domain, "domain"
+        return None, "default"
+
+    def plan(self, entity_id: str, timeout: float, max_gap: float) -> Schedule:
+        history, basis = self._history(entity_id)
+        targets = tuple(history.quantile(q) for q in SCHEDULE_QUANTILES) if history else ()
+        return Schedule(poll_offsets(timeout, self.first_gap, max_gap, targets), basis)
+
+    def record(self, entity_id: str, settle_seconds: float) -> None:
+        domain = entity_id.split(".", 1)[0]
+        self._domains.setdefault(domain, SettleHistogram()).add(settle_seconds)
+        self._entities.setdefault(entity_id, SettleHistogram()).add(settle_seconds)
+        self.recorded += 1
+        self._dirty = True
+
+    # -- persistence --------------------------------------------------------
+
+    def load(self) -> None:
+        """Read persisted histograms; a missing or unreadable file starts empty."""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("bucket_bounds") != list(BUCKET_BOUNDS):
+                raise ValueError("bucket layout changed")
+            width = len(BUCKET_BOUNDS) + 1
+            for key, target in (("domains", self._domains), ("entities", self._entities)):
+                for name, counts in data.get(key, {}).items():
+                    if len(counts) == width:
+                        target[name] = SettleHistogram([int(c) for c in counts])
+        except (OSError, ValueError, TypeError, AttributeError) as exc:
+            self.last_error = f"load failed: {type(exc).__name__}: {exc}"
+
+    def snapshot(self) -> Optional[dict[str, Any]]:
+        """
+        Copy of the histograms for write(), or None if nothing was recorded
+        since the last one.  Call it where record() runs (the event loop):
+        the copy is what lets write() run on another thread.
+        """
+        if self.path is None or not self._dirty:
+            return None
+        self._dirty = False
+        return {
+            "bucket_bounds": list(BUCKET_BOUNDS),
+            "domains": {name: list(h.counts) for name, h in sorted(self._domains.items())},
+            "entities": {name: list(h.counts) for name, h in sorted(self._entities.items())},
+        }
+
+    def save(self) -> None:
+        """Write histograms atomically if anything was recorded.  Blocking."""
+        data = self.snapshot()
+        if data is not None:
+            self.write(data)
+
+    def write(self, data: dict[str, Any]) -> None:
+        """Write a snapshot() atomically.  Blocking; safe off the event loop."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            self._dirty = True
+            self.last_error = f"save failed: {type(exc).__name__}: {exc}"
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": str(self.path) if self.path is not None else None,
+            "recorded": self.recorded,
+            "domains": {
+                name: {
+                    "samples": h.total,
+                    **{f"p{round(q * 100)}": h.quantile(q) for q in SCHEDULE_QUANTILES},
+                }
+                for name, h in sorted(self._domains.items())
+            },
+            "entities": len(self._entities),
+            "last_error": self.last_error,
+        }
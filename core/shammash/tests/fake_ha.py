@@ -0,0 +1,72 @@
+"""
+Local Home Assistant WebSocket stand-in for tests.
+
+Speaks just enough of ``/api/websocket`` for HAStateStream: the auth
+handshake, ``subscribe_events`` for ``state_changed`` and pushed events.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional
+
+from websockets.asyncio.server import ServerConnection, serve
+
+
+class FakeHomeAssistant:
+    def __init__(self, token: str) -> None:
+        self.token = token
+        self.url = ""
+        self._server: Any = None
+        self._subscribers: dict[ServerConnection, int] = {}
+
+    async def start(self) -> str:
+        """Listen on an ephemeral localhost port; return its http:// base URL."""
+        self._server = await serve(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        self._subscribers.clear()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def push_state(self, state: dict[str, Any], old_state: Optional[dict[str, Any]] = None) -> None:
+        """Send a state_changed event for ``state`` to every subscriber."""
+        for ws, sub_id in list(self._subscribers.items()):
+            await ws.send(json.dumps({
+                "id": sub_id,
+                "type": "event",
+                "event": {
+                    "event_type": "state_changed",
+                    "data": {
+                        "entity_id": state["entity_id"],
+                        "old_state": old_state,
+                        "new_state": state,
+                    },
+                },
+            }))
+
+    async def _handle(self, ws: ServerConnection) -> None:
+        if ws.request.path != "/api/websocket":
+            await ws.close(code=1008)
+            return
+        await ws.send(json.dumps({"type": "auth_required", "ha_version": "fake"}))
+        auth = json.loads(await ws.recv())
+        if auth.get("access_token") != self.token:
+            await ws.send(json.dumps({"type": "auth_invalid", "message": "Invalid access token"}))
+            return
+        await ws.send(json.dumps({"type": "auth_ok", "ha_version": "fake"}))
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                if message.get("type") == "subscribe_events":
+                    await ws.send(json.dumps({"id": message["id"], "type": "result", "success": True}))
+                    self._subscribers[ws] = message["id"]
+        finally:
+            self._subscribers.pop(ws, None)
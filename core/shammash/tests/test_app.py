@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import json
 import os
+import time
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
@@ -73,10 +74,29 @@ def _mock_ha_state(entity_id: str, state: str = "on", attributes: dict | None =
     }
 
 
+def _record(data: dict, timestamp: str | None = None, proposal_id: str = ""):
+    """Build an AuditRecord for storage-layer tests."""
+    from core.shammash.src.audit_segments import AuditRecord
+
+    timestamp = timestamp or datetime.now(timezone.utc).isoformat()
+    line = json.dumps({
+        **data,
+        "timestamp": timestamp,
+        "correlation": {"request_id": "r", "proposal_id": proposal_id},
+    }) + "\n"
+    return AuditRecord(line=line, timestamp=timestamp, proposal_id=proposal_id)
+
+
 # ---------------------------------------------------------------------------
 # Fixtures
 # ---------------------------------------------------------------------------
 
+_POLICY_GLOBALS = (
+    "_policy_snapshot", "_POLICY", "ALLOWED_ACTION_TYPES", "SHAMMASH_ALLOWLIST",
+    "POLICY_MAX_BLAST_RADIUS", "POLICY_MAX_TIMEOUT", "POLICY_ENFORCE_TARGET_VERIFY",
+)
+
+
 @pytest.fixture(autouse=True)
 def _env_and_audit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
     """Set up env vars and a temp audit file for each test."""
@@ -92,8 +112,12 @@ def _env_and_audit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
     app_module.SHAMMASH_INSTANCE = "test-shammash"
     app_module.HA_URL = "http://ha-test.local:8123"
     app_module.HA_TOKEN = "test-token-abc"
-    app_module.SHAMMASH_ALLOWLIST = {"light.test_lamp", "switch.test_switch"}
     app_module.AUDIT_JSONL_PATH = audit_path
+    # Policy is installed as a snapshot (from the env allowlist above) and
+    # every published global is restored at teardown.
+    for name in _POLICY_GLOBALS:
+        monkeypatch.setattr(app_module, name, getattr(app_module, name))
+    app_module._publish_policy(app_module._load_policy())
 
     yield
 
@@ -457,3 +481,2073 @@ class TestSanitization:
         result = _sanitize_error(exc)
         assert "xyzabc123" not in result
         assert "[REDACTED]" in result
+
+
+# ---------------------------------------------------------------------------
+# Tests: Audit Sink (group commit)
+# ---------------------------------------------------------------------------
+
+class TestAuditSink:
+    """Background batching writer behind append_audit_event."""
+
+    def test_batches_and_drains_on_close(self, tmp_path: Path):
+        from core.shammash.src.audit_segments import SegmentedAuditWriter
+        from core.shammash.src.audit_sink import AuditSink
+
+        path = tmp_path / "sink" / "events.jsonl"
+        sink = AuditSink(
+            SegmentedAuditWriter(path), durability="fsync-per-batch", max_batch=64
+        )
+        sink.start()
+        for i in range(500):
+            sink.submit(_record({"n": i}))
+        sink.close()
+
+        lines = path.read_text().splitlines()
+        assert [json.loads(line)["n"] for line in lines] == list(range(500))
+        assert sink.events_written == 500
+        assert sink.largest_batch <= 64
+        assert sink.queue_depth == 0
+        assert not sink.running
+
+    @pytest.mark.parametrize("durability", ["none", "flush", "fsync-per-event"])
+    def test_flush_barrier_makes_lines_visible(self, tmp_path: Path, durability: str):
+        from core.shammash.src.audit_segments import SegmentedAuditWriter
+        from core.shammash.src.audit_sink import AuditSink
+
+        path = tmp_path / "events.jsonl"
+        sink = AuditSink(SegmentedAuditWriter(path), durability=durability)
+        sink.start()
+        try:
+            sink.submit(_record({"a": 1}))
+            sink.submit(_record({"a": 2}))
+            assert sink.flush(timeout=5)
+            assert len(path.read_text().splitlines()) == 2
+        finally:
+            sink.close()
+
+    def test_failed_batch_is_retried_not_dropped(self, tmp_path: Path, monkeypatch):
+        import core.shammash.src.audit_segments as segments_module
+        from core.shammash.src.audit_chain import ChainState
+        from core.shammash.src.audit_sink import AuditSink
+        from core.shammash.src.audit_verify import verify_log
+
+        # Fail after the lines are chained and written, before fsync: the
+        # writer must truncate and rewind the chain so the retry is clean.
+        real_fsync, failures = os.fsync, [2]
+
+        def flaky_fsync(fd):
+            if failures[0]:
+                failures[0] -= 1
+                raise OSError("disk full")
+            real_fsync(fd)
+
+        monkeypatch.setattr(segments_module.os, "fsync", flaky_fsync)
+        path = tmp_path / "events.jsonl"
+        sink = AuditSink(
+            segments_module.SegmentedAuditWriter(path, chain=ChainState(4)),
+            durability="fsync-per-batch", retry_initial_seconds=0.01,
+        )
+        sink.start()
+        with pytest.warns(UserWarning, match="will retry"):
+            sink.submit(_record({"n": 0}))
+            assert not sink.flush(timeout=5)
+            assert sink.stats()["healthy"] is False
+            sink.submit(_record({"n": 1}))
+            deadline = time.monotonic() + 5
+            while sink.events_written < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        sink.close()
+
+        assert [json.loads(line)["n"] for line in path.read_text().splitlines()] == [0, 1]
+        assert sink.write_errors == 2 and sink.dropped_events == 0
+        assert sink.queue_depth == 0
+        assert verify_log(path, full=True, workers=1)["ok"]
+
+    def test_unknown_durability_rejected(self, tmp_path: Path):
+        from core.shammash.src.audit_segments import SegmentedAuditWriter
+        from core.shammash.src.audit_sink import AuditSink
+
+        with pytest.raises(ValueError):
+            AuditSink(SegmentedAuditWriter(tmp_path / "events.jsonl"), durability="sometimes")
+
+    def test_lifespan_drains_sink_on_shutdown(self):
+        """Events queued during requests are on disk once lifespan exits."""
+        import core.shammash.src.app as app_module
+
+        with TestClient(app_module.app) as lifespan_client:
+            assert app_module._audit_sink is not None
+            assert app_module._audit_sink.running
+            for _ in range(5):
+                proposal = _make_proposal(entity_id="light.forbidden_lamp")
+                resp = lifespan_client.post("/execute/proposal", json=proposal)
+                assert resp.json()["decision"] == "denied"
+
+        assert app_module._audit_sink is None
+        lines = app_module.AUDIT_JSONL_PATH.read_text().strip().splitlines()
+        # proposal.in, law_decision, receipt.out per denied proposal
+        assert len(lines) == 15
+
+
+# ---------------------------------------------------------------------------
+# Tests: Segmented Audit Storage
+# ---------------------------------------------------------------------------
+
+class TestAuditSegments:
+    """Rotation, compression and manifest-driven reads."""
+
+    def test_rotates_by_size_and_compresses(self, tmp_path: Path):
+        from core.shammash.src.audit_segments import (
+            SegmentedAuditWriter,
+            iter_audit_events,
+            load_manifest,
+        )
+
+        path = tmp_path / "events.jsonl"
+        writer = SegmentedAuditWriter(path, max_bytes=2_000, compression="gzip")
+        for i in range(100):
+            writer.write([_record({"n": i}, proposal_id=f"p-{i}")])
+        writer.close()
+
+        manifest = load_manifest(path)
+        sealed = manifest["segments"]
+        assert len(sealed) > 1
+        assert all(s["state"] == "compressed" for s in sealed)
+        assert all(s["file"].endswith(".jsonl.gz") for s in sealed)
+        assert sealed[0]["file"] == "events-000001.jsonl.gz"
+        assert sealed[0]["first_proposal_id"] == "p-0"
+        assert not (tmp_path / "events-000001.jsonl").exists()
+        # Every event is readable, in order, across gz segments + active file.
+        assert [e["n"] for e in iter_audit_events(path)] == list(range(100))
+
+    def test_time_window_skips_segments(self, tmp_path: Path):
+        from core.shammash.src.audit_segments import (
+            SegmentedAuditWriter,
+            iter_audit_events,
+            select_segments,
+        )
+
+        path = tmp_path / "events.jsonl"
+        writer = SegmentedAuditWriter(path, max_bytes=0, compression="none")
+        for day in range(1, 6):
+            ts = f"2026-01-0{day}T12:00:00+00:00"
+            writer.write([_record({"day": day}, timestamp=ts)])
+            writer.rotate()
+        writer.close()
+
+        since = datetime(2026, 1, 3, tzinfo=timezone.utc)
+        until = datetime(2026, 1, 4, 23, tzinfo=timezone.utc)
+        assert [s["seq"] for s in select_segments(path, since, until)] == [3, 4]
+        assert [e["day"] for e in iter_audit_events(path, since, until)] == [3, 4]
+
+    def test_recovers_active_segment_after_restart(self, tmp_path: Path):
+        from core.shammash.src.audit_segments import SegmentedAuditWriter, load_manifest
+
+        path = tmp_path / "events.jsonl"
+        # A pre-segmentation log with no manifest is adopted as the active segment.
+        path.write_text(_record({"n": 0}, proposal_id="legacy").line)
+        writer = SegmentedAuditWriter(path, compression="none")
+        writer.write([_record({"n": 1}, proposal_id="new")])
+        writer.close()
+
+        active = load_manifest(path)["active"]
+        assert active["events"] == 2
+        assert active["first_proposal_id"] == "legacy"
+        assert active["last_proposal_id"] == "new"
+        assert active["bytes"] == path.stat().st_size
+
+
+# ---------------------------------------------------------------------------
+# Tests: Indexed Audit Lookup
+# ---------------------------------------------------------------------------
+
+class TestAuditLookup:
+    """GET /audit endpoints backed by the sidecar index."""
+
+    def test_lookup_by_proposal_and_request(self, client: TestClient):
+        first = _make_proposal(entity_id="light.forbidden_lamp")
+        second = _make_proposal(entity_id="light.forbidden_lamp")
+        client.post("/execute/proposal", json=first)
+        client.post("/execute/proposal", json=second)
+
+        resp = client.get(f"/audit/{first['proposal_id']}")
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["count"] == 3
+        assert [e["event_type"] for e in data["events"]] == [
+            "execution_proposal.in", "law_decision", "execution_receipt.out",
+        ]
+        assert all(e["correlation"]["proposal_id"] == first["proposal_id"] for e in data["events"])
+
+        resp = client.get("/audit", params={
+            "request_id": second["request_id"], "event_type": "law_decision",
+        })
+        events = resp.json()["events"]
+        assert len(events) == 1
+        assert events[0]["correlation"]["proposal_id"] == second["proposal_id"]
+
+    def test_unknown_proposal_404_and_missing_keys_400(self, client: TestClient):
+        assert client.get(f"/audit/{uuid.uuid4()}").status_code == 404
+        assert client.get("/audit").status_code == 400
+
+    def test_lookup_seeks_into_compressed_segments(self, tmp_path: Path):
+        import sqlite3
+
+        from core.shammash.src.audit_index import AuditIndex, index_path_for, lookup_events
+        from core.shammash.src.audit_segments import SegmentedAuditWriter
+
+        path = tmp_path / "events.jsonl"
+        writer = SegmentedAuditWriter(
+            path, max_bytes=4_000, compression="gzip", index=AuditIndex(path)
+        )
+        for i in range(200):
+            writer.write([_record({"n": i}, proposal_id=f"p-{i}")])
+        writer.close()
+
+        with sqlite3.connect(index_path_for(path)) as conn:
+            (blocks,) = conn.execute("SELECT COUNT(*) FROM blocks").fetchone()
+        assert blocks > 0
+        for i in (0, 57, 199):
+            events = lookup_events(path, proposal_id=f"p-{i}")
+            assert [e["n"] for e in events] == [i]
+
+    def test_index_catches_up_after_loss(self, tmp_path: Path):
+        from core.shammash.src.audit_index import AuditIndex, index_path_for, lookup_events
+        from core.shammash.src.audit_segments import SegmentedAuditWriter
+
+        path = tmp_path / "events.jsonl"
+        writer = SegmentedAuditWriter(path, max_bytes=1_000, compression="none")
+        for i in range(30):
+            writer.write([_record({"n": i}, proposal_id=f"p-{i}")])
+        writer.close()
+        assert not index_path_for(path).exists()
+
+        # Opening with an index re-indexes every sealed and active segment.
+        SegmentedAuditWriter(path, compression="none", index=AuditIndex(path)).close()
+        assert [e["n"] for e in lookup_events(path, proposal_id="p-3")] == [3]
+        assert [e["n"] for e in lookup_events(path, proposal_id="p-29")] == [29]
+
+
+# ---------------------------------------------------------------------------
+# Tests: Audit Hash Chain
+# ---------------------------------------------------------------------------
+
+class TestAuditChain:
+    """Hash-chained lines, signed checkpoints and incremental verification."""
+
+    def _write(self, path: Path, start: int, count: int, key: bytes | None = b"k"):
+        from core.shammash.src.audit_chain import ChainState
+        from core.shammash.src.audit_segments import SegmentedAuditWriter
+
+        writer = SegmentedAuditWriter(
+            path, max_bytes=3_000, compression="gzip", chain=ChainState(10, key)
+        )
+        for i in range(start, start + count):
+            writer.write([_record({"n": i}, proposal_id=f"p-{i}")])
+        writer.close()
+
+    def test_chain_spans_segments_and_restarts(self, tmp_path: Path):
+        from core.shammash.src.audit_segments import iter_audit_events, load_manifest
+        from core.shammash.src.audit_verify import verify_log
+
+        path = tmp_path / "events.jsonl"
+        self._write(path, 0, 60)
+        self._write(path, 60, 40)
+
+        events = list(iter_audit_events(path))
+        assert [e["chain"]["index"] for e in events] == list(range(100))
+        assert [e["n"] for e in events] == list(range(100))
+        sealed = load_manifest(path)["segments"]
+        assert len(sealed) > 1
+        assert all(s["checkpoints"][-1]["last_index"] == s["chain_last_index"] for s in sealed)
+
+        report = verify_log(path, key=b"k", full=True, workers=1)
+        assert report["ok"], report["errors"]
+        assert report["events_checked"] == 100
+
+    def test_edit_and_deletion_are_detected(self, tmp_path: Path):
+        from core.shammash.src.audit_verify import verify_log
+
+        path = tmp_path / "events.jsonl"
+        self._write(path, 0, 5)
+        lines = path.read_bytes().splitlines(keepends=True)
+        edited = lines[:1] + [lines[1].replace(b'"n": 1', b'"n": 9')] + lines[2:]
+        path.write_bytes(b"".join(edited))
+        errors = verify_log(path, full=True, workers=1)["errors"]
+        assert any("#1 content does not match" in e for e in errors)
+
+        path.write_bytes(b"".join(lines[:2] + lines[3:]))
+        errors = verify_log(path, full=True, workers=1)["errors"]
+        assert any("expected event #2, found #3" in e for e in errors)
+
+    def test_trust_file_limits_verification_to_new_events(self, tmp_path: Path):
+        from core.shammash.src.audit_verify import main, trust_path_for, verify_log
+
+        path = tmp_path / "events.jsonl"
+        self._write(path, 0, 50)
+        first = verify_log(path, key=b"k", workers=1)
+        assert first["ok"] and first["events_checked"] == 50
+        trust = json.loads(trust_path_for(path).read_text())
+        assert trust["last_index"] == 49
+
+        self._write(path, 50, 7)
+        second = verify_log(path, key=b"k", workers=1)
+        assert second["ok"], second["errors"]
+        assert second["events_checked"] == 7
+        assert main([str(path), "--workers", "1"]) == 0
+
+    def test_unchained_line_after_chain_start_is_rejected(self, tmp_path: Path):
+        from core.shammash.src.audit_chain import split_chain
+        from core.shammash.src.audit_verify import main, trust_path_for, verify_log
+
+        path = tmp_path / "events.jsonl"
+        self._write(path, 0, 5)
+        lines = path.read_bytes().splitlines(keepends=True)
+        forged = split_chain(lines[2])[0].replace(b'"n": 2', b'"n": 99') + b"\n"
+        path.write_bytes(b"".join(lines[:3] + [forged] + lines[3:]))
+        report = verify_log(path, full=True, workers=1)
+        assert not report["ok"]
+        assert any("unchained line 4 after event #2" in e for e in report["errors"])
+        assert main([str(path), "--workers", "1", "--full"]) == 1
+
+        path.write_bytes(b"".join(lines))
+        trust_path_for(path).write_text(json.dumps({
+            "segment": 42, "end_offset": 0, "last_index": 4, "last_hash": "0" * 64,
+        }))
+        errors = verify_log(path, workers=1)["errors"]
+        assert any("segment 42 is missing" in e for e in errors)
+
+    def test_forged_checkpoint_signature_is_rejected(self, tmp_path: Path):
+        from core.shammash.src.audit_verify import verify_log
+
+        path = tmp_path / "events.jsonl"
+        self._write(path, 0, 20, key=b"real-key")
+        assert verify_log(path, key=b"real-key", full=True, workers=1)["ok"]
+        report = verify_log(path, key=b"attacker", full=True, workers=1, update_trust=False)
+        assert not report["ok"]
+        assert any("invalid signature" in e for e in report["errors"])
+
+
+# ---------------------------------------------------------------------------
+# Tests: Audit Metrics
+# ---------------------------------------------------------------------------
+
+class TestAuditMetrics:
+    """Columnar export and SPEC metrics over both audit formats."""
+
+    @patch("core.shammash.src.app.ha_call_service", new_callable=AsyncMock)
+    @patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock)
+    def test_metrics_from_shammash_log(
+        self,
+        mock_get_state: AsyncMock,
+        mock_call_service: AsyncMock,
+        client: TestClient,
+    ):
+        pytest.importorskip("numpy")
+        import core.shammash.src.app as app_module
+        from core.shammash.src.audit_metrics import compute_metrics, load_columns
+
+        mock_get_state.side_effect = [
+            _mock_ha_state("light.test_lamp", state="off"),
+            _mock_ha_state("light.test_lamp", state="on"),
+        ]
+        mock_call_service.side_effect = [
+            {"status_code": 200},
+            httpx.HTTPStatusError("500", request=httpx.Request("POST", "http://ha"),
+                                  response=httpx.Response(500)),
+        ]
+        client.post("/execute/proposal", json=_make_proposal(
+            entity_id="light.test_lamp", verify_attribute="state", verify_equals="on",
+        ))
+        mock_get_state.side_effect = [_mock_ha_state("light.test_lamp", state="off")]
+        failed = client.post("/execute/proposal", json=_make_proposal(entity_id="light.test_lamp"))
+        assert failed.json()["decision"] == "failed"
+        for _ in range(2):
+            client.post("/execute/proposal", json=_make_proposal(entity_id="light.forbidden_lamp"))
+
+        report = compute_metrics(load_columns(app_module.AUDIT_JSONL_PATH), by="month")
+        assert report["decisions"] == 4
+        assert report["approval_rate"] == 0.5
+        assert report["denial_reasons"][0] == {
+            "policy_basis": "law.v1.entity_not_allowlisted", "count": 2,
+        }
+        assert report["time_to_decision"]["count"] == 4
+        # The failed service call has no action_taken but is still an execution.
+        assert report["executions"] == 2
+        assert report["execution_success_rate"] == 0.5
+        assert report["periods"][0]["decisions"] == 4
+
+    def test_reference_entries_and_rate_limit_hits(self, tmp_path: Path):
+        pytest.importorskip("numpy")
+        from core.shammash.src.audit_metrics import compute_metrics, load_columns
+
+        path = tmp_path / "ref.jsonl"
+        rows = []
+        for n, (approved, status, details) in enumerate([
+            (True, "SUCCESS", "done"),
+            (True, "SKIPPED", "rate limit exceeded"),
+            (False, "SKIPPED", "human denied"),
+        ]):
+            pid = f"pl-{n}"
+            rows.append({"proposal_id": pid, "trace_id": "t", "stage": "propose",
+                         "payload": {"resource": "light.kitchen"}, "timestamp": 1000.0 + n})
+            rows.append({"proposal_id": pid, "trace_id": "t", "stage": "decision",
+                         "payload": {"approved": approved, "reason": "human denied" if not approved else "auto-approved"},
+                         "timestamp": 1000.25 + n})
+            rows.append({"proposal_id": pid, "trace_id": "t", "stage": "execute",
+                         "payload": {"status": status, "details": details}, "timestamp": 1000.5 + n})
+        path.write_text("".join(json.dumps(r) + "\n" for r in rows) + "{torn")
+
+        report = compute_metrics(load_columns(path))
+        assert report["approval_rate"] == round(2 / 3, 6)
+        assert report["denial_reasons"] == [{"policy_basis": "human denied", "count": 1}]
+        assert report["time_to_decision"]["p50_ms"] == 250.0
+        assert report["executions"] == 1
+        assert report["rate_limit_hits"] == 1
+
+    def test_sealed_segments_are_cached_and_filtered_by_time(self, tmp_path: Path):
+        pytest.importorskip("numpy")
+        from core.shammash.src.audit_metrics import cache_dir_for, load_columns
+        from core.shammash.src.audit_segments import SegmentedAuditWriter
+
+        path = tmp_path / "events.jsonl"
+        writer = SegmentedAuditWriter(path, compression="gzip")
+        for day in range(1, 4):
+            writer.write([_record({"event_type": "law_decision", "payload": {"allowed": True}},
+                                  timestamp=f"2026-01-0{day}T12:00:00+00:00")])
+            writer.rotate()
+        writer.close()
+
+        assert len(load_columns(path)) == 3
+        assert sorted(p.name for p in cache_dir_for(path).iterdir()) == [
+            f"events-00000{seq}.jsonl.npz" for seq in (1, 2, 3)
+        ]
+        since = datetime(2026, 1, 2, tzinfo=timezone.utc).timestamp()
+        assert len(load_columns(path, since=since)) == 2
+
+
+# ---------------------------------------------------------------------------
+# Tests: State Snapshot Store
+# ---------------------------------------------------------------------------
+
+class TestSnapshotStore:
+    """Content-addressed before/after state snapshots."""
+
+    def test_delta_chain_round_trips_from_disk(self, tmp_path: Path):
+        from core.shammash.src.snapshot_store import SnapshotStore, snapshot_hash
+
+        store = SnapshotStore(tmp_path / "snapshots", max_delta_chain=3)
+        states = []
+        for i in range(8):
+            state = _mock_ha_state("light.test_lamp", state="on" if i % 2 else "off",
+                                   attributes={"brightness": i, "effect_list": list(range(200))})
+            if i == 5:
+                del state["attributes"]["effect_list"]
+            states.append(state)
+        hashes = [store.put(s) for s in states]
+        assert store.put(states[-1]) == hashes[-1]
+        assert store.stats["deduplicated"] == 1
+        assert store.stats["delta"] > 0 and store.stats["full"] > 1  # chain cap forces new bases
+
+        reopened = SnapshotStore(tmp_path / "snapshots")
+        for state, digest in zip(states, hashes):
+            assert digest == snapshot_hash(state)
+            assert reopened.get(digest) == state
+        assert reopened.get("0" * 64) is None
+
+    def test_failed_write_never_becomes_a_delta_base(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch,
+    ):
+        from core.shammash.src.snapshot_store import SnapshotStore
+
+        store = SnapshotStore(tmp_path / "snapshots")
+        store.put(_mock_ha_state("light.test_lamp", state="off"))
+        write = store._write
+
+        def crash(path, obj):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(store, "_write", crash)
+        with pytest.raises(OSError):
+            store.put(_mock_ha_state("light.test_lamp", state="on"))
+        monkeypatch.setattr(store, "_write", write)
+
+        latest = _mock_ha_state("light.test_lamp", state="on", attributes={"brightness": 9})
+        digest = store.put(latest)
+        assert SnapshotStore(tmp_path / "snapshots").get(digest) == latest
+
+    def test_tampered_object_fails_integrity_check(self, client: TestClient):
+        import zlib
+
+        import core.shammash.src.app as app_module
+        from core.shammash.src.snapshot_store import SnapshotCorruptError, SnapshotStore
+
+        root = app_module._get_snapshot_store().root
+        digest = SnapshotStore(root).put(_mock_ha_state("light.test_lamp", state="off"))
+        forged = {"entity_id": "light.test_lamp",
+                  "full": _mock_ha_state("light.test_lamp", state="on")}
+        SnapshotStore(root)._object_path(digest).write_bytes(
+            zlib.compress(json.dumps(forged).encode("utf-8"))
+        )
+        with pytest.raises(SnapshotCorruptError, match="hashes to"):
+            SnapshotStore(root).get(digest)
+
+        resp = client.get(f"/snapshots/{digest}")
+        assert resp.status_code == 500
+        assert "integrity" in resp.json()["detail"]
+
+    @patch("core.shammash.src.app.ha_call_service", new_callable=AsyncMock)
+    @patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock)
+    def test_audit_references_snapshots_with_inline_diff(
+        self,
+        mock_get_state: AsyncMock,
+        mock_call_service: AsyncMock,
+        client: TestClient,
+    ):
+        import core.shammash.src.app as app_module
+
+        before = _mock_ha_state("light.test_lamp", state="off", attributes={"friendly_name": "Lamp"})
+        after = _mock_ha_state("light.test_lamp", state="on", attributes={"friendly_name": "Lamp"})
+        mock_get_state.side_effect = [before, after]
+        mock_call_service.return_value = {"status_code": 200}
+        proposal = _make_proposal(entity_id="light.test_lamp", verify_attribute="state", verify_equals="on")
+
+        data = client.post("/execute/proposal", json=proposal).json()
+        assert data["before_state"]["state"] == "off"  # inline by default
+        assert data["state_diff"] == {"state": {"before": "off", "after": "on"}}
+
+        lines = app_module.AUDIT_JSONL_PATH.read_text().splitlines()
+        payload = json.loads(lines[-1])["payload"]
+        assert "before_state" not in payload and "after_state" not in payload
+        assert payload["after_state_ref"] == data["after_state_ref"]
+
+        resp = client.get(f"/snapshots/{data['before_state_ref']}")
+        assert resp.status_code == 200
+        assert resp.json()["state"] == before
+        assert client.get("/snapshots/not-a-hash").status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# Tests: Per-Worker Audit Streams
+# ---------------------------------------------------------------------------
+
+def _stream_worker(path: str, instance: str, offset: int, count: int, claimed, results) -> None:
+    """Process entry point: claim a slot and write ``count`` events."""
+    from core.shammash.src.audit_segments import SegmentedAuditWriter
+    from core.shammash.src.audit_streams import WorkerSlot
+
+    slot = WorkerSlot(Path(path), instance)
+    claimed.wait()  # both workers hold a slot before either releases one
+    writer = SegmentedAuditWriter(slot.stream_path, compression="none")
+    for i in range(count):
+        ts = datetime(2026, 1, 1, tzinfo=timezone.utc).replace(microsecond=2 * i + offset)
+        writer.write([_record({"n": 2 * i + offset, "pad": "x" * 8192}, timestamp=ts.isoformat())])
+    writer.close()
+    slot.release()
+    results.put(slot.worker)
+
+
+class TestAuditStreams:
+    """Multi-worker audit streams and the k-way merge reader."""
+
+    def test_workers_write_separate_streams_merged_in_time_order(self, tmp_path: Path):
+        import multiprocessing
+
+        from core.shammash.src.audit_streams import discover_streams, iter_merged_events
+
+        path = tmp_path / "events.jsonl"
+        path.write_text(_record({"n": -1}, timestamp="2025-12-31T23:59:59+00:00").line)
+        ctx = multiprocessing.get_context("spawn")
+        claimed, results = ctx.Barrier(2), ctx.Queue()
+        procs = [
+            ctx.Process(target=_stream_worker, args=(str(path), "sh-1", offset, 50, claimed, results))
+            for offset in (0, 1)
+        ]
+        for proc in procs:
+            proc.start()
+        workers = sorted(results.get(timeout=60) for _ in procs)
+        for proc in procs:
+            proc.join()
+
+        assert workers == [0, 1]
+        assert [p.name for p in discover_streams(path)] == [
+            "events.jsonl", "events.sh-1-w0.jsonl", "events.sh-1-w1.jsonl",
+        ]
+        events = list(iter_merged_events(path))
+        assert [e["n"] for e in events] == [-1] + list(range(100))
+        # No torn or interleaved lines despite 8 KiB events (> PIPE_BUF).
+        assert all(len(e["pad"]) == 8192 for e in events[1:])
+
+    def test_slots_are_exclusive_and_reused(self, tmp_path: Path):
+        from core.shammash.src.audit_streams import WorkerSlot
+
+        path = tmp_path / "events.jsonl"
+        first, second = WorkerSlot(path, "sh-1"), WorkerSlot(path, "sh-1")
+        assert (first.worker, second.worker) == (0, 1)
+        assert second.stream_path.name == "events.sh-1-w1.jsonl"
+        first.release()
+        assert WorkerSlot(path, "sh-1").worker == 0
+        second.release()
+
+    def test_app_writes_worker_stream_and_lookup_merges(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+
+        monkeypatch.setattr(app_module, "AUDIT_WORKER_STREAMS", True)
+        proposal = _make_proposal(entity_id="light.forbidden_lamp")
+        client.post("/execute/proposal", json=proposal)
+
+        stream = app_module.AUDIT_JSONL_PATH.with_name("events.test-shammash-w0.jsonl")
+        assert stream.exists()
+        assert not app_module.AUDIT_JSONL_PATH.exists()
+        assert client.get(f"/audit/{proposal['proposal_id']}").json()["count"] == 3
+        app_module._get_fallback_audit_writer().close()
+        app_module._fallback_audit_writer = None
+        app_module._worker_slot.release()
+        app_module._worker_slot = None
+
+
+class TestLawProgram:
+    """Compiled Law rule program: identical output, batch evaluation, stats."""
+
+    _CASES = [
+        ({"entity_id": "light.Bad"}, "law.v1.invalid_entity_format",
+         "Entity ID 'light.Bad' does not match required format"),
+        ({"verify_entity_id": "light.test_lamp.x"}, "law.v1.invalid_entity_format",
+         "Verify entity ID 'light.test_lamp.x' does not match required format"),
+        ({"verify_entity_id": "switch.test_switch"}, "law.v1.target_verify_mismatch",
+         "target.entity_id (light.test_lamp) != verify.entity_id (switch.test_switch). "
+         "In v1 they must match."),
+        ({"entity_id": "light.other"}, "law.v1.entity_not_allowlisted",
+         "Entity 'light.other' is not in SHAMMASH_ALLOWLIST"),
+        ({"blast_radius": "whole_home"}, "law.v1.blast_radius_exceeded",
+         "Blast radius 'whole_home' exceeds policy max 'room'"),
+        ({"blast_radius": "galaxy"}, "law.v1.blast_radius_exceeded",
+         "Blast radius 'galaxy' exceeds policy max 'room'"),
+    ]
+
+    def _facts(self, **overrides):
+        from core.shammash.src.law import LawFacts
+
+        fields = {
+            "entity_id": "light.test_lamp", "verify_entity_id": None,
+            "action_type": "toggle_entity", "blast_radius": "single_device",
+        }
+        fields.update(overrides)
+        fields["verify_entity_id"] = fields["verify_entity_id"] or fields["entity_id"]
+        return LawFacts(**fields)
+
+    def _program(self):
+        from core.shammash.src.law import compile_policy
+
+        return compile_policy(
+            ["toggle_entity", "turn_on", "turn_off"],
+            {"light.test_lamp", "switch.test_switch"},
+        )
+
+    def test_basis_and_reason_match_v1_rules(self):
+        program = self._program()
+        for overrides, rule_id, reason in self._CASES:
+            outcome = program.evaluate(self._facts(**overrides))
+            cited = ["rule=light.test_lamp"] if rule_id == "law.v1.blast_radius_exceeded" else []
+            assert outcome == (False, ["law.v1.default_deny", rule_id, *cited], reason)
+
+        outcome = program.evaluate(self._facts(action_type="lock"))
+        assert outcome.reason == (
+            "Action type 'lock' is not in allowed set: ['toggle_entity', 'turn_off', 'turn_on']"
+        )
+        assert program.evaluate(self._facts(blast_radius="room")) == (
+            True,
+            ["law.v1.allowlist_match", "entity=light.test_lamp", "type=toggle_entity",
+             "rule=light.test_lamp"],
+            "",
+        )
+
+    def test_batch_matches_single_and_counts_hits(self):
+        batch = [self._facts(**overrides) for overrides, _, _ in self._CASES]
+        batch += [self._facts(), self._facts(entity_id="switch.test_switch", action_type="turn_on")]
+
+        single = [self._program().evaluate(f) for f in batch]
+        program = self._program()
+        assert program.evaluate_batch(batch) == single
+
+        stats = {s["rule_id"]: s for s in program.stats()}
+        assert stats["law.v1.invalid_entity_format"]["evaluations"] == len(batch)
+        assert stats["law.v1.invalid_entity_format"]["hits"] == 2
+        assert stats["law.v1.blast_radius_exceeded"]["hits"] == 2
+        assert stats["law.v1.allowlist_match"]["hits"] == 2
+
+    def test_disabled_rule_is_not_compiled(self):
+        from core.shammash.src.law import compile_policy
+
+        program = compile_policy(["turn_on"], {"light.a", "light.b"}, enforce_target_verify=False)
+        assert "law.v1.target_verify_mismatch" not in [r.rule_id for r in program.rules]
+        assert program.evaluate(self._facts(
+            entity_id="light.a", verify_entity_id="light.b", action_type="turn_on",
+        )).allowed
+
+    def test_stats_endpoint_follows_published_policy(self, client: TestClient):
+        import core.shammash.src.app as app_module
+
+        client.post("/execute/proposal", json=_make_proposal(entity_id="light.forbidden_lamp"))
+        rules = {r["rule_id"]: r for r in client.get("/law/stats").json()["rules"]}
+        assert rules["law.v1.entity_not_allowlisted"]["hits"] >= 1
+        assert rules["law.v1.entity_not_allowlisted"]["total_ns"] > 0
+
+        from core.shammash.src.policy import build_snapshot
+
+        app_module._publish_policy(build_snapshot(
+            app_module._get_policy_snapshot().raw, allowlist=["light.forbidden_lamp"],
+        ))
+        decision = app_module.evaluate_law(
+            app_module.ExecutionProposal(**_make_proposal(entity_id="light.forbidden_lamp"))
+        )
+        assert decision.allowed
+
+
+# ---------------------------------------------------------------------------
+# Tests: Policy Snapshots and Hot Reload
+# ---------------------------------------------------------------------------
+
+_POLICY_YAML = """
+version: v1
+default_decision: deny
+allow_actions: [toggle_entity, turn_on, turn_off]
+allow_entities: [{entities}]
+enforce_target_verify_equality: true
+max_blast_radius: room
+verification:
+  max_timeout_seconds: 30
+"""
+
+
+class TestPolicyReload:
+    """Atomic policy snapshots, reload triggers and version tagging."""
+
+    @pytest.fixture
+    def policy_file(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        import core.shammash.src.app as app_module
+
+        path = tmp_path / "policy.yaml"
+        path.write_text(_POLICY_YAML.format(entities="light.test_lamp"))
+        monkeypatch.setattr(app_module, "POLICY_PATH", path)
+        monkeypatch.setattr(app_module, "SHAMMASH_ADMIN_TOKEN", "admin-secret")
+        monkeypatch.delenv("SHAMMASH_ALLOWLIST")
+        return path
+
+    def _reload(self, client: TestClient, token: str = "admin-secret"):
+        return client.post("/policy/reload", headers={"Authorization": f"Bearer {token}"})
+
+    def test_decision_and_audit_carry_policy_version(self, client: TestClient):
+        import core.shammash.src.app as app_module
+
+        version = client.get("/policy").json()["version"]
+        resp = client.post("/execute/proposal", json=_make_proposal(entity_id="light.forbidden_lamp"))
+        assert resp.json()["policy_basis"][-1] == f"policy={version}"
+
+        events = [json.loads(line) for line in app_module.AUDIT_JSONL_PATH.read_text().splitlines()]
+        decision = next(e for e in events if e["event_type"] == "law_decision")
+        assert decision["payload"]["policy_version"] == version
+
+    def test_reload_swaps_snapshot_atomically(self, client: TestClient, policy_file: Path):
+        import core.shammash.src.app as app_module
+
+        assert self._reload(client).json()["changed"] is True
+        old = app_module._get_policy_snapshot()
+        proposal = app_module.ExecutionProposal(**_make_proposal(entity_id="switch.test_switch"))
+        assert not app_module.evaluate_law(proposal).allowed
+
+        policy_file.write_text(_POLICY_YAML.format(entities="light.test_lamp, switch.test_switch"))
+        body = self._reload(client).json()
+        assert body["changed"] is True and body["previous_version"] == old.version
+        assert client.get("/policy").json()["version"] == body["version"] != old.version
+
+        assert app_module.evaluate_law(proposal).allowed
+        # A request holding the old snapshot keeps judging against it.
+        held = app_module.evaluate_law(proposal, old)
+        assert not held.allowed and held.policy_basis[-1] == f"policy={old.version}"
+        assert self._reload(client).json()["changed"] is False
+
+        events = [json.loads(line) for line in app_module.AUDIT_JSONL_PATH.read_text().splitlines()]
+        assert [e["payload"]["changed"] for e in events if e["event_type"] == "policy_reload"] == [
+            True, True, False,
+        ]
+
+    def test_invalid_policy_is_rejected_and_old_kept(self, client: TestClient, policy_file: Path):
+        self._reload(client)
+        version = client.get("/policy").json()["version"]
+        policy_file.write_text(_POLICY_YAML.format(entities="Light.Bad") + "max_blast_radius: galaxy\n")
+        resp = self._reload(client)
+        assert resp.status_code == 422
+        assert "max_blast_radius" in resp.json()["detail"]
+        assert client.get("/policy").json()["version"] == version
+
+    def test_reload_requires_admin_token(
+        self, client: TestClient, policy_file: Path, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+
+        assert self._reload(client, token="wrong").status_code == 401
+        monkeypatch.setattr(app_module, "SHAMMASH_ADMIN_TOKEN", "")
+        assert self._reload(client).status_code == 403
+
+    def test_file_watch_reloads_on_change(self, policy_file: Path):
+        import asyncio
+        import os
+
+        import core.shammash.src.app as app_module
+
+        async def scenario():
+            watcher = asyncio.create_task(app_module._watch_policy_file(0.01))
+            await asyncio.sleep(0.05)
+            policy_file.write_text(_POLICY_YAML.format(entities="light.watched"))
+            os.utime(policy_file, ns=(1, 1))  # mtime change even on coarse clocks
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if "light.watched" in app_module._get_policy_snapshot().allow_entities:
+                    break
+            watcher.cancel()
+
+        asyncio.run(scenario())
+        assert app_module._get_policy_snapshot().allow_entities == {"light.watched"}
+
+
+class TestAllowlistPatterns:
+    """Wildcard / prefix allowlist entries with per-entity overrides."""
+
+    def test_most_specific_rule_wins(self):
+        from core.shammash.src.allowlist import AllowlistIndex
+
+        index = AllowlistIndex([
+            "light.*", "light.kitchen_*", "light.kitchen_main",
+            {"entity": "light.kitchen_ceiling_*", "max_blast_radius": "single_device"},
+        ] + [f"sensor.bulk_{i}" for i in range(5000)])
+        assert index.match("light.kitchen_main").pattern == "light.kitchen_main"
+        assert index.match("light.kitchen_island").pattern == "light.kitchen_*"
+        assert index.match("light.kitchen_ceiling_2").max_blast_radius == "single_device"
+        assert index.match("light.porch").pattern == "light.*"
+        assert index.match("sensor.bulk_4999").pattern == "sensor.bulk_4999"
+        assert index.match("switch.kitchen_main") is None
+        assert "light.anything" in index and "lights.x" not in index
+
+    def test_malformed_entries_are_rejected(self):
+        from core.shammash.src.allowlist import parse_allow_entry
+        from core.shammash.src.policy import PolicyError, validate_policy
+
+        for bad in ("*", "light", "light.*_x", "Light.lamp", {"entity": "light.a", "colour": 1}):
+            with pytest.raises(ValueError):
+                parse_allow_entry(bad)
+        with pytest.raises(PolicyError, match="max_blast_radius"):
+            validate_policy({"allow_entities": [{"entity": "light.*", "max_blast_radius": "galaxy"}]})
+
+    def test_malformed_env_entries_are_dropped_at_load(self, monkeypatch, tmp_path: Path):
+        import core.shammash.src.app as app_module
+
+        monkeypatch.setenv("SHAMMASH_ALLOWLIST", "light.Kitchen,switch.fan")
+        monkeypatch.setattr(app_module, "POLICY_PATH", tmp_path / "missing.yaml")
+        with pytest.warns(UserWarning, match="light.Kitchen"):
+            snapshot = app_module._load_policy()
+        assert snapshot.allow_entities == frozenset({"switch.fan"})
+
+    def test_law_cites_matched_rule_and_applies_overrides(self):
+        from core.shammash.src.law import LawFacts
+        from core.shammash.src.policy import build_snapshot, validate_policy
+
+        policy = build_snapshot(validate_policy({
+            "allow_entities": [
+                "light.*",
+                {"entity": "cover.garage_*", "max_blast_radius": "single_device", "max_timeout_seconds": 90},
+            ],
+            "verification": {"max_timeout_seconds": 30},
+        }))
+
+        def evaluate(entity_id: str, radius: str = "single_device"):
+            return policy.program.evaluate(LawFacts(entity_id, entity_id, "turn_on", radius))
+
+        allowed = evaluate("light.hallway", "room")
+        assert allowed.allowed and allowed.policy_basis[-1] == "rule=light.*"
+        denied = evaluate("cover.garage_door", "room")
+        assert denied.policy_basis == [
+            "law.v1.default_deny", "law.v1.blast_radius_exceeded", "rule=cover.garage_*",
+        ]
+        assert denied.reason == "Blast radius 'room' exceeds policy max 'single_device'"
+        assert evaluate("switch.fan").policy_basis[-1] == "law.v1.entity_not_allowlisted"
+        assert policy.max_timeout_for("cover.garage_door") == 90
+        assert policy.max_timeout_for("light.hallway") == 30
+
+
+class TestLawBatchEvaluation:
+    """POST /law/evaluate/batch — dry-run Law, streamed NDJSON out."""
+
+    def _lines(self, resp) -> list[dict]:
+        return [json.loads(line) for line in resp.text.splitlines()]
+
+    def test_json_array_is_evaluated_in_order_without_ha(self, client: TestClient):
+        import core.shammash.src.app as app_module
+
+        items = [
+            _make_proposal(),
+            _make_proposal(entity_id="light.forbidden_lamp"),
+            {"schema_version": "v1"},
+            _make_proposal(action_type="turn_off", blast_radius="whole_home"),
+        ]
+        with patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock) as get_state:
+            resp = client.post("/law/evaluate/batch", json=items)
+        assert get_state.call_count == 0
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+        rows = self._lines(resp)
+        assert [r["index"] for r in rows] == [0, 1, 2, 3]
+        assert rows[0]["allowed"] and rows[0]["proposal_id"] == items[0]["proposal_id"]
+        assert rows[1]["policy_basis"][1] == "law.v1.entity_not_allowlisted"
+        assert "error" in rows[2] and "allowed" not in rows[2]
+        assert rows[3]["policy_basis"][1] == "law.v1.blast_radius_exceeded"
+
+        events = [json.loads(line) for line in app_module.AUDIT_JSONL_PATH.read_text().splitlines()]
+        assert [e["event_type"] for e in events] == ["law_evaluation.batch"]
+        summary = events[0]["payload"]
+        assert (summary["total"], summary["allowed"], summary["denied"], summary["invalid"]) == (4, 1, 2, 1)
+        assert summary["denial_reasons"] == {
+            "law.v1.entity_not_allowlisted": 1, "law.v1.blast_radius_exceeded": 1,
+        }
+        assert summary["completed"] is True
+
+    def test_ndjson_body_is_evaluated_across_chunks(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+
+        monkeypatch.setattr(app_module, "LAW_BATCH_CHUNK_SIZE", 7)
+        lines = [json.dumps(_make_proposal()) for _ in range(20)]
+        lines[5] = "{not json"
+        resp = client.post(
+            "/law/evaluate/batch",
+            content="\n".join(lines) + "\n",
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        rows = self._lines(resp)
+        assert [r["index"] for r in rows] == list(range(20))
+        assert "error" in rows[5] and rows[6]["allowed"]
+
+        monkeypatch.setattr(app_module, "LAW_BATCH_MAX_ITEMS", 19)
+        resp = client.post(
+            "/law/evaluate/batch",
+            content="\n".join(lines),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert resp.status_code == 413
+
+    def test_ndjson_lines_split_as_the_body_arrives(self, monkeypatch: pytest.MonkeyPatch):
+        import asyncio
+
+        from fastapi import HTTPException
+        from starlette.requests import Request
+
+        import core.shammash.src.app as app_module
+
+        body = b'{"a": 1}\n\n{"b": 2}\n{"c": 3}'
+
+        def request(piece: int) -> Request:
+            messages = [
+                {"type": "http.request", "body": body[i:i + piece], "more_body": i + piece < len(body)}
+                for i in range(0, len(body), piece)
+            ]
+
+            async def receive():
+                return messages.pop(0)
+
+            return Request({"type": "http", "method": "POST", "headers": []}, receive)
+
+        for piece in (1, 5, len(body)):
+            lines = asyncio.run(app_module._read_ndjson_lines(request(piece)))
+            assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+        monkeypatch.setattr(app_module, "LAW_BATCH_MAX_ITEMS", 1)
+        with pytest.raises(HTTPException) as too_large:
+            asyncio.run(app_module._read_ndjson_lines(request(5)))
+        assert too_large.value.status_code == 413
+
+    def test_bad_bodies_are_rejected(self, client: TestClient, monkeypatch: pytest.MonkeyPatch):
+        import core.shammash.src.app as app_module
+
+        assert client.post("/law/evaluate/batch", json={"a": 1}).status_code == 400
+        monkeypatch.setattr(app_module, "LAW_BATCH_MAX_ITEMS", 1)
+        assert client.post("/law/evaluate/batch", json=[{}, {}]).status_code == 413
+
+
+# ---------------------------------------------------------------------------
+# Tests: HA WebSocket State Stream
+# ---------------------------------------------------------------------------
+
+class TestHAStateStream:
+    """Push-based verification over the HA WebSocket API, REST fallback."""
+
+    def _expected(self, equals: str = "on", timeout: int = 5):
+        import core.shammash.src.app as app_module
+
+        return app_module.ExpectedOutcome(
+            verify={"entity_id": "light.test_lamp", "attribute": "state", "equals": equals},
+            timeout_seconds=timeout,
+        )
+
+    async def _connected_stream(self, token: str = "test-token-abc"):
+        from core.shammash.src.ha_ws import HAStateStream, websocket_url
+        from core.shammash.tests.fake_ha import FakeHomeAssistant
+
+        ha = FakeHomeAssistant("test-token-abc")
+        await ha.start()
+        stream = HAStateStream(websocket_url(ha.url), token, reconnect_initial_seconds=0.05)
+        stream.start()
+        return ha, stream
+
+    @patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock)
+    def test_pushed_state_resolves_verification(
+        self, mock_get_state: AsyncMock, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import asyncio
+
+        import core.shammash.src.app as app_module
+
+        mock_get_state.return_value = _mock_ha_state("light.test_lamp", state="off")
+
+        async def scenario():
+            ha, stream = await self._connected_stream()
+            try:
+                assert await stream.wait_connected(5)
+                monkeypatch.setattr(app_module, "_ha_stream", stream)
+                task = asyncio.create_task(app_module.verify_outcome(self._expected()))
+                await asyncio.sleep(0.05)
+                await ha.push_state(_mock_ha_state("switch.other", state="on"))
+                await ha.push_state(_mock_ha_state("light.test_lamp", state="on"))
+                return await asyncio.wait_for(task, 2), stream.stats()
+            finally:
+                await stream.close()
+                await ha.stop()
+
+        start = time.monotonic()
+        (passed, evidence, state, _), stats = asyncio.run(scenario())
+        assert passed and state["state"] == "on"
+        assert "1 poll, 1 pushed state" in evidence
+        assert time.monotonic() - start < 1.0  # well under one poll interval
+        assert mock_get_state.await_count == 1
+        assert stats["events_received"] == 2 and stats["events_delivered"] == 1
+        assert stats["watched_entities"] == 0
+
+    @patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock)
+    def test_falls_back_to_rest_when_socket_drops(
+        self, mock_get_state: AsyncMock, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import asyncio
+
+        import core.shammash.src.app as app_module
+
+        monkeypatch.setattr(app_module, "VERIFY_FIRST_POLL_SECONDS", 0.02)
+        mock_get_state.side_effect = [
+            _mock_ha_state("light.test_lamp", state="off"),
+            _mock_ha_state("light.test_lamp", state="off"),
+            _mock_ha_state("light.test_lamp", state="on"),
+        ]
+
+        async def scenario():
+            ha, stream = await self._connected_stream()
+            try:
+                assert await stream.wait_connected(5)
+                monkeypatch.setattr(app_module, "_ha_stream", stream)
+                task = asyncio.create_task(app_module.verify_outcome(self._expected()))
+                await asyncio.sleep(0.05)
+                await ha.stop()  # watchers are woken and switch to polling
+                return await asyncio.wait_for(task, 2), stream.connected
+            finally:
+                await stream.close()
+
+        (passed, evidence, _, _), connected = asyncio.run(scenario())
+        assert passed and not connected
+        assert "3 polls" in evidence
+
+    def test_bad_token_never_connects(self):
+        import asyncio
+
+        async def scenario():
+            ha, stream = await self._connected_stream(token="wrong")
+            try:
+                return await stream.wait_connected(0.3), stream.last_error
+            finally:
+                await stream.close()
+                await ha.stop()
+
+        connected, error = asyncio.run(scenario())
+        assert not connected
+        assert "authentication failed" in error
+
+
+# ---------------------------------------------------------------------------
+# Tests: Entity State Cache
+# ---------------------------------------------------------------------------
+
+class TestEntityStateCache:
+    """Freshness-bounded, single-flight LRU cache of HA entity states."""
+
+    def test_single_flight_lru_and_freshness(self):
+        import asyncio
+
+        from core.shammash.src.state_cache import EntityStateCache
+
+        now = [100.0]
+        cache = EntityStateCache(max_entries=2, clock=lambda: now[0])
+        fetches: list[str] = []
+
+        async def fetch(entity_id: str):
+            fetches.append(entity_id)
+            await asyncio.sleep(0.01)
+            return _mock_ha_state(entity_id, state="on")
+
+        async def scenario():
+            reads = await asyncio.gather(*(cache.get("light.a", fetch, 1.0) for _ in range(10)))
+            assert [r.origin for _, r in reads].count("rest") == 1
+            state, read = await cache.get("light.a", fetch, 1.0)
+            assert read.source == "cache" and state["state"] == "on"
+            now[0] += 2.0  # older than max_age → live again
+            assert (await cache.get("light.a", fetch, 1.0))[1].source == "live"
+            await cache.get("light.b", fetch, 1.0)
+            await cache.get("light.c", fetch, 1.0)  # evicts light.a (least recent)
+            assert cache.peek("light.a", 60) is None
+            return await cache.warm(
+                lambda: asyncio.sleep(0, [_mock_ha_state(f"sensor.s{i}") for i in range(5)])
+            )
+
+        assert asyncio.run(scenario()) == 2  # warm-up keeps only what fits
+        assert fetches == ["light.a", "light.a", "light.b", "light.c"]
+        stats = cache.stats()
+        assert stats["size"] == 2 and stats["evictions"] == 3
+        assert stats["shared_fetches"] == 9 and stats["hits"] == 1
+
+    def test_stream_tracked_entries_and_event_ordering(self):
+        from types import SimpleNamespace
+
+        from core.shammash.src.state_cache import EntityStateCache
+
+        now = [0.0]
+        stream = SimpleNamespace(connected=True, connects=1)
+        cache = EntityStateCache(stream=stream, clock=lambda: now[0])
+        newer = {**_mock_ha_state("light.a", state="on"), "last_updated": "2026-01-01T00:00:02+00:00"}
+        older = {**_mock_ha_state("light.a", state="off"), "last_updated": "2026-01-01T00:00:01+00:00"}
+        cache.on_state_changed("light.a", newer)
+        cache.put("light.a", older, source="rest")  # late REST response loses
+        now[0] += 3600
+        state, read = cache.peek("light.a", max_age=0.0)
+        assert state["state"] == "on" and read.origin == "event"
+        stream.connects = 2  # reconnect: events may have been missed
+        assert cache.peek("light.a", max_age=0.0) is None
+        cache.on_state_changed("light.a", None)
+        assert len(cache) == 0
+
+    @patch("core.shammash.src.app.ha_call_service", new_callable=AsyncMock)
+    @patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock)
+    def test_receipt_records_cached_before_state(
+        self,
+        mock_get_state: AsyncMock,
+        mock_call_service: AsyncMock,
+        client: TestClient,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+        from core.shammash.src.state_cache import EntityStateCache
+
+        cache = EntityStateCache()
+        cache.put("light.test_lamp", _mock_ha_state("light.test_lamp", state="off"))
+        monkeypatch.setattr(app_module, "_state_cache", cache)
+        mock_get_state.side_effect = [_mock_ha_state("light.test_lamp", state="on")]
+        mock_call_service.return_value = {"status_code": 200}
+
+        data = client.post("/execute/proposal", json=_make_proposal()).json()
+        assert data["verification"]["pass"] is True
+        assert data["before_state"]["state"] == "off"
+        assert data["before_state_source"]["source"] == "cache"
+        assert mock_get_state.await_count == 1  # only the verification read
+        assert client.get("/ready").json()["state_cache"]["hits"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Tests: Coalesced State Poller
+# ---------------------------------------------------------------------------
+
+class TestStatePoller:
+    """One poll loop serves every concurrent verification."""
+
+    def test_failed_tick_is_recorded_and_polling_continues(self):
+        import asyncio
+
+        from core.shammash.src.state_poller import StatePoller
+
+        async def fetch(entity_id: str):
+            return _mock_ha_state(entity_id, state="on")
+
+        async def fetch_all():
+            raise AssertionError("below bulk_threshold")
+
+        seen: list[str] = []
+
+        def flaky_listener(entity_id: str, state: dict):
+            seen.append(entity_id)
+            if len(seen) == 1:
+                raise RuntimeError("listener blew up")
+
+        async def scenario():
+            poller = StatePoller(fetch, fetch_all, min_gap=0.01)
+            poller.add_listener(flaky_listener)
+            poller.start()
+            try:
+                with poller.watch("light.test_lamp") as watch:
+                    watch.request(0)
+                    polled = await watch.next(1.0)
+                return polled, poller.stats()
+            finally:
+                await poller.close()
+
+        polled, stats = asyncio.run(scenario())
+        assert polled is not None and polled.state["state"] == "on"
+        assert seen == ["light.test_lamp", "light.test_lamp"]
+        assert stats["running"] and stats["tick_failures"] == 1
+        assert "listener blew up" in stats["last_error"]
+
+    def test_concurrent_verifications_share_reads(self, monkeypatch: pytest.MonkeyPatch):
+        import asyncio
+
+        import core.shammash.src.app as app_module
+        from core.shammash.src.state_poller import StatePoller
+
+        entities = ["light.test_lamp", "switch.test_switch"]
+        reads: dict[str, int] = dict.fromkeys(entities, 0)
+
+        async def fetch(entity_id: str):
+            reads[entity_id] += 1
+            await asyncio.sleep(0.005)
+            return _mock_ha_state(entity_id, state="on" if reads[entity_id] >= 3 else "off")
+
+        async def fetch_all():
+            raise AssertionError("below bulk_threshold")
+
+        monkeypatch.setattr(app_module, "VERIFY_FIRST_POLL_SECONDS", 0.02)
+
+        async def scenario():
+            poller = StatePoller(fetch, fetch_all, min_gap=0.01, bulk_threshold=10)
+            poller.start()
+            monkeypatch.setattr(app_module, "_state_poller", poller)
+            try:
+                expected = [
+                    app_module.ExpectedOutcome(
+                        verify={"entity_id": entities[i % 2], "attribute": "state", "equals": "on"},
+                        timeout_seconds=5,
+                    )
+                    for i in range(200)
+                ]
+                results = await asyncio.gather(*(app_module.verify_outcome(e) for e in expected))
+                return results, poller.stats()
+            finally:
+                await poller.close()
+
+        results, stats = asyncio.run(scenario())
+        assert all(passed for passed, _, _, _ in results)
+        # HA load follows the tick count, not the 200 waiters.
+        assert reads == {entity: 3 for entity in entities}
+        assert stats["entity_fetches"] == 6 and stats["ticks"] <= 6
+        assert stats["deliveries"] == 600 and stats["peak_watches"] == 200
+        assert stats["watches"] == 0
+
+    def test_bulk_read_fans_out_and_reports_missing(self):
+        import asyncio
+
+        from core.shammash.src.state_poller import EntityNotFound, StatePoller
+
+        bulk_reads = []
+        seen: list[str] = []
+
+        async def fetch(entity_id: str):
+            raise AssertionError("at bulk_threshold")
+
+        async def fetch_all():
+            bulk_reads.append(1)
+            return [_mock_ha_state(f"light.l{i}", state="on") for i in range(3)]
+
+        async def scenario():
+            poller = StatePoller(fetch, fetch_all, min_gap=0.0, bulk_threshold=2)
+            poller.add_listener(lambda entity_id, state: seen.append(entity_id))
+            poller.start()
+            try:
+                watches = [poller.watch(e) for e in ("light.l0", "light.l0", "light.l2", "light.gone")]
+                for watch in watches:
+                    watch.request(0)
+                return [await watch.next(1) for watch in watches]
+            finally:
+                await poller.close()
+
+        polled = asyncio.run(scenario())
+        assert len(bulk_reads) == 1
+        assert [p.state["entity_id"] for p in polled[:3]] == ["light.l0", "light.l0", "light.l2"]
+        assert polled[3].state is None and isinstance(polled[3].error, EntityNotFound)
+        assert seen == ["light.l0", "light.l1", "light.l2"]
+
+
+# ---------------------------------------------------------------------------
+# Tests: Adaptive Verification Schedule
+# ---------------------------------------------------------------------------
+
+class TestVerificationScheduler:
+    """Aggressive-then-backoff polls, aimed by learned settle times."""
+
+    def test_default_schedule_backs_off_to_policy_interval(self):
+        from core.shammash.src.verify_schedule import poll_offsets
+
+        assert poll_offsets(5, 0.1, 1.0) == [0.0, 0.1, 0.3, 0.7, 1.5, 2.5, 3.5, 4.5]
+        # Targets too close together (or past the timeout) are dropped.
+        assert poll_offsets(2, 0.5, 1.0, targets=(0.2, 0.8, 3.0)) == [0.0, 0.8, 1.3]
+
+    def test_learns_per_entity_then_domain_and_persists(self, tmp_path: Path):
+        from core.shammash.src.verify_schedule import VerificationScheduler
+
+        path = tmp_path / "settle_times.json"
+        scheduler = VerificationScheduler(path, first_gap=0.1, min_samples=5)
+        for settle in (0.28, 0.3, 0.31, 0.33, 0.6):
+            scheduler.record("light.zigbee", settle)
+        for _ in range(5):
+            scheduler.record("cover.garage", 20.0)
+
+        zigbee = scheduler.plan("light.zigbee", 10, 1.0)
+        assert zigbee.basis == "entity"
+        assert zigbee.offsets[:4] == [0.0, 0.4, 0.8, 0.9]  # p50, p90 buckets, then backoff
+        assert scheduler.plan("light.other", 10, 1.0).basis == "domain"
+        assert scheduler.plan("switch.new", 10, 1.0).basis == "default"
+        garage = scheduler.plan("cover.garage", 60, 5.0)
+        assert garage.offsets[:2] == [0.0, 25.6]  # second poll just after the usual settle time
+
+        scheduler.save()
+        restored = VerificationScheduler(path, min_samples=5)
+        restored.load()
+        assert restored.plan("light.zigbee", 10, 1.0) == zigbee
+        assert restored.stats()["domains"]["cover"]["samples"] == 5
+
+    @patch("core.shammash.src.app.ha_call_service", new_callable=AsyncMock)
+    @patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock)
+    def test_receipt_carries_schedule_and_settle_time(
+        self,
+        mock_get_state: AsyncMock,
+        mock_call_service: AsyncMock,
+        client: TestClient,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+        from core.shammash.src.verify_schedule import VerificationScheduler
+
+        scheduler = VerificationScheduler(first_gap=0.02)
+        monkeypatch.setattr(app_module, "_verify_scheduler", scheduler)
+        mock_get_state.side_effect = [
+            _mock_ha_state("light.test_lamp", state="off"),
+            _mock_ha_state("light.test_lamp", state="off"),
+            _mock_ha_state("light.test_lamp", state="off"),
+            _mock_ha_state("light.test_lamp", state="on"),
+        ]
+        mock_call_service.return_value = {"status_code": 200}
+
+        verification = client.post("/execute/proposal", json=_make_proposal()).json()["verification"]
+        assert verification["pass"] is True
+        assert verification["schedule_basis"] == "default"
+        schedule = verification["poll_schedule"]
+        assert len(schedule) == 3 and schedule[1] >= 0.02 and schedule[2] >= 0.06
+        assert verification["settle_seconds"] == schedule[-1]
+        assert scheduler.recorded == 1
+
+
+# ---------------------------------------------------------------------------
+# Tests: HA Transport
+# ---------------------------------------------------------------------------
+
+class TestHATransport:
+    """One pooled client for every HA call, with per-operation timeouts."""
+
+    def test_operations_use_policy_timeouts_and_count(self):
+        import asyncio
+
+        from core.shammash.src.ha_transport import HATransport
+
+        seen: list[tuple[str, str, float]] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append((request.url.path, request.headers["Authorization"],
+                         request.extensions["timeout"]["read"]))
+            if request.url.path == "/api/states/light.broken":
+                return httpx.Response(500)
+            if request.url.path == "/api/states/light.slow":
+                raise httpx.ReadTimeout("slow", request=request)
+            return httpx.Response(200, json={"entity_id": "light.a", "state": "on"})
+
+        timeouts = {"get_state": 1.5, "get_states": 30.0, "call_service": 2.5, "probe": 0.5}
+
+        async def scenario():
+            transport = HATransport(
+                "http://ha.test/", "tok", timeouts.__getitem__,
+                transport=httpx.MockTransport(handler),
+            )
+            try:
+                assert (await transport.get_state("light.a"))["state"] == "on"
+                await transport.call_service("homeassistant/toggle", {"entity_id": "light.a"})
+                await transport.probe()
+                for entity_id in ("light.broken", "light.slow"):
+                    with pytest.raises(httpx.HTTPError):
+                        await transport.get_state(entity_id)
+                return transport.stats()
+            finally:
+                await transport.aclose()
+
+        stats = asyncio.run(scenario())
+        assert seen[:3] == [
+            ("/api/states/light.a", "Bearer tok", 1.5),
+            ("/api/services/homeassistant/toggle", "Bearer tok", 2.5),
+            ("/api/", "Bearer tok", 0.5),
+        ]
+        get_state = stats["operations"]["get_state"]
+        assert get_state["requests"] == 3 and get_state["errors"] == 2 and get_state["timeouts"] == 1
+        assert get_state["latency_p50_ms"] is not None
+        assert stats["operations"]["get_states"]["requests"] == 0
+
+    def test_timeouts_come_from_policy(self):
+        from core.shammash.src.policy import DEFAULT_POLICY, PolicyError, build_snapshot, validate_policy
+
+        default = build_snapshot(validate_policy(dict(DEFAULT_POLICY)))
+        assert default.ha_timeout("get_state") == 10 and default.ha_timeout("probe") == 5
+        tuned = build_snapshot(validate_policy({"ha_transport": {"call_service_timeout_seconds": 3}}))
+        assert tuned.ha_timeout("call_service") == 3 and tuned.ha_timeout("get_states") == 30
+        assert tuned.version != default.version
+        with pytest.raises(PolicyError, match="ha_transport.probe_timeout_seconds"):
+            validate_policy({"ha_transport": {"probe_timeout_seconds": 0}})
+
+    def test_app_shares_one_transport_outside_lifespan(self, client: TestClient):
+        import asyncio
+
+        import core.shammash.src.app as app_module
+
+        async def twice():
+            return app_module._get_transport(), app_module._get_transport()
+
+        first, second = asyncio.run(twice())
+        assert first is second
+        stats = client.get("/ready").json()["ha_transport"]
+        assert stats["max_connections"] == app_module.HA_MAX_CONNECTIONS
+        assert stats["operations"]["probe"]["requests"] == 1
+
+    def test_http2_requires_h2(self):
+        import core.shammash.src.ha_transport as transport_module
+
+        if transport_module.h2 is not None:
+            pytest.skip("h2 installed")
+        with pytest.raises(RuntimeError, match="h2 is required"):
+            transport_module.HATransport("http://ha.test", "tok", lambda op: 1.0, http2=True)
+
+
+# ---------------------------------------------------------------------------
+# Tests: HA Circuit Breaker
+# ---------------------------------------------------------------------------
+
+class TestCircuitBreaker:
+    """Fast-fail while HA is down; one probe decides recovery."""
+
+    def test_trips_on_failure_rate_and_recovers_through_probe(self):
+        from core.shammash.src.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+        now = [0.0]
+        breaker = CircuitBreaker(min_calls=4, failure_rate=0.5, open_seconds=10, clock=lambda: now[0])
+        for failed in (False, True, False, True):
+            assert breaker.before_call() is False
+            breaker.record(failed, 0.01)
+        assert breaker.state == "open" and "2/4 calls failed" in breaker.last_trip_reason
+        with pytest.raises(CircuitOpenError) as excinfo:
+            breaker.before_call()
+        assert excinfo.value.retry_after == 10
+
+        now[0] = 10.0
+        assert breaker.before_call() is True  # the half-open probe
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()  # only one probe at a time
+        breaker.record(True, 0.01, probe=True)
+        assert breaker.state == "open" and breaker.opened == 2
+
+        now[0] = 20.0
+        assert breaker.before_call() is True
+        breaker.record(False, 0.01, probe=True)
+        assert breaker.state == "closed" and breaker.rejected == 2
+
+    def test_trips_on_slow_calls_and_ignores_client_errors(self):
+        from core.shammash.src.circuit_breaker import CircuitBreaker, is_outage
+
+        breaker = CircuitBreaker(min_calls=3, slow_call_seconds=1.0, slow_call_rate=0.6)
+        for latency in (2.0, 0.1, 3.0):
+            breaker.before_call()
+            breaker.record(False, latency)
+        assert breaker.state == "open" and "slower than 1s" in breaker.last_trip_reason
+
+        request = httpx.Request("GET", "http://ha/api/states/light.x")
+        assert not is_outage(httpx.HTTPStatusError("404", request=request, response=httpx.Response(404)))
+        assert is_outage(httpx.HTTPStatusError("503", request=request, response=httpx.Response(503)))
+        assert is_outage(httpx.ConnectError("refused", request=request))
+
+    @patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock)
+    def test_open_circuit_fails_proposals_fast(
+        self, mock_get_state: AsyncMock, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+        from core.shammash.src.circuit_breaker import CircuitBreaker
+        from core.shammash.src.ha_transport import HATransport
+
+        breaker = CircuitBreaker(min_calls=1, open_seconds=30)
+        breaker.before_call()
+        breaker.record(True, 0.01)
+        transport = HATransport(app_module.HA_URL, "tok", lambda op: 1.0, breaker=breaker)
+        monkeypatch.setattr(app_module, "_ha_transport", transport)
+
+        start = time.perf_counter()
+        resp = client.post("/execute/proposal", json=_make_proposal())
+        assert time.perf_counter() - start < 0.5
+        data = resp.json()
+        assert data["decision"] == "failed"
+        assert data["policy_basis"][-1] == app_module.CIRCUIT_OPEN_BASIS
+        assert 29 < data["retry_after_seconds"] <= 30
+        assert resp.headers["Retry-After"] == "30"
+        mock_get_state.assert_not_called()
+
+        ready = client.get("/ready").json()
+        assert ready["ready"] is False
+        assert ready["ha_transport"]["circuit"]["state"] == "open"
+        assert ready["ha_transport"]["operations"]["probe"]["rejected"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Tests: background readiness probe
+# ---------------------------------------------------------------------------
+
+class TestReadinessProber:
+    def test_caches_result_and_goes_stale(self):
+        import asyncio
+
+        from core.shammash.src.readiness import ReadinessProber
+
+        now = [100.0]
+        calls = []
+
+        async def check():
+            calls.append(now[0])
+            if len(calls) == 2:
+                raise RuntimeError("HA hung")
+            return {"ha_reachable": True}
+
+        prober = ReadinessProber(check, interval=5.0, clock=lambda: now[0])
+        assert prober.result is None and prober.stale
+
+        asyncio.run(prober.refresh())
+        now[0] += 4.0
+        assert prober.result == {"ha_reachable": True} and not prober.stale
+        assert prober.stats()["age_seconds"] == 4.0
+
+        # A failed probe keeps the previous result; its age keeps growing.
+        asyncio.run(prober.refresh())
+        now[0] += 12.0
+        stats = prober.stats()
+        assert prober.result == {"ha_reachable": True} and prober.stale
+        assert stats["probes"] == 2 and stats["failures"] == 1
+        assert stats["last_error"] == "RuntimeError: HA hung"
+
+    def test_ready_serves_cached_probe_without_calling_ha(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import asyncio
+
+        import core.shammash.src.app as app_module
+        from core.shammash.src.readiness import ReadinessProber
+
+        async def check():
+            return {
+                "ha_reachable": True,
+                "ha_token_valid": True,
+                "audit_ok": True,
+                "audit_sink": {"running": False},
+            }
+
+        prober = ReadinessProber(check, interval=5.0)
+        asyncio.run(prober.refresh())
+        monkeypatch.setattr(app_module, "_readiness_prober", prober)
+
+        for _ in range(3):
+            data = client.get("/ready").json()
+        assert data["ready"] is True
+        assert data["probe"]["mode"] == "background"
+        assert data["probe"]["probes"] == 1
+        assert data["ha_transport"]["operations"]["probe"]["requests"] == 0
+
+
+# ---------------------------------------------------------------------------
+# Tests: batch execution
+# ---------------------------------------------------------------------------
+
+class TestExecuteBatch:
+    def test_scene_runs_allowed_proposals_concurrently(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import asyncio
+
+        import core.shammash.src.app as app_module
+
+        switched: set[str] = set()
+
+        async def get_state(entity_id):
+            return _mock_ha_state(entity_id, state="on" if entity_id in switched else "off")
+
+        async def call_service(action):
+            await asyncio.sleep(0.3)
+            switched.add(action.target.entity_id)
+            return {"endpoint": "/api/services/homeassistant/turn_on", "status_code": 200}
+
+        monkeypatch.setattr(app_module, "ha_get_state", get_state)
+        monkeypatch.setattr(app_module, "ha_call_service", call_service)
+        monkeypatch.setattr(app_module, "VERIFY_FIRST_POLL_SECONDS", 0.01)
+        scene = [
+            _make_proposal("light.test_lamp", "turn_on"),
+            _make_proposal("light.not_allowed", "turn_on"),
+            _make_proposal("switch.test_switch", "turn_on"),
+        ]
+
+        start = time.perf_counter()
+        resp = client.post("/execute/proposals", json=scene)
+        assert time.perf_counter() - start < 0.55  # two 0.3 s calls overlapped
+        data = resp.json()
+        assert [r["proposal_id"] for r in data["receipts"]] == [p["proposal_id"] for p in scene]
+        assert [r["decision"] for r in data["receipts"]] == ["allowed", "denied", "allowed"]
+        assert data["counts"] == {"allowed": 2, "denied": 1, "failed": 0}
+        assert data["policy_version"] == app_module._get_policy_snapshot().version
+
+        events = [json.loads(line) for line in app_module.AUDIT_JSONL_PATH.read_text().splitlines()]
+        assert sum(e["event_type"] == "execution_receipt.out" for e in events) == 3
+        assert events[-1]["event_type"] == "execution_batch"
+        assert events[-1]["payload"]["counts"] == data["counts"]
+
+    def test_rejects_oversized_batches_and_duplicate_ids(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+
+        monkeypatch.setattr(app_module, "EXECUTE_BATCH_MAX_ITEMS", 2)
+        assert client.post("/execute/proposals", json=[_make_proposal()] * 3).status_code == 413
+        proposal = _make_proposal()
+        assert client.post("/execute/proposals", json=[proposal, proposal]).status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# Tests: per-entity execution ordering
+# ---------------------------------------------------------------------------
+
+class TestEntityQueue:
+    def test_same_entity_serialized_other_entities_parallel(self):
+        import asyncio
+
+        from core.shammash.src.entity_queue import EntityQueue
+
+        queue = EntityQueue()
+        log: list[str] = []
+
+        async def job(name: str, keys: tuple[str, ...]):
+            async with queue.hold(keys) as ticket:
+                log.append(f"{name}+")
+                await asyncio.sleep(0.05)
+                log.append(f"{name}-")
+            return ticket
+
+        async def scenario():
+            tickets = await asyncio.gather(
+                job("a", ("light.x",)),
+                job("b", ("light.y",)),
+                job("c", ("light.x", "light.y")),
+            )
+            # A waiter cancelled in the queue leaves nothing behind.
+            async with queue.hold(["light.x"]):
+                waiter = asyncio.create_task(job("d", ("light.x",)))
+                await asyncio.sleep(0.01)
+                assert queue.depth("light.x") == 2
+                waiter.cancel()
+            return tickets
+
+        start = time.perf_counter()
+        a, b, c = asyncio.run(scenario())
+        assert time.perf_counter() - start < 0.14  # a and b overlapped
+        assert log[:2] == ["a+", "b+"] and log[-2:] == ["c+", "c-"]
+        assert (a.depth, b.depth, c.depth) == (0, 0, 1)
+        assert c.wait_seconds >= 0.04
+        stats = queue.stats()
+        assert stats["busy_entities"] == 0 and stats["queued"] == 0
+        assert stats["acquisitions"] == 4 and stats["contended"] == 1
+
+    def test_same_entity_toggles_do_not_interleave(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import asyncio
+
+        import core.shammash.src.app as app_module
+
+        lamp = {"state": "off"}
+        calls: list[str] = []
+
+        async def get_state(entity_id):
+            return _mock_ha_state(entity_id, state=lamp["state"])
+
+        async def call_service(action):
+            calls.append(lamp["state"])
+            await asyncio.sleep(0.05)
+            lamp["state"] = "on" if lamp["state"] == "off" else "off"
+            return {"endpoint": "/api/services/homeassistant/toggle", "status_code": 200}
+
+        monkeypatch.setattr(app_module, "ha_get_state", get_state)
+        monkeypatch.setattr(app_module, "ha_call_service", call_service)
+        monkeypatch.setattr(app_module, "VERIFY_FIRST_POLL_SECONDS", 0.01)
+        toggles = [
+            _make_proposal("light.test_lamp", verify_equals="on"),
+            _make_proposal("light.test_lamp", verify_equals="off"),
+        ]
+
+        receipts = client.post("/execute/proposals", json=toggles).json()["receipts"]
+        assert calls == ["off", "on"]
+        assert [r["before_state"]["state"] for r in receipts] == ["off", "on"]
+        assert [r["decision"] for r in receipts] == ["allowed", "allowed"]
+        assert [r["entity_queue"]["depth"] for r in receipts] == [0, 1]
+        assert receipts[1]["entity_queue"]["wait_ms"] > 40
+        assert client.get("/ready").json()["entity_queue"]["contended"] >= 1
+
+
+# ---------------------------------------------------------------------------
+# Tests: asynchronous receipts
+# ---------------------------------------------------------------------------
+
+class TestAsyncReceipts:
+    @pytest.fixture
+    def slow_ha(self, monkeypatch: pytest.MonkeyPatch):
+        """HA whose entities settle 0.3 s after a service call."""
+        import core.shammash.src.app as app_module
+
+        settles: dict[str, float] = {}
+
+        async def get_state(entity_id):
+            on = time.perf_counter() >= settles.get(entity_id, float("inf"))
+            return _mock_ha_state(entity_id, state="on" if on else "off")
+
+        async def call_service(action):
+            settles[action.target.entity_id] = time.perf_counter() + 0.3
+            return {"endpoint": "/api/services/homeassistant/turn_on", "status_code": 200}
+
+        monkeypatch.setattr(app_module, "ha_get_state", get_state)
+        monkeypatch.setattr(app_module, "ha_call_service", call_service)
+        monkeypatch.setattr(app_module, "VERIFY_FIRST_POLL_SECONDS", 0.05)
+        monkeypatch.setattr(app_module, "HA_WEBSOCKET_ENABLED", False)
+
+    def test_202_then_poll_and_long_poll(self, slow_ha):
+        import core.shammash.src.app as app_module
+
+        with TestClient(app_module.app) as lifespan_client:
+            proposal = _make_proposal("light.test_lamp", "turn_on")
+            pid = proposal["proposal_id"]
+            start = time.perf_counter()
+            resp = lifespan_client.post(
+                "/execute/proposal", json=proposal, headers={"Prefer": "respond-async"},
+            )
+            assert time.perf_counter() - start < 0.25
+            assert resp.status_code == 202
+            assert resp.headers["Location"] == f"/receipts/{pid}"
+            assert resp.json()["action_taken"]["status_code"] == 200
+
+            assert lifespan_client.get(f"/receipts/{pid}").status_code == 202
+            final = lifespan_client.get(f"/receipts/{pid}", params={"wait": 5})
+            assert final.status_code == 200
+            assert final.json()["decision"] == "allowed"
+            assert final.json()["verification"]["pass"] is True
+
+            # Denied proposals never go async; every receipt is retrievable.
+            denied = _make_proposal("light.forbidden_lamp")
+            resp = lifespan_client.post(
+                "/execute/proposal", json=denied, headers={"Prefer": "respond-async"},
+            )
+            assert resp.status_code == 200 and resp.json()["decision"] == "denied"
+            assert lifespan_client.get(f"/receipts/{denied['proposal_id']}").json()["decision"] == "denied"
+            assert lifespan_client.get(f"/receipts/{uuid.uuid4()}").status_code == 404
+            stats = lifespan_client.get("/ready").json()["receipt_store"]
+            assert stats["stored"] == 2 and stats["pending"] == 0
+
+    def test_event_stream_delivers_final_receipt(self, slow_ha):
+        import core.shammash.src.app as app_module
+
+        with TestClient(app_module.app) as lifespan_client:
+            proposal = _make_proposal("switch.test_switch", "turn_on")
+            pid = proposal["proposal_id"]
+            resp = lifespan_client.post(
+                "/execute/proposal", json=proposal, headers={"Prefer": "respond-async"},
+            )
+            assert resp.status_code == 202
+            with lifespan_client.stream("GET", f"/receipts/{pid}/events") as stream:
+                assert stream.headers["content-type"].startswith("text/event-stream")
+                body = "".join(stream.iter_text())
+            events = [block.split("\n") for block in body.strip().split("\n\n")]
+            assert [lines[0] for lines in events] == ["event: pending", "event: receipt"]
+            receipt = json.loads(events[1][1][len("data: "):])
+            assert receipt["proposal_id"] == pid and receipt["decision"] == "allowed"
+
+    def test_without_receipt_store_answers_synchronously(self, client: TestClient):
+        resp = client.post(
+            "/execute/proposal",
+            json=_make_proposal("light.forbidden_lamp"),
+            headers={"Prefer": "respond-async"},
+        )
+        assert resp.status_code == 200
+        assert client.get(f"/receipts/{uuid.uuid4()}").status_code == 503
+
+
+# ---------------------------------------------------------------------------
+# Tests: idempotent re-submission
+# ---------------------------------------------------------------------------
+
+class TestIdempotentResubmission:
+    @pytest.fixture
+    def ha_calls(self, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+        """HA whose entities settle 0.2 s after a service call; returns the call log."""
+        import core.shammash.src.app as app_module
+
+        settles: dict[str, float] = {}
+        calls: list[str] = []
+
+        async def get_state(entity_id):
+            on = time.perf_counter() >= settles.get(entity_id, float("inf"))
+            return _mock_ha_state(entity_id, state="on" if on else "off")
+
+        async def call_service(action):
+            calls.append(action.target.entity_id)
+            settles[action.target.entity_id] = time.perf_counter() + 0.2
+            return {"endpoint": "/api/services/homeassistant/turn_on", "status_code": 200}
+
+        monkeypatch.setattr(app_module, "ha_get_state", get_state)
+        monkeypatch.setattr(app_module, "ha_call_service", call_service)
+        monkeypatch.setattr(app_module, "VERIFY_FIRST_POLL_SECONDS", 0.05)
+        monkeypatch.setattr(app_module, "HA_WEBSOCKET_ENABLED", False)
+        return calls
+
+    def test_completed_and_in_flight_retries_do_not_rerun(self, ha_calls: list[str]):
+        import core.shammash.src.app as app_module
+
+        with TestClient(app_module.app) as lifespan_client:
+            proposal = _make_proposal("light.test_lamp", "turn_on")
+            first = lifespan_client.post("/execute/proposal", json=proposal)
+            retry = lifespan_client.post("/execute/proposal", json=proposal)
+            assert retry.headers["Idempotent-Replayed"] == "true"
+            assert retry.json() == first.json()
+
+            # A retry while the first attempt is verifying waits for its receipt.
+            scene = _make_proposal("switch.test_switch", "turn_on")
+            accepted = lifespan_client.post(
+                "/execute/proposal", json=scene, headers={"Prefer": "respond-async"},
+            )
+            assert accepted.status_code == 202
+            again = lifespan_client.post(
+                "/execute/proposal", json=scene, headers={"Prefer": "respond-async"},
+            )
+            assert again.status_code == 202 and again.headers["Idempotent-Replayed"] == "true"
+            attached = lifespan_client.post("/execute/proposal", json=scene)
+            assert attached.json()["decision"] == "allowed"
+            assert attached.json()["verification"]["pass"] is True
+
+            # Batches replay known proposals in place.
+            batch = lifespan_client.post("/execute/proposals", json=[proposal, scene]).json()
+            assert [r["timestamp"] for r in batch["receipts"]] == [
+                first.json()["timestamp"], attached.json()["timestamp"],
+            ]
+
+            assert ha_calls == ["light.test_lamp", "switch.test_switch"]
+            assert lifespan_client.get("/ready").json()["receipt_store"]["replays"] == 5
+
+    def test_body_mismatch_rejected_and_prehistory_failures_rerun(
+        self, ha_calls: list[str], monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+
+        with TestClient(app_module.app) as lifespan_client:
+            proposal = _make_proposal("light.test_lamp", "turn_on")
+            monkeypatch.setattr(app_module, "HA_TOKEN", "")
+            failed = lifespan_client.post("/execute/proposal", json=proposal).json()
+            assert failed["decision"] == "failed" and failed["action_taken"] is None
+            monkeypatch.setattr(app_module, "HA_TOKEN", "test-token-abc")
+
+            # Nothing reached HA, so the retry executes.
+            rerun = lifespan_client.post("/execute/proposal", json=proposal)
+            assert rerun.json()["decision"] == "allowed"
+            assert "Idempotent-Replayed" not in rerun.headers
+            assert ha_calls == ["light.test_lamp"]
+
+            changed = {**proposal, "justification": "Same id, different request."}
+            resp = lifespan_client.post("/execute/proposal", json=changed)
+            assert resp.status_code == 409
+            resp = lifespan_client.post(
+                "/execute/proposals", json=[_make_proposal("switch.test_switch"), changed],
+            )
+            assert resp.status_code == 409
+            assert lifespan_client.get("/ready").json()["receipt_store"]["pending"] == 0
+
+    def test_service_call_failure_is_replayed_not_rerun(
+        self, ha_calls: list[str], monkeypatch: pytest.MonkeyPatch,
+    ):
+        import core.shammash.src.app as app_module
+
+        async def timed_out(action):
+            ha_calls.append(action.target.entity_id)
+            raise httpx.ReadTimeout("timed out waiting for HA")
+
+        with TestClient(app_module.app) as lifespan_client:
+            monkeypatch.setattr(app_module, "ha_call_service", timed_out)
+            proposal = _make_proposal("light.test_lamp")
+            failed = lifespan_client.post("/execute/proposal", json=proposal)
+            assert failed.json()["decision"] == "failed"
+            assert failed.json()["action_taken"] is None
+
+            # HA may have applied the toggle before timing out: no second call.
+            retry = lifespan_client.post("/execute/proposal", json=proposal)
+            assert retry.headers["Idempotent-Replayed"] == "true"
+            assert retry.json() == failed.json()
+            assert ha_calls == ["light.test_lamp"]
+
+
+# ---------------------------------------------------------------------------
+# Tests: already-satisfied short-circuit
+# ---------------------------------------------------------------------------
+
+class TestAlreadySatisfied:
+    @patch("core.shammash.src.app.ha_call_service", new_callable=AsyncMock)
+    @patch("core.shammash.src.app.ha_get_state", new_callable=AsyncMock)
+    def test_idempotent_action_in_desired_state_is_a_no_op(
+        self, mock_get_state: AsyncMock, mock_call_service: AsyncMock, client: TestClient,
+    ):
+        import core.shammash.src.app as app_module
+        from core.shammash.src.policy import build_snapshot, validate_policy
+
+        mock_get_state.return_value = _mock_ha_state("light.test_lamp", state="on")
+        mock_call_service.return_value = {"endpoint": "/api/services/homeassistant/toggle", "status_code": 200}
+
+        # Off by default: the call is made even though the lamp is on.
+        resp = client.post("/execute/proposal", json=_make_proposal("light.test_lamp", "turn_on"))
+        assert resp.json()["no_op"] is None and mock_call_service.await_count == 1
+
+        app_module._publish_policy(build_snapshot(
+            validate_policy({"skip_satisfied_actions": ["turn_on", "turn_off"]}),
+            allowlist=["light.test_lamp"],
+        ))
+        mock_get_state.reset_mock()
+        data = client.post("/execute/proposal", json=_make_proposal("light.test_lamp", "turn_on")).json()
+        assert data["decision"] == "allowed" and data["no_op"] is True
+        assert data["verification"]["pass"] is True
+        assert data["verification"]["evidence"].startswith("Already satisfied")
+        assert data["policy_basis"][-1] == app_module.NO_OP_BASIS
+        assert data["action_taken"] is None
+        assert mock_call_service.await_count == 1 and mock_get_state.await_count == 1
+
+        # toggle_entity is never skipped.
+        data = client.post("/execute/proposal", json=_make_proposal("light.test_lamp")).json()
+        assert data["no_op"] is None and mock_call_service.await_count == 2
+
+    def test_only_idempotent_actions_may_be_skipped(self):
+        from core.shammash.src.policy import PolicyError, validate_policy
+
+        with pytest.raises(PolicyError, match="skip_satisfied_actions"):
+            validate_policy({"skip_satisfied_actions": ["toggle_entity"]})
+
+
+# ---------------------------------------------------------------------------
+# Tests: admission control
+# ---------------------------------------------------------------------------
+
+class TestAdmissionControl:
+    def test_lanes_round_robin_rejection_and_cancellation(self):
+        import asyncio
+
+        from core.shammash.src.admission import AdmissionController, AdmissionRejected
+
+        controller = AdmissionController(max_in_flight=1, max_queue_per_source=2)
+        order: list[str] = []
+
+        async def job(name: str, source: str, lane: str):
+            admission = await controller.acquire(source, lane)
+            order.append(name)
+            await asyncio.sleep(0.01)
+            controller.release(admission)
+            return admission
+
+        async def scenario():
+            first = await controller.acquire("samuel/1", "normal")
+            tasks = [
+                asyncio.create_task(job(name, source, lane))
+                for name, source, lane in [
+                    ("bulk", "samuel/1", "bulk"),
+                    ("a1", "samuel/1", "normal"),
+                    ("a2", "samuel/1", "normal"),
+                    ("b1", "eli/1", "normal"),
+                    ("urgent", "eli/1", "urgent"),
+                ]
+            ]
+            await asyncio.sleep(0.01)
+            # samuel/1 already has two queued (bulk and a1): a2 is turned away.
+            with pytest.raises(AdmissionRejected) as rejected:
+                await tasks[2]
+            assert rejected.value.retry_after >= 1
+            # A cancelled waiter gives up its queue place.
+            doomed = asyncio.create_task(controller.acquire("ava/1", "normal"))
+            await asyncio.sleep(0)
+            doomed.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await doomed
+            assert controller.stats()["queued"] == {"urgent": 1, "normal": 2, "bulk": 1}
+            controller.release(first)
+            done = await asyncio.gather(*(t for i, t in enumerate(tasks) if i != 2))
+            return done
+
+        bulk, a1, b1, urgent = asyncio.run(scenario())
+        assert order == ["urgent", "a1", "b1", "bulk"]
+        assert (urgent.lane, bulk.lane) == ("urgent", "bulk")
+        assert urgent.depth == 3 and bulk.wait_seconds > urgent.wait_seconds
+        stats = controller.stats()
+        assert stats["in_flight"] == 0 and stats["queued_sources"] == 0
+        assert stats["rejected"] == 1 and stats["waited"] == 4
+
+    def test_full_queue_answers_429_with_retry_after(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch,
+    ):
+        import asyncio
+
+        import core.shammash.src.app as app_module
+        from core.shammash.src.admission import AdmissionController
+
+        async def get_state(entity_id):
+            return _mock_ha_state(entity_id, state="on")
+
+        async def call_service(action):
+            return {"endpoint": "/api/services/homeassistant/toggle", "status_code": 200}
+
+        monkeypatch.setattr(app_module, "ha_get_state", get_state)
+        monkeypatch.setattr(app_module, "ha_call_service", call_service)
+        controller = AdmissionController(max_in_flight=1, max_queue_per_source=0)
+        monkeypatch.setattr(app_module, "_admission", controller)
+        held = asyncio.run(controller.acquire("other/1"))
+
+        proposal = _make_proposal()
+        resp = client.post("/execute/proposal", json=proposal)
+        assert resp.status_code == 429 and int(resp.headers["Retry-After"]) >= 1
+        data = resp.json()
+        assert data["decision"] == "failed" and data["action_taken"] is None
+        assert data["policy_basis"][-1] == app_module.ADMISSION_REJECTED_BASIS
+        assert data["retry_after_seconds"] >= 1
+
+        # Once a slot frees up, the same proposal is re-run and admitted.
+        controller.release(held)
+        resp = client.post("/execute/proposal", json=proposal, headers={"Priority": "u=6"})
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["decision"] == "allowed"
+        assert data["admission"] == {"lane": "bulk", "depth": 0, "wait_ms": data["admission"]["wait_ms"]}
+        assert client.get("/ready").json()["admission"]["rejected"] == 1